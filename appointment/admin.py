@@ -8,6 +8,9 @@ Since: 1.0.0
 
 from django import forms
 from django.contrib.admin.widgets import AdminTimeWidget
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import render
+from django.urls import path
 from django.utils.translation import gettext_lazy as _
 import datetime
 from django.contrib import admin
@@ -16,6 +19,8 @@ from .models import (
     Appointment, AppointmentRequest, AppointmentRescheduleHistory, Config, DayOff, EmailVerificationCode,
     PasswordResetToken, Service, StaffMember, WorkingHours
 )
+from .settings import APPOINTMENT_QUERY_INSPECTOR_ENABLED, APPOINTMENT_QUERY_INSPECTOR_FILE
+from .utils.query_inspector import read_reports
 
 
 @admin.register(Service)
@@ -70,13 +75,38 @@ class AppointmentRequestAdmin(admin.ModelAdmin):
     list_display = ('date', 'start_time', 'end_time', 'service', 'created_at', 'updated_at',)
     search_fields = ('date', 'service__name',)
     list_filter = ('date', 'service',)
+    show_full_result_count = False
 
 
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
     list_display = ('client', 'appointment_request', 'created_at', 'updated_at',)
+    list_select_related = ('client', 'appointment_request__service')
+    ordering = ('-appointment_request__date', '-appointment_request__start_time', '-appointment_request_id')
+    # Skip the COUNT(*) of the whole table run on every page besides the count of the filtered rows
+    show_full_result_count = False
     search_fields = ('appointment_request__service__name',)
     list_filter = ('client', 'appointment_request__service',)
+    change_list_template = 'admin/appointment/appointment/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('query-reports/', self.admin_site.admin_view(self.query_reports_view),
+                 name='appointment_query_reports'),
+        ] + super().get_urls()
+
+    def query_reports_view(self, request):
+        """List the last slow and repeated queries reported by the QueryInspectorMiddleware."""
+        if not request.user.is_superuser:
+            raise PermissionDenied
+        context = {
+            **self.admin_site.each_context(request),
+            'title': _("Suspicious SQL queries"),
+            'opts': self.model._meta,
+            'inspector_enabled': APPOINTMENT_QUERY_INSPECTOR_ENABLED,
+            'reports': read_reports(APPOINTMENT_QUERY_INSPECTOR_FILE),
+        }
+        return render(request, 'admin/appointment/query_reports.html', context)
 
 
 @admin.register(EmailVerificationCode)
@@ -8,6 +8,8 @@ Since: 2.0.0
 
 from functools import wraps
 
+from asgiref.sync import iscoroutinefunction
+
 from appointment.utils.error_codes import ErrorCode
 from appointment.utils.json_context import json_response
 from appointment.utils.view_helpers import is_ajax
@@ -56,14 +58,26 @@ def require_superuser(func):
 
 
 def require_ajax(func):
-    """Decorator to require a request to be AJAX.
+    """Decorator to require a request to be AJAX. Works on sync and async views.
     Usage: @require_ajax
     """
 
+    def not_ajax_response():
+        return json_response("Not an AJAX request.", status=400, success=False, error_code=ErrorCode.INVALID_DATA)
+
+    if iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(request, *args, **kwargs):
+            if not is_ajax(request):
+                return not_ajax_response()
+            return await func(request, *args, **kwargs)
+
+        return async_wrapper
+
     @wraps(func)
     def wrapper(request, *args, **kwargs):
         if not is_ajax(request):
-            return json_response("Not an AJAX request.", status=400, success=False, error_code=ErrorCode.INVALID_DATA)
+            return not_ajax_response()
         return func(request, *args, **kwargs)
 
     return wrapper
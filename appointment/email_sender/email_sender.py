@@ -11,6 +11,8 @@ from django.utils import timezone
 
 from appointment.logger_config import get_logger
 from appointment.settings import APP_DEFAULT_FROM_EMAIL, check_q_cluster
+from appointment.utils.metrics import EMAILS
+from appointment.utils.tracing import SPAN_KIND_CLIENT, traced
 
 logger = get_logger(__name__)
 
@@ -41,8 +43,8 @@ def has_required_email_settings():
 
     if missing_settings:
         missing_settings_str = ", ".join(missing_settings)
-        logger.warning(f"Warning: The following settings are missing in settings.py: {missing_settings_str}. "
-                       "Email functionality will be disabled.")
+        logger.warning("Warning: The following settings are missing in settings.py: %s. "
+                       "Email functionality will be disabled.", missing_settings_str)
         return False
 
     # Check if EMAIL_HOST is not the default value
@@ -61,6 +63,7 @@ def render_email_template(template_url, context):
     return ""
 
 
+@traced('email.send_email', kind=SPAN_KIND_CLIENT)
 def send_email(recipient_list, subject: str, template_url: str = None, context: dict = None, from_email=None,
                message: str = None, attachments=None):
     if not has_required_email_settings():
@@ -80,6 +83,7 @@ def send_email(recipient_list, subject: str, template_url: str = None, context:
                 from_email=from_email,
                 attachments=attachments
         )
+        EMAILS.inc(channel='django_q', result='queued')
     else:
         # Synchronously send the email
         try:
@@ -91,8 +95,10 @@ def send_email(recipient_list, subject: str, template_url: str = None, context:
                     recipient_list=recipient_list,
                     fail_silently=False,
             )
+            EMAILS.inc(channel='sync', result='sent')
         except Exception as e:
-            logger.error(f"Error sending email: {e}")
+            EMAILS.inc(channel='sync', result='failed')
+            logger.error("Error sending email: %s", e)
 
 
 def validate_required_fields(recipient_list: list, subject: str) -> Tuple[bool, str]:
@@ -175,7 +181,7 @@ def schedule_email_task(
         )
         return True, "Email scheduled successfully."
     except Exception as e:
-        logger.error(f"Error scheduling email: {e}")
+        logger.error("Error scheduling email: %s", e)
         return False, f"Error scheduling email: {str(e)}"
 
 
@@ -235,6 +241,7 @@ def schedule_email_sending(
     )
 
 
+@traced('email.notify_admin', kind=SPAN_KIND_CLIENT)
 def notify_admin(subject: str, template_url: str = None, context: dict = None, message: str = None,
                  recipient_email: str = None, attachments=None):
     if not has_required_email_settings():
@@ -253,6 +260,7 @@ def notify_admin(subject: str, template_url: str = None, context: dict = None, m
                    from_email=settings.DEFAULT_FROM_EMAIL,
                    recipient_list=recipients,
                    attachments=attachments)
+        EMAILS.inc(channel='django_q', result='queued')
     else:
         # Synchronously send the email
         try:
@@ -264,8 +272,10 @@ def notify_admin(subject: str, template_url: str = None, context: dict = None, m
                     recipient_list=recipients,
                     fail_silently=False,
             )
+            EMAILS.inc(channel='sync', result='sent')
         except Exception as e:
-            logger.error(f"Error sending email: {e}")
+            EMAILS.inc(channel='sync', result='failed')
+            logger.error("Error sending email: %s", e)
 
 
 def get_use_django_q_for_emails():
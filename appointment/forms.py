@@ -14,18 +14,68 @@ from .models import (
     Appointment, AppointmentRequest, AppointmentRescheduleHistory, DayOff, Service, StaffMember,
     WorkingHours
 )
+from .settings import APPOINTMENT_CALENDAR_FEED_MAX_DAYS, APPOINTMENT_SLOTS_RANGE_MAX_DAYS
 from .utils.db_helpers import get_user_model
 from .utils.validators import not_in_the_past
 
 
 class SlotForm(forms.Form):
     selected_date = forms.DateField(validators=[not_in_the_past])
+    # The responses show the staff member's name: the user is loaded with the staff member
     staff_member = forms.ModelChoiceField(
-            StaffMember.objects.all(),
+            StaffMember.objects.select_related('user'),
             error_messages={'invalid_choice': _('Staff member does not exist')}
     )
 
 
+class ServiceSlotForm(forms.Form):
+    selected_date = forms.DateField(validators=[not_in_the_past])
+
+
+class SlotRangeForm(forms.Form):
+    start_date = forms.DateField(validators=[not_in_the_past])
+    end_date = forms.DateField()
+    staff_member = forms.ModelChoiceField(
+            StaffMember.objects.select_related('user'),
+            error_messages={'invalid_choice': _('Staff member does not exist')}
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date:
+            if end_date < start_date:
+                self.add_error('end_date', _('End date cannot be before start date'))
+            elif (end_date - start_date).days >= APPOINTMENT_SLOTS_RANGE_MAX_DAYS:
+                self.add_error('end_date', _('The date range cannot exceed %(days)s days') % {
+                    'days': APPOINTMENT_SLOTS_RANGE_MAX_DAYS})
+        return cleaned_data
+
+
+class CalendarFeedForm(forms.Form):
+    # FullCalendar sends the visible range as ISO 8601 datetimes, the end being excluded
+    start = forms.DateTimeField()
+    end = forms.DateTimeField()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start = cleaned_data.get('start')
+        end = cleaned_data.get('end')
+        if start and end:
+            if end <= start:
+                self.add_error('end', _('End date must be after start date'))
+            elif (end.date() - start.date()).days > APPOINTMENT_CALENDAR_FEED_MAX_DAYS:
+                self.add_error('end', _('The date range cannot exceed %(days)s days') % {
+                    'days': APPOINTMENT_CALENDAR_FEED_MAX_DAYS})
+        return cleaned_data
+
+
+class AppointmentChangesForm(forms.Form):
+    # The cursor returned by the previous call, an ISO 8601 datetime
+    since = forms.DateTimeField()
+
+
 class AppointmentRequestForm(forms.ModelForm):
     class Meta:
         model = AppointmentRequest
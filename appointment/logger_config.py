@@ -6,9 +6,14 @@ Author: Adams Pierre David
 Since: 1.1.0
 """
 
+import atexit
+import json
 import logging
+import queue
 import sys
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 
 import colorama
 
@@ -37,22 +42,114 @@ class ColoredFormatter(logging.Formatter):
 
         if record.exc_info:
             log_msg += '\n' + self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_msg += '\n' + record.exc_text
         return log_msg
 
 
-def get_logger(name):
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+class JSONFormatter(logging.Formatter):
+    """Format a record as one JSON object per line, for log collectors."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'function': record.funcName,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class AppointmentQueueHandler(QueueHandler):
+    """Put records on the queue of the background writer, with their message already merged with its arguments.
+
+    Unlike QueueHandler.prepare, the record isn't formatted here: the format (colors, JSON) is applied by the writer
+    thread, so the calling thread only pays for merging the arguments of the records that pass the level.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+FORMATTERS = {
+    'color': ColoredFormatter,
+    'json': JSONFormatter,
+}
 
-    # Create a colored formatter
-    formatter = ColoredFormatter()
+_lock = threading.Lock()
+_queue_handler = None
+_listener = None
 
-    # Create a stream handler
-    stream_handler = logging.StreamHandler(sys.stdout)
-    stream_handler.setLevel(logging.DEBUG)
-    stream_handler.setFormatter(formatter)
 
-    # Add the handler to the logger
-    logger.addHandler(stream_handler)
+def get_log_settings():
+    """Read the level and format of the logs from the Django settings.
 
+    APPOINTMENT_LOG_LEVEL defaults to DEBUG when settings.DEBUG is on and INFO otherwise, APPOINTMENT_LOG_FORMAT to
+    'color' ('json' writes one JSON object per line). Without configured settings (a script), INFO and 'color' are used.
+
+    :return: The level and the format.
+    """
+    from django.conf import settings
+    if not settings.configured:
+        return logging.INFO, 'color'
+    level = getattr(settings, 'APPOINTMENT_LOG_LEVEL', 'DEBUG' if settings.DEBUG else 'INFO')
+    log_format = getattr(settings, 'APPOINTMENT_LOG_FORMAT', 'color')
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    return level, log_format
+
+
+def configure_logging():
+    """Set up, once, the handler shared by every logger of the application.
+
+    Records go through a queue to a background thread, which formats them and writes them to stdout: a request never
+    waits on the console. The thread is stopped, after writing the records left in the queue, when Python exits.
+
+    :return: The shared queue handler.
+    """
+    global _queue_handler, _listener
+    with _lock:
+        if _queue_handler is None:
+            level, log_format = get_log_settings()
+            stream_handler = logging.StreamHandler(sys.stdout)
+            stream_handler.setFormatter(FORMATTERS.get(log_format, ColoredFormatter)())
+            records = queue.SimpleQueue()
+            _listener = QueueListener(records, stream_handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
+            _queue_handler = AppointmentQueueHandler(records)
+            _queue_handler.setLevel(level)
+    return _queue_handler
+
+
+def get_logger(name):
+    """Get the logger of a module.
+
+    The shared handler of `configure_logging` is added once, to the top-level logger of the package (the 'appointment'
+    logger for 'appointment.views'): the loggers of the modules reach it by propagation, so calling get_logger any
+    number of times never adds a handler.
+
+    :param name: The name of the logger, usually __name__.
+    :return: The logger.
+    """
+    logger = logging.getLogger(name)
+    handler = configure_logging()
+    root_logger = logging.getLogger(name.split('.')[0])
+    with _lock:
+        if handler not in root_logger.handlers:
+            root_logger.addHandler(handler)
+            if root_logger.level == logging.NOTSET:
+                root_logger.setLevel(handler.level)
     return logger
@@ -0,0 +1,205 @@
+# Path: appointment/management/commands/benchmark_booking.py
+
+"""
+Commande Django pour mesurer le parcours de réservation complet, étape par étape, avec le client de test Django.
+Usage: python manage.py benchmark_booking
+       python manage.py benchmark_booking --clients 500 --background 100000 --output benchmark_booking.json
+       python manage.py benchmark_booking --compare benchmark_booking.json --threshold 0.25
+
+Chaque client simulé a sa propre session et enchaîne: appointment_request -> available_slots/ ->
+appointment_request_submit -> appointment_client_information (GET puis POST) -> default_thank_you.
+Pour chaque étape, la commande mesure la latence (p50/p95/p99), le nombre de requêtes SQL et la taille de la
+réponse, dans une base de test jetable remplie par generate_load_dataset. Les e-mails restent en mémoire.
+"""
+
+import datetime
+import io
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from appointment.models import Appointment, Config, StaffMember
+from appointment.utils.benchmark import build_report, compare_reports, percentile, summarize, write_report
+
+STEPS = [
+    'appointment_request',
+    'available_slots',
+    'appointment_request_submit',
+    'appointment_client_information',
+    'appointment_client_information_submit',
+    'default_thank_you',
+]
+
+
+class Command(BaseCommand):
+    help = 'Mesure chaque étape du parcours de réservation (latence, requêtes SQL, octets) et écrit un rapport JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=200, help='Nombre de clients simulés (par défaut: 200)')
+        parser.add_argument(
+            '--background',
+            type=int,
+            default=10000,
+            help='Nombre de rendez-vous générés avant la mesure (par défaut: 10000)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Graine du générateur aléatoire (par défaut: 42)')
+        parser.add_argument(
+            '--output',
+            default='benchmark_booking.json',
+            help='Fichier JSON du rapport (par défaut: benchmark_booking.json)'
+        )
+        parser.add_argument(
+            '--compare',
+            default=None,
+            help='Rapport de référence: la commande échoue si une étape régresse'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Ralentissement toléré par rapport à la référence (par défaut: 0.25, soit 25 %%)'
+        )
+
+    def handle(self, *args, **options):
+        if options['clients'] <= 0:
+            raise CommandError('--clients doit être supérieur à 0')
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            cache.clear()
+            Config.objects.create(id=1, slot_duration=30, lead_time=datetime.time(9), finish_time=datetime.time(17),
+                                  appointment_buffer_time=0)
+            call_command('generate_load_dataset', appointments=options['background'], seed=options['seed'],
+                         stdout=io.StringIO())
+            self.rng = random.Random(options['seed'])
+            self.staff_members = list(StaffMember.objects.prefetch_related('services_offered').order_by('pk'))
+            samples = {step: [] for step in STEPS}
+            bookings = []
+            with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+                for i in range(options['clients']):
+                    total = (0, 0, 0)
+                    for step, sample in self.book(i):
+                        samples[step].append(sample)
+                        total = tuple(a + b for a, b in zip(total, sample))
+                    bookings.append(total)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        results = [self.summarize_step(step, samples[step], options['clients']) for step in STEPS]
+        # Le coût total d'une réservation, toutes étapes confondues
+        results.append(self.summarize_step('booking', bookings, options['clients']))
+        report = build_report('booking', results, clients=options['clients'], background=options['background'],
+                              seed=options['seed'])
+        write_report(report, options['output'])
+        for result in results:
+            self.stdout.write(
+                f'  {result["name"]:<40} p50 {result["wall_time_ms"]["p50"]:>9} ms  '
+                f'p95 {result["wall_time_ms"]["p95"]:>9} ms  p99 {result["wall_time_ms"]["p99"]:>9} ms  '
+                f'{result["queries"]:>3} requête(s)  {result["bytes"]["p50"]:>8} octets'
+            )
+        self.stdout.write(self.style.SUCCESS(f'[TERMINE] Rapport écrit dans {options["output"]}'))
+
+        if baseline is not None:
+            regressions = compare_reports(baseline, report, threshold=options['threshold'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(f'  {regression}'))
+                raise CommandError(f'{len(regressions)} régression(s) par rapport à {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS(f'Aucune régression par rapport à {options["compare"]}'))
+
+    @staticmethod
+    def request(client, step, method, url, expected_status, **kwargs):
+        """Envoie une requête et retourne la réponse et la mesure (secondes, requêtes SQL, octets) de l'étape."""
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, **kwargs)
+            elapsed = time.perf_counter() - start
+        if response.status_code != expected_status:
+            raise CommandError(f'{step}: statut {response.status_code} au lieu de {expected_status} ({url})')
+        return response, (elapsed, len(queries.captured_queries), len(response.content))
+
+    def book(self, i):
+        """Réserve un rendez-vous comme un client, et produit (étape, mesure) pour chaque requête envoyée."""
+        client = Client()
+        staff_member = self.rng.choice(self.staff_members)
+        service = self.rng.choice(list(staff_member.services_offered.all()))
+
+        response, sample = self.request(client, 'appointment_request', 'get',
+                                        reverse('appointment:appointment_request', args=[service.pk]), 200)
+        yield 'appointment_request', sample
+
+        # Le client essaie des dates jusqu'à trouver un créneau libre
+        slots, date = [], timezone.localdate()
+        for _ in range(30):
+            date += datetime.timedelta(days=self.rng.randint(1, 3))
+            response, sample = self.request(client, 'available_slots', 'get',
+                                            reverse('appointment:available_slots_ajax'), 200,
+                                            data={'selected_date': date.isoformat(), 'staff_member': staff_member.pk},
+                                            HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            yield 'available_slots', sample
+            slots = response.json().get('available_slots', [])
+            if slots:
+                break
+        if not slots:
+            raise CommandError(f'Aucun créneau libre trouvé pour {staff_member}')
+        start = datetime.datetime.fromisoformat(self.rng.choice(slots))
+
+        response, sample = self.request(client, 'appointment_request_submit', 'post',
+                                        reverse('appointment:appointment_request_submit'), 302, data={
+                                            'date': date.isoformat(),
+                                            'start_time': start.time().isoformat(),
+                                            'end_time': (start + service.duration).time().isoformat(),
+                                            'service': service.pk,
+                                            'staff_member': staff_member.pk,
+                                        })
+        yield 'appointment_request_submit', sample
+        client_information_url = response['Location']
+
+        response, sample = self.request(client, 'appointment_client_information', 'get', client_information_url, 200)
+        yield 'appointment_client_information', sample
+
+        response, sample = self.request(client, 'appointment_client_information_submit', 'post',
+                                        client_information_url, 302, data={
+                                            'name': f'Client {i + 1}',
+                                            'email': f'booking-{i + 1:07d}@benchmark.example.com',
+                                            'phone_0': 'US',
+                                            'phone_1': '2025550143',
+                                            'address': '1 Benchmark Street',
+                                            'payment_type': 'full',
+                                        })
+        yield 'appointment_client_information_submit', sample
+
+        # Sans passer par la page de paiement, même si APPOINTMENT_PAYMENT_URL est configurée
+        appointment_request_id = resolve(urlsplit(client_information_url).path).kwargs['appointment_request_id']
+        appointment = Appointment.objects.only('pk').get(appointment_request_id=appointment_request_id)
+        response, sample = self.request(client, 'default_thank_you', 'get',
+                                        reverse('appointment:default_thank_you', args=[appointment.pk]), 200)
+        yield 'default_thank_you', sample
+
+    @staticmethod
+    def summarize_step(name, samples, clients):
+        timings, queries, sizes = zip(*samples)
+        return {
+            'name': name,
+            'size': clients,
+            'runs': len(samples),
+            'wall_time_ms': summarize(list(timings)),
+            # Le maximum, pour qu'un N+1 qui ne touche que certains clients ne soit pas noyé dans la moyenne
+            'queries': max(queries),
+            'queries_p50': percentile(queries, 50),
+            'bytes': {'p50': percentile(sizes, 50), 'max': max(sizes), 'total': sum(sizes)},
+        }
@@ -0,0 +1,330 @@
+# Path: appointment/management/commands/benchmark_concurrency.py
+
+"""
+Commande Django pour comparer le débit des modes de déploiement WSGI et ASGI sur les points d'entrée AJAX les plus
+sollicités, à plusieurs niveaux de concurrence, sur la même machine.
+Usage: python manage.py benchmark_concurrency
+       python manage.py benchmark_concurrency --concurrency 1,8,32 --requests 400 --query-latency 2
+       python manage.py benchmark_concurrency --compare benchmark_concurrency.json --threshold 0.25
+
+Les deux modes traitent les mêmes requêtes dans le même processus, avec les vrais gestionnaires de Django:
+- wsgi: --wsgi-workers threads appellent WSGIHandler, comme autant de workers synchrones de gunicorn: au-delà,
+  les requêtes des N clients concurrents attendent un worker libre;
+- asgi: une boucle asyncio garde les N requêtes en cours dans ASGIHandler, comme un worker uvicorn.
+La base de test jetable est remplie par generate_load_dataset. --query-latency ajoute un délai à chaque requête SQL
+pour simuler un serveur de base de données distant: c'est là que les workers synchrones restent bloqués.
+"""
+
+import asyncio
+import datetime
+import io
+import json
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from appointment.models import Config, Service, StaffMember
+from appointment.utils.benchmark import build_report, compare_reports, summarize, write_report
+from appointment.utils.db_helpers import username_in_user_model
+
+ENDPOINTS = ['available_slots', 'non_working_days', 'next_available_date', 'calendar_appointments']
+MODES = ['wsgi', 'asgi']
+
+
+class Command(BaseCommand):
+    help = 'Compare le débit des modes WSGI et ASGI sur les points d\'entrée AJAX et écrit un rapport JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            default='1,8,32',
+            help='Niveaux de concurrence, séparés par des virgules (par défaut: 1,8,32)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Nombre de requêtes par point d\'entrée, mode et niveau de concurrence (par défaut: 200)'
+        )
+        parser.add_argument(
+            '--wsgi-workers',
+            type=int,
+            default=4,
+            help='Nombre de workers synchrones du mode wsgi (par défaut: 4)'
+        )
+        parser.add_argument(
+            '--query-latency',
+            type=float,
+            default=0,
+            help='Délai ajouté à chaque requête SQL, en millisecondes (par défaut: 0)'
+        )
+        parser.add_argument(
+            '--background',
+            type=int,
+            default=10000,
+            help='Nombre de rendez-vous générés avant la mesure (par défaut: 10000)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Graine du générateur aléatoire (par défaut: 42)')
+        parser.add_argument(
+            '--output',
+            default='benchmark_concurrency.json',
+            help='Fichier JSON du rapport (par défaut: benchmark_concurrency.json)'
+        )
+        parser.add_argument(
+            '--compare',
+            default=None,
+            help='Rapport de référence: la commande échoue si une mesure régresse'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Ralentissement toléré par rapport à la référence (par défaut: 0.25, soit 25 %%)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in str(options['concurrency']).split(',')]
+            if not all(level > 0 for level in levels):
+                raise ValueError('chaque niveau doit être supérieur à 0')
+        except ValueError as e:
+            raise CommandError(f'Format de concurrence invalide: {e}')
+        for name in ('requests', 'wsgi_workers'):
+            if options[name] <= 0:
+                raise CommandError(f'--{name.replace("_", "-")} doit être supérieur à 0')
+        if options['query_latency'] < 0:
+            raise CommandError('--query-latency ne peut pas être négatif')
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+
+        self.query_latency = options['query_latency'] / 1000
+        self.query_count = 0
+        self.lock = threading.Lock()
+        if connection.vendor == 'sqlite':
+            # Une base SQLite en mémoire partagée entre threads sérialise les connexions: une base fichier, comme
+            # en production
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # Chaque thread ouvre sa propre connexion: le délai et le comptage s'y installent à la connexion
+        connection_created.connect(self.install_query_wrapper)
+        self.install_query_wrapper(connection=connection)
+        try:
+            cache.clear()
+            Config.objects.create(id=1, slot_duration=30, lead_time=datetime.time(9), finish_time=datetime.time(17),
+                                  appointment_buffer_time=0)
+            call_command('generate_load_dataset', appointments=options['background'], seed=options['seed'],
+                         stdout=io.StringIO())
+            self.prepare(options['seed'])
+            requests = {endpoint: self.build_requests(endpoint, options['requests']) for endpoint in ENDPOINTS}
+            # Les deux modes trouvent les mêmes caches chauds
+            self.run_wsgi([request for endpoint in ENDPOINTS for request in requests[endpoint]], 1)
+
+            results = []
+            for level in levels:
+                self.stdout.write(f'Concurrence {level}...')
+                for endpoint in ENDPOINTS:
+                    for mode in MODES:
+                        results.append(self.measure(mode, endpoint, requests[endpoint], level,
+                                                    options['wsgi_workers']))
+        finally:
+            connection_created.disconnect(self.install_query_wrapper)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = build_report('concurrency', results, concurrency=levels, requests=options['requests'],
+                              wsgi_workers=options['wsgi_workers'], query_latency_ms=options['query_latency'], background=options['background'],
+                              seed=options['seed'])
+        write_report(report, options['output'])
+        throughput = {(result['name'], result['size']): result['throughput_rps'] for result in results}
+        for result in results:
+            mode, endpoint = result['name'].split(':')
+            line = (f'  {result["name"]:<28} {result["size"]:>4}  {result["throughput_rps"]:>9} req/s  '
+                    f'p50 {result["wall_time_ms"]["p50"]:>9} ms  p99 {result["wall_time_ms"]["p99"]:>9} ms  '
+                    f'{result["errors"]:>3} erreur(s)')
+            if mode == 'asgi':
+                wsgi_throughput = throughput[(f'wsgi:{endpoint}', result['size'])]
+                line += f'  x{result["throughput_rps"] / wsgi_throughput:.2f} par rapport à wsgi'
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f'[TERMINE] Rapport écrit dans {options["output"]}'))
+
+        if baseline is not None:
+            regressions = compare_reports(baseline, report, threshold=options['threshold'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(f'  {regression}'))
+                raise CommandError(f'{len(regressions)} régression(s) par rapport à {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS(f'Aucune régression par rapport à {options["compare"]}'))
+
+    def install_query_wrapper(self, sender=None, connection=None, **kwargs):
+        if self.count_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self.count_query)
+
+    def count_query(self, execute, sql, params, many, context):
+        with self.lock:
+            self.query_count += 1
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        return execute(sql, params, many, context)
+
+    def prepare(self, seed):
+        """Choisit les staff members interrogés et ouvre une session pour le calendrier, réservé aux connectés."""
+        self.rng = random.Random(seed)
+        self.staff_members = list(StaffMember.objects.order_by('pk').values_list('pk', flat=True))
+        self.service_id = Service.objects.order_by('pk').values_list('pk', flat=True).first()
+        user_fields = {'email': 'benchmark-staff@example.com', 'is_staff': True}
+        if username_in_user_model():
+            user_fields['username'] = 'benchmark_staff'
+        client = Client()
+        client.force_login(get_user_model().objects.create(**user_fields))
+        session_cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        self.headers = {'X-Requested-With': 'XMLHttpRequest', 'Cookie': session_cookie}
+
+    def build_requests(self, endpoint, count):
+        """Tire `count` requêtes (chemin, chaîne de requête) au hasard pour un point d'entrée."""
+        today = timezone.localdate()
+        requests = []
+        for _ in range(count):
+            staff_member = self.rng.choice(self.staff_members)
+            if endpoint == 'available_slots':
+                date = today + datetime.timedelta(days=self.rng.randint(1, 30))
+                requests.append((reverse('appointment:available_slots_ajax'),
+                                 {'selected_date': date.isoformat(), 'staff_member': staff_member}))
+            elif endpoint == 'non_working_days':
+                requests.append((reverse('appointment:get_non_working_days_ajax'), {'staff_member': staff_member}))
+            elif endpoint == 'next_available_date':
+                requests.append((reverse('appointment:request_next_available_slot', args=[self.service_id]),
+                                 {'staff_member': staff_member}))
+            else:
+                month = today + datetime.timedelta(days=self.rng.randint(0, 60))
+                requests.append((reverse('appointment:get_calendar_appointments_ajax'),
+                                 {'year': month.year, 'month': month.month}))
+        return [(path, urlencode(query)) for path, query in requests]
+
+    def measure(self, mode, endpoint, requests, concurrency, wsgi_workers):
+        self.query_count = 0
+        if mode == 'wsgi':
+            elapsed, latencies, errors = self.run_wsgi(requests, min(concurrency, wsgi_workers))
+        else:
+            elapsed, latencies, errors = asyncio.run(self.run_asgi(requests, concurrency))
+        return {
+            'name': f'{mode}:{endpoint}',
+            'size': concurrency,
+            'runs': len(requests),
+            'errors': errors,
+            'throughput_rps': round(len(requests) / elapsed, 2),
+            'wall_time_ms': summarize(latencies),
+            'queries': round(self.query_count / len(requests)),
+        }
+
+    def run_wsgi(self, requests, workers):
+        """Envoie les requêtes à WSGIHandler depuis `workers` threads, comme autant de workers synchrones."""
+        handler = WSGIHandler()
+        pending = queue.Queue()
+        for request in requests:
+            pending.put(request)
+        latencies, errors = [], []
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        path, query = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    start = time.perf_counter()
+                    status = self.wsgi_request(handler, path, query)
+                    elapsed = time.perf_counter() - start
+                    with self.lock:
+                        latencies.append(elapsed)
+                        if status != 200:
+                            errors.append(status)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, latencies, len(errors)
+
+    def wsgi_request(self, handler, path, query):
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': 'localhost'}
+        environ.update({f'HTTP_{name.upper().replace("-", "_")}': value for name, value in self.headers.items()})
+        setup_testing_defaults(environ)
+        status = []
+        response = handler(environ, lambda status_line, headers, exc_info=None: status.append(status_line))
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+        return int(status[0].split()[0])
+
+    async def run_asgi(self, requests, concurrency):
+        """Envoie les requêtes à ASGIHandler depuis une boucle asyncio, avec `concurrency` requêtes en cours."""
+        handler = ASGIHandler()
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, errors = [], []
+
+        async def send_request(path, query):
+            async with semaphore:
+                start = time.perf_counter()
+                status = await self.asgi_request(handler, path, query)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors.append(status)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send_request(path, query) for path, query in requests))
+        return time.perf_counter() - start, latencies, len(errors)
+
+    async def asgi_request(self, handler, path, query):
+        headers = [(b'host', b'localhost')]
+        headers += [(name.lower().encode(), value.encode()) for name, value in self.headers.items()]
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+            'headers': headers, 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        body_sent = False
+        disconnected = asyncio.Event()
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # Le client reste connecté jusqu'à la fin de la réponse
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        status = []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        await handler(scope, receive, send)
+        disconnected.set()
+        return status[0]
@@ -0,0 +1,200 @@
+# Path: appointment/management/commands/benchmark_slots.py
+
+"""
+Commande Django pour mesurer le calcul des créneaux (temps, nombre de requêtes SQL, pic mémoire) à plusieurs tailles
+de données, et écrire les résultats en JSON.
+Usage: python manage.py benchmark_slots
+       python manage.py benchmark_slots --sizes 10,100,500 --repeat 20 --output benchmark_slots.json
+       python manage.py benchmark_slots --compare benchmark_slots.json --threshold 0.25
+
+Comme la commande testserver, elle travaille dans une base de test jetable: la base configurée n'est pas modifiée.
+Pour une taille N, un staff member travaille toute la journée avec N rendez-vous, N/10 replanifications en
+attente et N/10 jours de congé à partir d'aujourd'hui, au milieu d'un jeu de données généré par
+generate_load_dataset (--background).
+"""
+
+import datetime
+import io
+import json
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.utils import timezone
+
+from appointment.models import (
+    Appointment, AppointmentRequest, AppointmentRescheduleHistory, Config, DayOff, Service, StaffMember, WorkingHours
+)
+from appointment.services import get_available_slots_for_staff
+from appointment.utils.availability_cache import bump_availability_version
+from appointment.utils.benchmark import build_report, compare_reports, measure, write_report
+from appointment.utils.day_bitmap import minute_of, time_of
+from appointment.utils.db_helpers import (
+    calculate_slots, calculate_staff_slots, exclude_booked_slots, exclude_pending_reschedules,
+    get_weekday_num_from_date, username_in_user_model
+)
+from appointment.views import get_next_available_date_ajax
+
+# Heures de travail du staff member mesuré, en minutes
+WORK_START, WORK_END = 0, 23 * 60
+
+
+class Command(BaseCommand):
+    help = 'Mesure le calcul des créneaux à plusieurs tailles de données et écrit un rapport JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10,100,500',
+            help='Nombres de rendez-vous du jour mesuré, séparés par des virgules (par défaut: 10,100,500)'
+        )
+        parser.add_argument('--repeat', type=int, default=10, help='Nombre d\'exécutions mesurées (par défaut: 10)')
+        parser.add_argument(
+            '--background',
+            type=int,
+            default=10000,
+            help='Nombre de rendez-vous générés pour les autres staff members (par défaut: 10000)'
+        )
+        parser.add_argument(
+            '--output',
+            default='benchmark_slots.json',
+            help='Fichier JSON du rapport (par défaut: benchmark_slots.json)'
+        )
+        parser.add_argument(
+            '--compare',
+            default=None,
+            help='Rapport de référence: la commande échoue si une mesure régresse'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Ralentissement toléré par rapport à la référence (par défaut: 0.25, soit 25 %%)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in str(options['sizes']).split(',')]
+            if not all(1 <= size <= (WORK_END - WORK_START) // 2 for size in sizes):
+                raise ValueError(f'chaque taille doit être entre 1 et {(WORK_END - WORK_START) // 2}')
+        except ValueError as e:
+            raise CommandError(f'Format de tailles invalide: {e}')
+        if options['repeat'] <= 0:
+            raise CommandError('--repeat doit être supérieur à 0')
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            cache.clear()
+            Config.objects.create(id=1, slot_duration=30, lead_time=datetime.time(9), finish_time=datetime.time(17),
+                                  appointment_buffer_time=0)
+            if options['background']:
+                call_command('generate_load_dataset', appointments=options['background'], stdout=io.StringIO())
+            results = []
+            for size in sizes:
+                self.stdout.write(f'Taille {size}...')
+                results.extend(self.run_size(size, options['repeat']))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = build_report('slots', results, sizes=sizes, repeat=options['repeat'],
+                              background=options['background'])
+        write_report(report, options['output'])
+        for result in results:
+            self.stdout.write(
+                f'  {result["name"]:<36} {result["size"]:>5}  p50 {result["wall_time_ms"]["p50"]:>10} ms  '
+                f'{result["queries"]:>3} requête(s)  {result["peak_memory_bytes"]:>10} octets'
+            )
+        self.stdout.write(self.style.SUCCESS(f'[TERMINE] Rapport écrit dans {options["output"]}'))
+
+        if baseline is not None:
+            regressions = compare_reports(baseline, report, threshold=options['threshold'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(f'  {regression}'))
+                raise CommandError(f'{len(regressions)} régression(s) par rapport à {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS(f'Aucune régression par rapport à {options["compare"]}'))
+
+    def create_staff_member(self, size):
+        """Crée un staff member qui travaille tous les jours, avec `size` rendez-vous de la durée d'un créneau
+        un créneau sur deux le jour mesuré, size / 10 replanifications en attente et size / 10 jours de congé."""
+        today = timezone.localdate()
+        date = today + datetime.timedelta(days=size // 10 + 30)
+        slot_duration = (WORK_END - WORK_START) // (2 * size)
+
+        user_fields = {'email': f'benchmark-{size}@example.com', 'first_name': 'Benchmark', 'last_name': str(size)}
+        if username_in_user_model():
+            user_fields['username'] = f'benchmark_{size}'
+        user = get_user_model().objects.create(**user_fields)
+        service = Service.objects.create(name=f'Benchmark {size}', duration=datetime.timedelta(minutes=slot_duration),
+                                         price=0)
+        staff_member = StaffMember.objects.create(user=user, slot_duration=slot_duration, appointment_buffer_time=0,
+                                                  work_on_saturday=True, work_on_sunday=True)
+        staff_member.services_offered.add(service)
+        WorkingHours.objects.bulk_create(
+            WorkingHours(staff_member=staff_member, day_of_week=day,
+                         start_time=datetime.time(WORK_START // 60), end_time=datetime.time(WORK_END // 60))
+            for day in range(7)
+        )
+        if size >= 10:
+            DayOff.objects.create(staff_member=staff_member, start_date=today,
+                                  end_date=today + datetime.timedelta(days=size // 10 - 1))
+
+        requests = [
+            AppointmentRequest(date=date, start_time=time_of(WORK_START + 2 * i * slot_duration),
+                               end_time=time_of(WORK_START + (2 * i + 1) * slot_duration), service=service,
+                               staff_member=staff_member, id_request=f'benchmark{size}-{i}')
+            for i in range(size)
+        ]
+        AppointmentRequest.objects.bulk_create(requests)
+        requests = list(AppointmentRequest.objects.filter(staff_member=staff_member).order_by('start_time'))
+        Appointment.objects.bulk_create(
+            Appointment(client=user, appointment_request=request, amount_to_pay=0, id_request=request.id_request)
+            for request in requests
+        )
+        # Chaque replanification en attente retient le créneau libre qui suit un rendez-vous
+        AppointmentRescheduleHistory.objects.bulk_create(
+            AppointmentRescheduleHistory(appointment_request=request, date=date, staff_member=staff_member,
+                                         start_time=request.end_time,
+                                         end_time=time_of(minute_of(request.end_time) + slot_duration))
+            for request in requests[::10]
+        )
+        bump_availability_version(staff_member.pk)
+        return staff_member, service, date
+
+    def run_size(self, size, repeat):
+        staff_member, service, date = self.create_staff_member(size)
+        day_of_week = get_weekday_num_from_date(date)
+        slot_duration = datetime.timedelta(minutes=staff_member.slot_duration)
+        start = datetime.datetime.combine(date, datetime.time(WORK_START // 60))
+        end = datetime.datetime.combine(date, datetime.time(WORK_END // 60))
+        slots = calculate_slots(start, end, start, slot_duration)
+        appointments = Appointment.objects.filter(appointment_request__staff_member=staff_member,
+                                                  appointment_request__date=date)
+        request = RequestFactory().get('/', {'staff_member': staff_member.pk}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        cases = [
+            ('calculate_slots', lambda: calculate_slots(start, end, start, slot_duration), None),
+            ('calculate_staff_slots', lambda: calculate_staff_slots(date, staff_member), None),
+            ('exclude_booked_slots', lambda: exclude_booked_slots(appointments, slots, slot_duration), None),
+            ('exclude_pending_reschedules', lambda: exclude_pending_reschedules(slots, staff_member, date), None),
+            ('get_available_slots_for_staff', lambda: get_available_slots_for_staff(date, staff_member, day_of_week),
+             lambda: bump_availability_version(staff_member.pk)),
+            ('get_available_slots_for_staff_cached',
+             lambda: get_available_slots_for_staff(date, staff_member, day_of_week), None),
+            ('get_next_available_date_ajax', lambda: async_to_sync(get_next_available_date_ajax)(request, service.pk),
+             None),
+        ]
+        results = []
+        for name, func, setup in cases:
+            result = measure(func, repeat=repeat, setup=setup)
+            results.append({'name': name, 'size': size, **result})
+        return results
@@ -0,0 +1,322 @@
+# Path: appointment/management/commands/generate_load_dataset.py
+
+"""
+Commande Django pour générer un jeu de données volumineux et réaliste (tests de charge, benchmarks).
+Usage: python manage.py generate_load_dataset
+       python manage.py generate_load_dataset --services 20 --staff 200 --appointments 2000000 --days 365
+       python manage.py generate_load_dataset --clear
+
+Les objets sont créés par bulk_create, par lots : les méthodes save() et les signaux ne sont pas appelés, la commande
+renseigne donc elle-même id_request, amount_to_pay, le document de recherche (et son index plein texte sous SQLite),
+les jours travaillés du week-end, et invalide le cache des créneaux et recalcule les cumuls journaliers du dashboard
+une seule fois à la fin. Avec la même graine (--seed), le même jeu de données est généré.
+"""
+
+import datetime
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from appointment.models import Appointment, AppointmentRequest, Config, DayOff, Service, StaffMember, WorkingHours
+from appointment.utils.availability_cache import bump_availability_version
+from appointment.utils.config_cache import bump_config_version
+from appointment.utils.daily_stats import rebuild_daily_stats
+from appointment.utils.db_helpers import username_in_user_model
+from appointment.utils.search import index_appointments
+
+# Durées de service proposées, en minutes
+SERVICE_DURATIONS = [30, 30, 45, 60, 60, 90, 120]
+# Pas de la grille des rendez-vous, en minutes
+GRID_MINUTES = 30
+
+
+class Command(BaseCommand):
+    help = 'Génère des services, staff members, horaires, congés et rendez-vous en masse pour les tests de charge'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=10, help='Nombre de services (par défaut: 10)')
+        parser.add_argument('--staff', type=int, default=50, help='Nombre de staff members (par défaut: 50)')
+        parser.add_argument('--clients', type=int, default=5000, help='Nombre de clients (par défaut: 5000)')
+        parser.add_argument(
+            '--appointments',
+            type=int,
+            default=100000,
+            help='Nombre de rendez-vous (par défaut: 100000)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=180,
+            help='Horizon en jours sur lequel les rendez-vous sont répartis (par défaut: 180)'
+        )
+        parser.add_argument(
+            '--start-date',
+            default=None,
+            help='Premier jour de l\'horizon au format AAAA-MM-JJ (par défaut: aujourd\'hui)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Nombre de lignes par bulk_create (par défaut: 5000)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Graine du générateur aléatoire (par défaut: 42)')
+        parser.add_argument(
+            '--prefix',
+            default='load',
+            help='Préfixe des données générées, pour les retrouver ou les supprimer (par défaut: load)'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Supprimer les données générées avec ce préfixe au lieu d\'en créer'
+        )
+
+    def handle(self, *args, **options):
+        for name in ('services', 'staff', 'clients', 'days', 'batch_size'):
+            if options[name] <= 0:
+                raise CommandError(f'--{name.replace("_", "-")} doit être supérieur à 0')
+        if options['appointments'] < 0:
+            raise CommandError('--appointments ne peut pas être négatif')
+        if options['start_date']:
+            try:
+                start_date = datetime.date.fromisoformat(options['start_date'])
+            except ValueError:
+                raise CommandError('Format de date invalide. Utilisez AAAA-MM-JJ (ex: 2030-01-07)')
+        else:
+            start_date = timezone.localdate()
+
+        self.prefix = options['prefix']
+        self.email_domain = f'{self.prefix}.example.com'
+        self.batch_size = options['batch_size']
+
+        if options['clear']:
+            self.clear()
+        else:
+            self.rng = random.Random(options['seed'])
+            self.generate(options, start_date)
+
+        # bulk_create et les suppressions en masse ne déclenchent pas les signaux d'invalidation
+        bump_availability_version()
+        bump_config_version()
+        rebuild_daily_stats()
+
+    @transaction.atomic
+    def clear(self):
+        user_model = get_user_model()
+        services = Service.objects.filter(name__startswith=f'[{self.prefix}] ')
+        # Les demandes, rendez-vous, horaires et congés sont supprimés en cascade
+        deleted_services, _ = services.delete()
+        deleted_users, _ = user_model.objects.filter(email__endswith=f'@{self.email_domain}').delete()
+        self.stdout.write(
+            self.style.SUCCESS(f'[TERMINE] {deleted_services + deleted_users} ligne(s) supprimée(s)')
+        )
+
+    def generate(self, options, start_date):
+        Config.objects.get_or_create(id=1, defaults={'slot_duration': GRID_MINUTES, 'lead_time': datetime.time(8),
+                                                     'finish_time': datetime.time(19), 'appointment_buffer_time': 0})
+        with transaction.atomic():
+            services = self.create_services(options['services'])
+            staff_members = self.create_staff_members(options['staff'], services)
+            schedules = self.create_schedules(staff_members, start_date, options['days'])
+            clients = self.create_users('client', options['clients'])
+        self.stdout.write(
+            f'{len(services)} service(s), {len(staff_members)} staff member(s), {len(clients)} client(s) créés'
+        )
+
+        created = self.create_appointments(options['appointments'], staff_members, schedules, clients)
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n[TERMINE]\n'
+                f'   Services: {len(services)}\n'
+                f'   Staff members: {len(staff_members)}\n'
+                f'   Clients: {len(clients)}\n'
+                f'   Rendez-vous: {created}\n'
+                f'   Horizon: {start_date} + {options["days"]} jour(s)\n'
+                f'   Graine: {options["seed"]}'
+            )
+        )
+        if created < options['appointments']:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Horaires saturés: {options["appointments"] - created} rendez-vous non créés. '
+                    f'Augmentez --staff ou --days.'
+                )
+            )
+
+    def create_services(self, count):
+        offset = Service.objects.filter(name__startswith=f'[{self.prefix}] ').count()
+        services = [
+            Service(
+                name=f'[{self.prefix}] Service {i + 1:04d}',
+                duration=datetime.timedelta(minutes=self.rng.choice(SERVICE_DURATIONS)),
+                price=Decimal(self.rng.randrange(10, 300)),
+                background_color=f'rgb({self.rng.randrange(256)}, {self.rng.randrange(256)}, '
+                                 f'{self.rng.randrange(256)})',
+            )
+            for i in range(offset, offset + count)
+        ]
+        Service.objects.bulk_create(services, batch_size=self.batch_size)
+        return list(Service.objects.filter(name__in=[service.name for service in services]).order_by('pk'))
+
+    def create_users(self, kind, count):
+        user_model = get_user_model()
+        with_username = username_in_user_model()
+        # Un seul hachage: les comptes générés ne peuvent pas se connecter
+        password = make_password(None)
+        offset = user_model.objects.filter(
+            email__startswith=f'{kind}-', email__endswith=f'@{self.email_domain}').count()
+        users = []
+        for i in range(offset, offset + count):
+            fields = {
+                'email': f'{kind}-{i + 1:07d}@{self.email_domain}',
+                'first_name': kind.capitalize(),
+                'last_name': f'{i + 1:07d}',
+                'password': password,
+            }
+            if with_username:
+                fields['username'] = f'{self.prefix}_{kind}_{i + 1:07d}'
+            users.append(user_model(**fields))
+        user_model.objects.bulk_create(users, batch_size=self.batch_size)
+        return list(user_model.objects.filter(email__in=[user.email for user in users]).order_by('pk'))
+
+    def create_staff_members(self, count, services):
+        users = self.create_users('staff', count)
+        staff_members = [
+            StaffMember(user=user, work_on_saturday=self.rng.random() < 0.3, work_on_sunday=self.rng.random() < 0.05)
+            for user in users
+        ]
+        StaffMember.objects.bulk_create(staff_members, batch_size=self.batch_size)
+        staff_members = list(StaffMember.objects.filter(user__in=users).order_by('pk'))
+
+        through = StaffMember.services_offered.through
+        links = []
+        self.services_by_staff = {}
+        for staff_member in staff_members:
+            offered = self.rng.sample(services, k=min(len(services), self.rng.randint(1, 3)))
+            self.services_by_staff[staff_member.pk] = offered
+            links.extend(through(staffmember_id=staff_member.pk, service_id=service.pk) for service in offered)
+        through.objects.bulk_create(links, batch_size=self.batch_size)
+        return staff_members
+
+    def create_schedules(self, staff_members, start_date, days):
+        """Crée les horaires et les congés, et retourne pour chaque staff member ses journées travaillées
+        sous la forme {staff_member_id: [(date, minute_debut, minute_fin), ...]}."""
+        working_hours, days_off, schedules = [], [], {}
+        for staff_member in staff_members:
+            # 0=Dimanche, 1=Lundi, ..., 6=Samedi
+            week = [1, 2, 3, 4, 5]
+            if staff_member.work_on_saturday:
+                week.append(6)
+            if staff_member.work_on_sunday:
+                week.append(0)
+            hours = {}
+            for day_of_week in week:
+                start = self.rng.choice([7, 8, 8, 9, 9, 10]) * 60
+                end = start + self.rng.choice([6, 8, 8, 9, 10]) * 60
+                hours[day_of_week] = (start, end)
+                working_hours.append(WorkingHours(
+                    staff_member=staff_member, day_of_week=day_of_week,
+                    start_time=datetime.time(start // 60), end_time=datetime.time(end // 60),
+                ))
+
+            # Environ une période de congé par mois, de 1 à 7 jours
+            off = set()
+            for _ in range(max(1, days // 30)):
+                first = start_date + datetime.timedelta(days=self.rng.randrange(days))
+                last = first + datetime.timedelta(days=self.rng.randrange(7))
+                if any(first + datetime.timedelta(days=d) in off for d in range((last - first).days + 1)):
+                    continue
+                off.update(first + datetime.timedelta(days=d) for d in range((last - first).days + 1))
+                days_off.append(DayOff(staff_member=staff_member, start_date=first, end_date=last,
+                                       description=f'[{self.prefix}]'))
+
+            schedule = []
+            for offset in range(days):
+                date = start_date + datetime.timedelta(days=offset)
+                day_of_week = (date.weekday() + 1) % 7
+                if day_of_week in hours and date not in off:
+                    schedule.append((date, *hours[day_of_week]))
+            schedules[staff_member.pk] = schedule
+
+        WorkingHours.objects.bulk_create(working_hours, batch_size=self.batch_size)
+        DayOff.objects.bulk_create(days_off, batch_size=self.batch_size)
+        return schedules
+
+    def create_appointments(self, count, staff_members, schedules, clients):
+        """Place les rendez-vous sur la grille de chaque journée travaillée, sans chevauchement, par lots."""
+        # Cases de GRID_MINUTES minutes déjà occupées, par (staff member, indice de la journée)
+        occupied = {}
+        days = [(staff_member, index) for staff_member in staff_members
+                for index in range(len(schedules[staff_member.pk]))]
+        if not days or not clients:
+            return 0
+
+        # Les id_request sont uniques: numéroter à la suite de ceux d'une génération précédente avec le même préfixe
+        offset = AppointmentRequest.objects.filter(id_request__startswith=self.prefix).count()
+        created, attempts, max_attempts = 0, 0, count * 20
+        requests, appointments = [], []
+        while created + len(requests) < count and attempts < max_attempts:
+            attempts += 1
+            staff_member, index = self.rng.choice(days)
+            date, start, end = schedules[staff_member.pk][index]
+            service = self.rng.choice(self.services_by_staff[staff_member.pk])
+            cells = -(-int(service.duration.total_seconds() // 60) // GRID_MINUTES)
+            if start + cells * GRID_MINUTES > end:
+                continue
+            first_cell = self.rng.randrange((end - start) // GRID_MINUTES - cells + 1)
+            taken = occupied.setdefault((staff_member.pk, index), set())
+            wanted = range(first_cell, first_cell + cells)
+            if any(cell in taken for cell in wanted):
+                continue
+            taken.update(wanted)
+
+            start_minute = start + first_cell * GRID_MINUTES
+            end_minute = start_minute + int(service.duration.total_seconds() // 60)
+            id_request = f'{self.prefix}{offset + created + len(requests):010d}{self.rng.getrandbits(64):016x}'
+            requests.append(AppointmentRequest(
+                date=date,
+                start_time=datetime.time(start_minute // 60, start_minute % 60),
+                end_time=datetime.time(end_minute // 60, end_minute % 60),
+                service=service,
+                staff_member=staff_member,
+                id_request=id_request,
+            ))
+            appointments.append(Appointment(
+                client=self.rng.choice(clients),
+                want_reminder=self.rng.random() < 0.5,
+                paid=self.rng.random() < 0.4,
+                amount_to_pay=service.price,
+                id_request=id_request,
+            ))
+            if len(requests) >= self.batch_size:
+                created += self.flush(requests, appointments)
+                requests, appointments = [], []
+        if requests:
+            created += self.flush(requests, appointments)
+        return created
+
+    @transaction.atomic
+    def flush(self, requests, appointments):
+        AppointmentRequest.objects.bulk_create(requests)
+        if any(request.pk is None for request in requests):
+            # Base de données sans RETURNING: retrouver les clés par id_request
+            pks = dict(AppointmentRequest.objects.filter(
+                id_request__in=[request.id_request for request in requests]).values_list('id_request', 'pk'))
+            for request in requests:
+                request.pk = pks[request.id_request]
+        for request, appointment in zip(requests, appointments):
+            appointment.appointment_request = request
+            appointment.search_document = appointment.get_search_document()
+        Appointment.objects.bulk_create(appointments)
+        if all(appointment.pk is not None for appointment in appointments):
+            index_appointments(appointments)
+        self.stdout.write(f'  {len(appointments)} rendez-vous créés')
+        return len(appointments)
@@ -0,0 +1,22 @@
+# Path: appointment/management/commands/prune_tombstones.py
+
+"""
+Commande Django pour supprimer les traces des rendez-vous supprimés (AppointmentTombstone) plus anciennes que
+APPOINTMENT_TOMBSTONE_RETENTION_DAYS.
+Usage: python manage.py prune_tombstones
+
+Les calendriers synchronisés par l'endpoint des changements lisent ces traces; un curseur plus ancien que la durée de
+conservation recharge tout le calendrier. La commande est à lancer chaque nuit, avec rebuild_daily_stats.
+"""
+
+from django.core.management.base import BaseCommand
+
+from appointment.services import prune_appointment_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Supprime les traces des rendez-vous supprimés plus anciennes que la durée de conservation'
+
+    def handle(self, *args, **options):
+        deleted = prune_appointment_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'[TERMINE] {deleted} trace(s) de rendez-vous supprimée(s)'))
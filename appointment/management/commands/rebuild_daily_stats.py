@@ -0,0 +1,38 @@
+# Path: appointment/management/commands/rebuild_daily_stats.py
+
+"""
+Commande Django pour recalculer la table des cumuls journaliers (DailyAppointmentStats) lue par le dashboard admin.
+Usage: python manage.py rebuild_daily_stats
+       python manage.py rebuild_daily_stats --days 7
+
+Les signaux tiennent la table à jour à chaque rendez-vous; cette commande, lancée chaque nuit, corrige les écarts
+laissés par les modifications qui ne passent pas par l'ORM (update(), SQL brut, restauration d'une sauvegarde).
+"""
+
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from appointment.utils.daily_stats import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les cumuls journaliers de rendez-vous lus par le dashboard admin'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help="Ne recalcule que les N derniers jours et les jours à venir (par défaut: tout l'historique)"
+        )
+
+    def handle(self, *args, **options):
+        start = None
+        if options['days'] is not None:
+            if options['days'] <= 0:
+                raise CommandError('--days doit être supérieur à 0')
+            start = timezone.localdate() - datetime.timedelta(days=options['days'])
+        rows = rebuild_daily_stats(start=start)
+        self.stdout.write(self.style.SUCCESS(f'[TERMINE] {rows} ligne(s) de statistiques recalculée(s)'))
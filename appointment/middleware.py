@@ -0,0 +1,202 @@
+# middleware.py
+# Path: appointment/middleware.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+
+from appointment.settings import (
+    APPOINTMENT_METRICS_ENABLED, APPOINTMENT_QUERY_INSPECTOR_ENABLED, APPOINTMENT_QUERY_INSPECTOR_FILE,
+    APPOINTMENT_REPEATED_QUERY_THRESHOLD, APPOINTMENT_SLOW_QUERY_MS, APPOINTMENT_TRACING_ENABLED,
+    APPOINTMENT_TRACING_FILE
+)
+from appointment.utils import metrics, query_inspector
+from appointment.utils.config_cache import ConfigVersionCheck, config_version_check
+from appointment.utils.tracing import export_trace, instrument, record_trace
+
+
+class ConfigVersionMiddleware:
+    """Check the configuration version stamp at most once per request.
+
+    Every worker keeps its own copy of the Config row. The middleware only starts a new check for the request: the
+    first read of the configuration checks the shared stamp, which makes a change saved by any worker visible
+    everywhere from the next request on, and the later reads don't query. A request that never reads the
+    configuration (login, contact, metrics, ...) costs no query at all.
+
+    The middleware runs in both modes, so that under ASGI the async views aren't sent to a worker thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = config_version_check.set(ConfigVersionCheck())
+        try:
+            return self.get_response(request)
+        finally:
+            config_version_check.reset(token)
+
+    async def __acall__(self, request):
+        token = config_version_check.set(ConfigVersionCheck())
+        try:
+            return await self.get_response(request)
+        finally:
+            config_version_check.reset(token)
+
+
+class TracingMiddleware:
+    """Record a trace of each request: the SQL queries, the templates rendered, the slot computations and the emails
+    sent, as nested spans appended to the APPOINTMENT_TRACING_FILE JSONL file in the OpenTelemetry (OTLP/JSON) format.
+
+    When APPOINTMENT_TRACING_ENABLED is off, Django drops the middleware at startup and the instrumented code only
+    checks that no trace is being recorded.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not APPOINTMENT_TRACING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        instrument()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_trace(request.method, APPOINTMENT_TRACING_FILE, **self.get_request_attributes(request)) as root:
+            response = self.get_response(request)
+            self.set_response_attributes(root, request, response)
+        return response
+
+    async def __acall__(self, request):
+        try:
+            with record_trace(request.method, **self.get_request_attributes(request)) as root:
+                response = await self.get_response(request)
+                self.set_response_attributes(root, request, response)
+        finally:
+            if APPOINTMENT_TRACING_FILE:
+                # Written from a thread, as the file would block the event loop
+                await sync_to_async(export_trace, thread_sensitive=False)(root.trace, APPOINTMENT_TRACING_FILE)
+        return response
+
+    @staticmethod
+    def get_request_attributes(request) -> dict:
+        return {'http.request.method': request.method, 'url.path': request.path}
+
+    @staticmethod
+    def set_response_attributes(root, request, response):
+        match = request.resolver_match
+        if match:
+            # Name the span after the route and not the path, as OpenTelemetry does, so that requests group together
+            root.name = f'{request.method} {match.route}'
+            root.set_attribute('http.route', match.route)
+            root.set_attribute('django.view', match.view_name)
+        root.set_attribute('http.response.status_code', response.status_code)
+
+
+class MetricsMiddleware:
+    """Record the latency and the number of SQL queries of each request, by view, for the /metrics endpoint.
+
+    When APPOINTMENT_METRICS_ENABLED is off, Django drops the middleware at startup.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not APPOINTMENT_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        metrics.instrument()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = [0]
+        token = metrics.request_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.request_queries.reset(token)
+        self.record(request, response, time.perf_counter() - start, queries[0])
+        return response
+
+    async def __acall__(self, request):
+        queries = [0]
+        token = metrics.request_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.request_queries.reset(token)
+        self.record(request, response, time.perf_counter() - start, queries[0])
+        return response
+
+    @staticmethod
+    def record(request, response, duration: float, queries: int):
+        # The name of the URL and not the path, so that the number of series stays bounded
+        view = request.resolver_match.view_name if request.resolver_match else 'unmatched'
+        metrics.REQUEST_DURATION.observe(duration, view=view, method=request.method, status=response.status_code)
+        metrics.REQUEST_QUERIES.observe(queries, view=view)
+
+
+class QueryInspectorMiddleware:
+    """Time the SQL queries of each request and report the slow ones (over APPOINTMENT_SLOW_QUERY_MS) and the ones
+    repeated APPOINTMENT_REPEATED_QUERY_THRESHOLD times or more with different parameters (the N+1 pattern), with the
+    line of the application that ran them.
+
+    The reports go to the logs and to the rotating APPOINTMENT_QUERY_INSPECTOR_FILE, listed by an admin page. When
+    APPOINTMENT_QUERY_INSPECTOR_ENABLED is off, Django drops the middleware at startup.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not APPOINTMENT_QUERY_INSPECTOR_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        query_inspector.instrument()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inspection = query_inspector.QueryInspection(APPOINTMENT_SLOW_QUERY_MS, APPOINTMENT_REPEATED_QUERY_THRESHOLD)
+        token = query_inspector.request_inspection.set(inspection)
+        try:
+            return self.get_response(request)
+        finally:
+            query_inspector.request_inspection.reset(token)
+            self.report(inspection, request)
+
+    async def __acall__(self, request):
+        inspection = query_inspector.QueryInspection(APPOINTMENT_SLOW_QUERY_MS, APPOINTMENT_REPEATED_QUERY_THRESHOLD)
+        token = query_inspector.request_inspection.set(inspection)
+        try:
+            return await self.get_response(request)
+        finally:
+            query_inspector.request_inspection.reset(token)
+            self.report(inspection, request)
+
+    @staticmethod
+    def report(inspection, request):
+        report = inspection.get_report(request)
+        if report:
+            query_inspector.write_report(report, APPOINTMENT_QUERY_INSPECTOR_FILE)
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0002_change_currency_default_to_mru'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appointment_id', models.PositiveBigIntegerField(verbose_name='Appointment ID')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Deleted At')),
+            ],
+            options={
+                'verbose_name': 'Appointment Tombstone',
+                'verbose_name_plural': 'Appointment Tombstones',
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['updated_at'], name='appointment_updated_91922c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentrequest',
+            index=models.Index(fields=['updated_at'], name='appointment_updated_bfb78f_idx'),
+        ),
+        migrations.AddField(
+            model_name='appointmenttombstone',
+            name='staff_member',
+            field=models.ForeignKey(blank=True, help_text='The staff member whose calendar the appointment left.', null=True, on_delete=django.db.models.deletion.CASCADE, to='appointment.staffmember', verbose_name='Staff Member'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmenttombstone',
+            index=models.Index(fields=['staff_member', 'deleted_at'], name='appointment_staff_m_1dcc2c_idx'),
+        ),
+    ]
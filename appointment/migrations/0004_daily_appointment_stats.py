@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_daily_appointment_stats(apps, schema_editor):
+    Appointment = apps.get_model('appointment', 'Appointment')
+    DailyAppointmentStats = apps.get_model('appointment', 'DailyAppointmentStats')
+    rows = Appointment.objects.values(
+        'appointment_request__date', 'appointment_request__service_id', 'appointment_request__staff_member_id'
+    ).annotate(count=Count('id')).order_by()
+    DailyAppointmentStats.objects.bulk_create([
+        DailyAppointmentStats(date=row['appointment_request__date'], service_id=row['appointment_request__service_id'],
+                              staff_member_id=row['appointment_request__staff_member_id'], count=row['count'])
+        for row in rows.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0003_appointment_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAppointmentStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Count')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='appointment.service', verbose_name='Service')),
+                ('staff_member', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='appointment.staffmember', verbose_name='Staff Member')),
+            ],
+            options={
+                'verbose_name': 'Daily Appointment Statistics',
+                'verbose_name_plural': 'Daily Appointment Statistics',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'service', 'staff_member'), name='unique_daily_appointment_stats')],
+            },
+        ),
+        migrations.RunPython(fill_daily_appointment_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0004_daily_appointment_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appointmentrequest',
+            name='appointment_date_eff862_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appointmentrequest',
+            index=models.Index(fields=['date', 'start_time', 'id'], name='appointment_date_ba117b_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:52
+
+import re
+
+from django.db import migrations, models
+
+from appointment.utils.search import (
+    POSTGRES_SEARCH_INDEX, SQLITE_SEARCH_TABLE, get_search_vector, uses_sqlite_search_table
+)
+
+
+def fill_search_documents(apps, schema_editor):
+    Appointment = apps.get_model('appointment', 'Appointment')
+    appointments = []
+    for appointment in Appointment.objects.select_related('client', 'appointment_request__service').iterator():
+        words = []
+        if appointment.client:
+            email = appointment.client.email or ""
+            words += [appointment.client.first_name, appointment.client.last_name, email, re.sub(r'\W+', ' ', email)]
+        words.append(appointment.appointment_request.service.name)
+        appointment.search_document = " ".join(word.strip() for word in words if word and word.strip()).lower()
+        appointments.append(appointment)
+    Appointment.objects.bulk_update(appointments, ['search_document'], batch_size=500)
+
+
+def create_search_index(apps, schema_editor):
+    """PostgreSQL indexes the tsvector of the document with GIN; SQLite keeps it in an FTS5 table, filled by the
+    signals. The other databases have no full-text index and scan the column."""
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+
+        Appointment = apps.get_model('appointment', 'Appointment')
+        schema_editor.add_index(Appointment, GinIndex(get_search_vector(), name=POSTGRES_SEARCH_INDEX))
+    elif uses_sqlite_search_table(connection):
+        schema_editor.execute(f'CREATE VIRTUAL TABLE {SQLITE_SEARCH_TABLE} USING fts5(search_document)')
+        schema_editor.execute(f'INSERT INTO {SQLITE_SEARCH_TABLE} (rowid, search_document) '
+                              f'SELECT id, search_document FROM appointment_appointment')
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {POSTGRES_SEARCH_INDEX}')
+    elif uses_sqlite_search_table(connection):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0005_appointment_list_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, help_text='The name and email of the client and the name of the service, indexed for the appointment search.', verbose_name='Search Document'),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:05
+
+import secrets
+import time
+
+from django.db import migrations
+from django.db.models import Count, Q
+
+MODELS = ['AppointmentRequest', 'Appointment', 'AppointmentRescheduleHistory']
+CROCKFORD_BASE32 = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+
+def generate_request_id():
+    """A ULID, as appointment.utils.view_helpers.generate_request_id made them when this migration was written: the
+    creation time in milliseconds (48 bits) followed by 80 random bits, in 26 characters of Crockford's base 32."""
+    value = (int(time.time() * 1000) << 80) | secrets.randbits(80)
+    return ''.join(CROCKFORD_BASE32[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+
+def backfill_id_request(apps, schema_editor):
+    """Give an identifier to the rows without one, and a new one to all but the oldest row sharing an identifier, so
+    that the column can become unique. The existing unique identifiers are kept: the links already sent by email
+    keep working."""
+    for model_name in MODELS:
+        model = apps.get_model('appointment', model_name)
+        duplicates = model.objects.exclude(Q(id_request__isnull=True) | Q(id_request='')).values(
+            'id_request').annotate(count=Count('id')).filter(count__gt=1).values_list('id_request', flat=True)
+        rows = []
+        for id_request in duplicates:
+            rows += list(model.objects.filter(id_request=id_request).order_by('pk')[1:])
+        rows += list(model.objects.filter(Q(id_request__isnull=True) | Q(id_request='')))
+        for row in rows:
+            row.id_request = generate_request_id()
+        model.objects.bulk_update(rows, ['id_request'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0006_appointment_search_document'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_id_request, migrations.RunPython.noop),
+    ]
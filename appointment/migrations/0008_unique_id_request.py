@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0007_backfill_id_request'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='id_request',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True, verbose_name='Request ID'),
+        ),
+        migrations.AlterField(
+            model_name='appointmentrequest',
+            name='id_request',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True, verbose_name='Request ID'),
+        ),
+        migrations.AlterField(
+            model_name='appointmentreschedulehistory',
+            name='id_request',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True, verbose_name='Request ID'),
+        ),
+    ]
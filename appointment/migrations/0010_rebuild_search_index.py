@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:02
+
+import sqlite3
+
+from django.db import migrations
+
+# Copied from appointment/utils/search.py, so that this migration keeps working whatever becomes of that module
+SQLITE_SEARCH_TABLE = 'appointment_appointment_search'
+POSTGRES_SEARCH_INDEX = 'appointment_search_gin'
+
+
+def uses_sqlite_search_table(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE probe USING fts5(text)')
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def rebuild_search_index(apps, schema_editor):
+    """Recreate the search index of migration 0006 from the definitions above, so that it no longer depends on the
+    ones of appointment/utils/search.py at the time 0006 ran."""
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        Appointment = apps.get_model('appointment', 'Appointment')
+        schema_editor.execute(f'DROP INDEX IF EXISTS {POSTGRES_SEARCH_INDEX}')
+        schema_editor.add_index(Appointment, GinIndex(SearchVector('search_document', config='simple'),
+                                                      name=POSTGRES_SEARCH_INDEX))
+    elif uses_sqlite_search_table(connection):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_SEARCH_TABLE}')
+        schema_editor.execute(f'CREATE VIRTUAL TABLE {SQLITE_SEARCH_TABLE} USING fts5(search_document)')
+        schema_editor.execute(f'INSERT INTO {SQLITE_SEARCH_TABLE} (rowid, search_document) '
+                              f'SELECT id, search_document FROM appointment_appointment')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0009_cache_version'),
+    ]
+
+    operations = [
+        # Going back leaves the index in place: migration 0006 drops it
+        migrations.RunPython(rebuild_search_index, migrations.RunPython.noop),
+    ]
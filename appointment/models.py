@@ -8,6 +8,7 @@ Since: 1.0.0
 import colorsys
 import datetime
 import random
+import re
 import string
 import uuid
 
@@ -21,9 +22,10 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _, ngettext
 from phonenumber_field.modelfields import PhoneNumberField
 
-from appointment.utils.date_time import convert_minutes_in_human_readable_format, get_timestamp, get_weekday_num, \
-    time_difference
-from appointment.utils.view_helpers import generate_random_id, get_locale
+from appointment.utils.config_cache import get_cached_config
+from appointment.utils.date_time import convert_minutes_in_human_readable_format, get_weekday_num, time_difference
+from appointment.utils.day_bitmap import DayBitmap, minute_of
+from appointment.utils.view_helpers import generate_request_id, get_locale
 
 PAYMENT_TYPES = (
     ('full', _('Full payment')),
@@ -267,7 +269,7 @@ class StaffMember(models.Model):
         return f"{self.get_staff_member_name()}"
 
     def get_slot_duration(self):
-        config = Config.objects.first()
+        config = get_cached_config()
         return self.slot_duration or (config.slot_duration if config else 0)
 
     def get_slot_duration_text(self):
@@ -275,11 +277,11 @@ class StaffMember(models.Model):
         return convert_minutes_in_human_readable_format(slot_duration)
 
     def get_lead_time(self):
-        config = Config.objects.first()
+        config = get_cached_config()
         return self.lead_time or (config.lead_time if config else None)
 
     def get_finish_time(self):
-        config = Config.objects.first()
+        config = get_cached_config()
         return self.finish_time or (config.finish_time if config else None)
 
     def works_on_both_weekends_day(self):
@@ -345,7 +347,7 @@ class StaffMember(models.Model):
         return self.services_offered.filter(id=service_id).exists()
 
     def get_appointment_buffer_time(self):
-        config = Config.objects.first()
+        config = get_cached_config()
         return self.appointment_buffer_time or (config.appointment_buffer_time if config else 0)
 
     def get_appointment_buffer_time_text(self):
@@ -393,7 +395,7 @@ class AppointmentRequest(models.Model):
         default='full',
         verbose_name=_("Payment Type")
     )
-    id_request = models.CharField(max_length=100, blank=True, null=True, verbose_name=_("Request ID"))
+    id_request = models.CharField(max_length=100, unique=True, blank=True, null=True, verbose_name=_("Request ID"))
     reschedule_attempts = models.PositiveIntegerField(
         default=0,
         verbose_name=_("Reschedule Attempts"),
@@ -409,8 +411,10 @@ class AppointmentRequest(models.Model):
         verbose_name_plural = _("Appointment Requests")
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['date', 'start_time']),
+            # The order of the appointment lists, whose keyset pagination ends with the id
+            models.Index(fields=['date', 'start_time', 'id']),
             models.Index(fields=['staff_member', 'date']),
+            models.Index(fields=['updated_at']),
         ]
 
     def __str__(self):
@@ -436,7 +440,7 @@ class AppointmentRequest(models.Model):
 
         # if no id_request is provided, generate one
         if self.id_request is None or self.id_request == "":
-            self.id_request = f"{get_timestamp()}{self.service.id}{generate_random_id()}"
+            self.id_request = generate_request_id()
         # start time should not be equal to end time
         if self.start_time == self.end_time:
             raise ValidationError(_("Start time and end time cannot be the same"))
@@ -531,7 +535,7 @@ class AppointmentRescheduleHistory(models.Model):
         verbose_name=_("Reschedule Status"),
         help_text=_("Indicates the status of the reschedule action.")
     )
-    id_request = models.CharField(max_length=100, blank=True, null=True, verbose_name=_("Request ID"),)
+    id_request = models.CharField(max_length=100, unique=True, blank=True, null=True, verbose_name=_("Request ID"))
 
     # meta data
     created_at = models.DateTimeField(
@@ -555,8 +559,8 @@ class AppointmentRescheduleHistory(models.Model):
 
     def save(self, *args, **kwargs):
         # if no id_request is provided, generate one
-        if self.id_request is None:
-            self.id_request = f"{get_timestamp()}{generate_random_id()}"
+        if not self.id_request:
+            self.id_request = generate_request_id()
         # date should not be in the past
         if self.date < datetime.date.today():
             raise ValidationError(_("Date cannot be in the past"))
@@ -625,7 +629,12 @@ class Appointment(models.Model):
         help_text=_("The amount to be paid for the appointment. "
                     "If 0, it means the appointment is free or already paid.")
     )
-    id_request = models.CharField(max_length=100, blank=True, null=True, verbose_name=_("Request ID"))
+    id_request = models.CharField(max_length=100, unique=True, blank=True, null=True, verbose_name=_("Request ID"))
+    search_document = models.TextField(
+        blank=True, default="", editable=False,
+        verbose_name=_("Search Document"),
+        help_text=_("The name and email of the client and the name of the service, indexed for the appointment search.")
+    )
 
     # meta datas
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
@@ -637,6 +646,7 @@ class Appointment(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['client', '-created_at']),
+            models.Index(fields=['updated_at']),
         ]
         constraints = [
             models.CheckConstraint(
@@ -650,12 +660,15 @@ class Appointment(models.Model):
                f"{self.appointment_request.start_time.strftime('%Y-%m-%d %H:%M')} to " \
                f"{self.appointment_request.end_time.strftime('%Y-%m-%d %H:%M')}"
 
+    # The fields the search document is built from: saving any of them builds it again
+    SEARCH_DOCUMENT_FIELDS = frozenset({'client', 'client_id', 'appointment_request', 'appointment_request_id'})
+
     def save(self, *args, **kwargs):
         if not hasattr(self, 'appointment_request'):
             raise ValidationError("Appointment request is required")
 
-        if self.id_request is None:
-            self.id_request = f"{get_timestamp()}{self.appointment_request.id}{generate_random_id()}"
+        if not self.id_request:
+            self.id_request = generate_request_id()
         if self.amount_to_pay is None or self.amount_to_pay == 0:
             payment_type = self.appointment_request.payment_type
             if payment_type == 'full':
@@ -664,8 +677,23 @@ class Appointment(models.Model):
                 self.amount_to_pay = self.appointment_request.get_service_down_payment()
             else:
                 self.amount_to_pay = 0
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or not self.SEARCH_DOCUMENT_FIELDS.isdisjoint(update_fields):
+            self.search_document = self.get_search_document()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_document'}
         return super().save(*args, **kwargs)
 
+    def get_search_document(self):
+        """The words an appointment is searched by, in lowercase: the client's first name, last name and email (also
+        split into words, so that searching 'example' finds 'jane@example.com') and the service name."""
+        words = []
+        if self.client:
+            email = self.client.email or ""
+            words += [self.client.first_name, self.client.last_name, email, re.sub(r'\W+', ' ', email)]
+        words.append(self.appointment_request.service.name)
+        return " ".join(word.strip() for word in words if word and word.strip()).lower()
+
     def get_client_name(self):
         if hasattr(self.client, 'get_full_name') and callable(getattr(self.client, 'get_full_name')):
             name = self.client.get_full_name()
@@ -772,21 +800,25 @@ class Appointment(models.Model):
             message = _("{staff_member} does not work on this day.").format(staff_member=sm_name)
             return False, message
 
-        # Check if the start time falls within the staff member's working hours
-        if not (working_hours.start_time <= start_time.time() <= working_hours.end_time):
+        # Check if the start time falls within the staff member's working hours (both bounds included)
+        start_minute = minute_of(start_time)
+        working_minutes = DayBitmap.from_range(minute_of(working_hours.start_time),
+                                               minute_of(working_hours.end_time) + 1)
+        if start_minute not in working_minutes:
             message = _("The appointment start time is outside of {staff_member}'s working hours.").format(
                 staff_member=sm_name)
             return False, message
 
-        # Check if the staff member already has an appointment on the given date and time
-        # Using prefetch_related to reduce DB hits when accessing related objects
-        appt_list = Appointment.objects.filter(appointment_request__staff_member=staff_member,
-                                               appointment_request__date=appt_date).exclude(
-            id=current_appointment_id).prefetch_related('appointment_request')
-        for appt in appt_list:
-            if appt.appointment_request.start_time <= start_time.time() <= appt.appointment_request.end_time:
-                message = _("{staff_member} already has an appointment at this time.").format(staff_member=sm_name)
-                return False, message
+        # Check if the staff member already has an appointment on the given date and time (both bounds included)
+        booked_minutes = DayBitmap()
+        for appt_start, appt_end in Appointment.objects.filter(
+                appointment_request__staff_member=staff_member, appointment_request__date=appt_date
+        ).exclude(id=current_appointment_id).values_list('appointment_request__start_time',
+                                                         'appointment_request__end_time'):
+            booked_minutes.add(minute_of(appt_start), minute_of(appt_end) + 1)
+        if start_minute in booked_minutes:
+            message = _("{staff_member} already has an appointment at this time.").format(staff_member=sm_name)
+            return False, message
 
         # Check if the staff member has a day off on the appointment's date
         days_off = DayOff.objects.filter(staff_member=staff_member, start_date__lte=appt_date, end_date__gte=appt_date)
@@ -1166,3 +1198,78 @@ class WorkingHours(models.Model):
 
     def is_owner(self, user_id):
         return self.staff_member.user.id == user_id
+
+
+class AppointmentTombstone(models.Model):
+    """
+    Records that an appointment was deleted, or moved away from a staff member, so that the calendars kept in sync
+    through the changes-since endpoint can drop it.
+
+    Author: Adams Pierre David
+    Since: 3.10.0
+    """
+    appointment_id = models.PositiveBigIntegerField(verbose_name=_("Appointment ID"))
+    staff_member = models.ForeignKey(
+        StaffMember, on_delete=models.CASCADE, null=True, blank=True,
+        verbose_name=_("Staff Member"),
+        help_text=_("The staff member whose calendar the appointment left.")
+    )
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name=_("Deleted At"))
+
+    class Meta:
+        verbose_name = _("Appointment Tombstone")
+        verbose_name_plural = _("Appointment Tombstones")
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['staff_member', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"Appointment {self.appointment_id} deleted at {self.deleted_at}"
+
+
+class DailyAppointmentStats(models.Model):
+    """
+    Number of appointments per date, service and staff member, kept up to date by signals (see signals.py) and
+    rebuilt by the rebuild_daily_stats command. The admin dashboard reads its statistics from this table, whose size
+    depends on the number of days, services and staff members instead of the number of appointments.
+
+    Author: Adams Pierre David
+    Since: 3.10.0
+    """
+    date = models.DateField(verbose_name=_("Date"))
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, verbose_name=_("Service"))
+    staff_member = models.ForeignKey(StaffMember, on_delete=models.SET_NULL, null=True, blank=True,
+                                     verbose_name=_("Staff Member"))
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Count"))
+
+    class Meta:
+        verbose_name = _("Daily Appointment Statistics")
+        verbose_name_plural = _("Daily Appointment Statistics")
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'service', 'staff_member'], name='unique_daily_appointment_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.service_id} - {self.staff_member_id}: {self.count}"
+
+
+class CacheVersion(models.Model):
+    """
+    Version counters of the cached data (the slot lists of each staff member, the configuration), kept in the
+    database so that every worker reads the same ones. The cached entries stay in the local cache of each process: their
+    keys include the version, so a bump in any process makes every process stop reading the previous entries.
+
+    Author: Adams Pierre David
+    Since: 3.10.0
+    """
+    key = models.CharField(max_length=100, unique=True, verbose_name=_("Key"))
+    version = models.PositiveBigIntegerField(default=0, verbose_name=_("Version"))
+
+    class Meta:
+        verbose_name = _("Cache Version")
+        verbose_name_plural = _("Cache Versions")
+
+    def __str__(self):
+        return f"{self.key}: {self.version}"
@@ -7,6 +7,7 @@ Since: 2.0.0
 """
 
 import datetime
+import math
 
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
@@ -17,16 +18,22 @@ from django.utils.translation import gettext as _, gettext_lazy as _
 
 from appointment.forms import PersonalInformationForm, ServiceForm, StaffDaysOffForm, StaffWorkingHoursForm
 from appointment.messages_ import appt_updated_successfully
-from appointment.settings import APPOINTMENT_PAYMENT_URL
+from appointment.models import AppointmentTombstone
+from appointment.settings import (
+    APPOINTMENT_PAYMENT_URL, APPOINTMENT_SLOTS_RANGE_MAX_DAYS, APPOINTMENT_TOMBSTONE_RETENTION_DAYS
+)
+from appointment.utils.availability_cache import get_or_compute_slots
 from appointment.utils.date_time import (
     convert_12_hour_time_to_24_hour_time, convert_str_to_date, convert_str_to_time, get_ar_end_time)
+from appointment.utils.day_bitmap import DayBitmap, get_free_slot_starts, minute_of, time_of
 from appointment.utils.db_helpers import (
     Appointment, AppointmentRequest, EmailVerificationCode, Service, StaffMember, WorkingHours, calculate_slots,
-    calculate_staff_slots, check_day_off_for_staff, create_and_save_appointment, create_new_user,
-    day_off_exists_for_date_range, exclude_booked_slots, exclude_pending_reschedules, get_all_appointments,
+    check_day_off_for_staff, create_and_save_appointment, create_new_user,
+    day_off_exists_for_date_range, exclude_booked_slots, get_all_appointments,
     get_all_staff_members,
-    get_appointment_by_id, get_appointments_for_date_and_time, get_staff_member_appointment_list,
-    get_staff_member_from_user_id_or_logged_in, get_times_from_config, get_user_by_email,
+    get_appointment_by_id, get_pending_reschedule_intervals, get_staff_member_appointment_list,
+    get_staff_member_buffer_time, get_staff_member_from_user_id_or_logged_in, get_staff_member_slot_duration,
+    get_times_from_config, get_user_by_email,
     get_weekday_num_from_date, get_working_hours_for_staff_and_day, parse_name, update_appointment_reminder,
     working_hours_exist)
 from appointment.utils.email_ops import send_reset_link_to_staff_member
@@ -34,6 +41,11 @@ from appointment.utils.error_codes import ErrorCode
 from appointment.utils.json_context import convert_appointment_to_json, get_generic_context, json_response
 from appointment.utils.permissions import check_entity_ownership
 from appointment.utils.session import handle_email_change
+from appointment.utils.staff_schedule import StaffScheduleSnapshot
+from appointment.utils.tracing import traced
+
+# How far back each delta sync looks before its cursor
+APPOINTMENT_CHANGES_CURSOR_OVERLAP = datetime.timedelta(seconds=5)
 
 
 def fetch_user_appointments(user):
@@ -54,6 +66,73 @@ def fetch_user_appointments(user):
     raise ValueError("User is not a staff member or a superuser")
 
 
+def fetch_user_appointments_for_window(user, start_date, end_date):
+    """Fetch the appointments of a given user between two dates, for the calendar.
+
+    The client, the service and the staff member's user are loaded in the same query, so serializing the
+    appointments doesn't cost a query per row.
+
+    :param user: The user instance.
+    :param start_date: The first date of the window.
+    :param end_date: The date following the last date of the window (half-open range).
+    :return: The appointments ordered by date and start time.
+    """
+    appointments = fetch_user_appointments(user)
+    if isinstance(appointments, list):
+        return appointments
+    return select_calendar_event_related(appointments.filter(
+        appointment_request__date__gte=start_date, appointment_request__date__lt=end_date
+    ))
+
+
+def fetch_user_appointment_changes(user, since):
+    """Fetch the appointments of a given user created, updated or deleted after a cursor, for the calendar.
+
+    An appointment changes when its row or its appointment request's row is updated (date, time, staff member...).
+    An appointment deleted, or given to another staff member, leaves a tombstone for the staff member it was shown to.
+
+    :param user: The user instance.
+    :param since: The cursor returned by the previous call, an aware datetime.
+    :return: A tuple (appointments, deleted_ids): the appointments changed since the cursor, and the ids of the
+             appointments to remove from the calendar.
+    """
+    appointments = fetch_user_appointments(user)
+    if isinstance(appointments, list):
+        return appointments, []
+    # A transaction that committed just after the previous cursor was taken may have stamped its rows a bit before
+    # it: sending a few rows twice is harmless, missing one is not.
+    since -= APPOINTMENT_CHANGES_CURSOR_OVERLAP
+    changed_ids = set(appointments.filter(updated_at__gt=since).values_list('pk', flat=True))
+    changed_ids.update(appointments.filter(appointment_request__updated_at__gt=since).values_list('pk', flat=True))
+    changed = []
+    if changed_ids:
+        changed = select_calendar_event_related(appointments.filter(pk__in=changed_ids))
+
+    tombstones = AppointmentTombstone.objects.filter(deleted_at__gt=since)
+    if not user.is_superuser:
+        tombstones = tombstones.filter(staff_member__user=user)
+    deleted_ids = set(tombstones.values_list('appointment_id', flat=True)) - changed_ids
+    return changed, sorted(deleted_ids)
+
+
+def prune_appointment_tombstones() -> int:
+    """Delete the tombstones older than APPOINTMENT_TOMBSTONE_RETENTION_DAYS, with one query.
+
+    A calendar whose cursor is older than that starts over from a full load, so it never needs them.
+
+    :return: The number of tombstones deleted.
+    """
+    expired = timezone.now() - datetime.timedelta(days=APPOINTMENT_TOMBSTONE_RETENTION_DAYS)
+    return AppointmentTombstone.objects.filter(deleted_at__lt=expired).delete()[0]
+
+
+def select_calendar_event_related(appointments):
+    """Load the client, the service and the staff member's user with the appointments, ordered for the calendar."""
+    return appointments.select_related(
+        'client', 'appointment_request__service', 'appointment_request__staff_member__user'
+    ).order_by('appointment_request__date', 'appointment_request__start_time')
+
+
 def prepare_appointment_display_data(user, appointment_id):
     """Prepare the data for the appointment details page.
 
@@ -410,6 +489,7 @@ def save_appt_date_time(appt_start_time, appt_date, appt_id, request):
     return appt
 
 
+@traced('slots.get_available_slots')
 def get_available_slots(date, appointments):
     """Calculate the available time slots for a given date and a list of appointments.
 
@@ -426,30 +506,161 @@ def get_available_slots(date, appointments):
     return [slot.strftime('%I:%M %p') for slot in slots]
 
 
-def get_available_slots_for_staff(date, staff_member, day_of_week: int):
+@traced('slots.get_available_slots_for_staff')
+def get_available_slots_for_staff(date, staff_member, day_of_week: int, snapshot=None):
     """Calculate the available time slots for a given date and a staff member.
 
+    The result is cached per staff member, date and slot duration under a version that the signals bump whenever
+    anything affecting the schedule of the staff member changes, so most calls don't touch the database.
+
     :param date: The date for which to calculate the available slots
     :param staff_member: The staff member for which to calculate the available slots
     :param day_of_week: The day of the week as an integer (0=Sunday, 6=Saturday).
+    :param snapshot: An optional StaffScheduleSnapshot covering the date, built on the fly when not given.
     :return: A list of available time slots as strings in the format '%I:%M %p' like ['10:00 AM', '10:30 AM']
     """
+    if snapshot is None:
+        snapshot = StaffScheduleSnapshot(staff_member, date)
+    # Read once per snapshot, before the schedule the slots are computed from
+    version = snapshot.availability_version
+    slot_duration = get_staff_member_slot_duration(staff_member, date, snapshot=snapshot)
+    return get_or_compute_slots(staff_member.pk, date, day_of_week, slot_duration,
+                                lambda: compute_available_slots_for_staff(date, staff_member, day_of_week, snapshot),
+                                version=version)
+
+
+def compute_available_slots_for_staff(date, staff_member, day_of_week: int, snapshot):
+    """Calculate the available time slots for a given date and a staff member, without the cache.
+
+    Everything is read from a StaffScheduleSnapshot, so the whole computation costs one query per table (working
+    hours, days off, appointments and pending reschedules) whatever the number of helpers involved. The day is then
+    laid out as minute bitmaps (working hours, booked and held minutes) and the slots are found with bit operations.
+
+    :param date: The date for which to calculate the available slots
+    :param staff_member: The staff member for which to calculate the available slots
+    :param day_of_week: The day of the week as an integer (0=Sunday, 6=Saturday).
+    :param snapshot: A StaffScheduleSnapshot covering the date.
+    :return: A list of available time slots
+    """
     # Check if the provided date is a day off for the staff member
-    days_off_exist = check_day_off_for_staff(staff_member=staff_member, date=date)
+    days_off_exist = check_day_off_for_staff(staff_member=staff_member, date=date, snapshot=snapshot)
     if days_off_exist:
         return []
 
     # Check if the staff member works on the provided date
-    working_hours_dict = get_working_hours_for_staff_and_day(staff_member, day_of_week)
+    working_hours_dict = get_working_hours_for_staff_and_day(staff_member, day_of_week, snapshot=snapshot)
     if not working_hours_dict:
         return []
 
-    slot_duration = datetime.timedelta(minutes=staff_member.get_slot_duration())
-    slots = calculate_staff_slots(date, staff_member)
-    slots = exclude_pending_reschedules(slots, staff_member, date)
-    appointments = get_appointments_for_date_and_time(date, working_hours_dict['start_time'],
-                                                      working_hours_dict['end_time'], staff_member)
-    return exclude_booked_slots(appointments, slots, slot_duration)
+    # The slots follow the working hours of the date itself, whatever day_of_week says
+    weekday_num = get_weekday_num_from_date(date)
+    if weekday_num != int(day_of_week):
+        working_hours_dict = get_working_hours_for_staff_and_day(staff_member, weekday_num, snapshot=snapshot)
+        if not working_hours_dict:
+            return []
+
+    start = minute_of(working_hours_dict['start_time'])
+    end = minute_of(working_hours_dict['end_time'])
+    slot_duration = int(get_staff_member_slot_duration(staff_member, date, snapshot=snapshot))
+    buffer_time = math.ceil(get_staff_member_buffer_time(staff_member, date, snapshot=snapshot))
+    booked = DayBitmap.from_intervals(snapshot.get_booked_intervals(date))
+    held = DayBitmap.from_intervals(get_pending_reschedule_intervals(staff_member, date, snapshot=snapshot))
+    slot_starts = get_free_slot_starts(DayBitmap.from_range(start, end), slot_duration, grid_start=start,
+                                       first_start=start + buffer_time, booked=booked, held=held)
+    return [datetime.datetime.combine(date, time_of(minute)) for minute in slot_starts]
+
+
+@traced('slots.get_available_slots_for_range')
+def get_available_slots_for_range(staff_member, start_date, end_date) -> dict:
+    """Calculate the available time slots of a staff member for every date between start_date and end_date.
+
+    The whole window is read through a single StaffScheduleSnapshot, so the cost is one query per table whatever the
+    number of days, instead of one round trip per day.
+
+    :param staff_member: The staff member for which to calculate the available slots.
+    :param start_date: The first date of the range.
+    :param end_date: The last date of the range (included).
+    :return: A dictionary mapping each date of the range to its list of available slots.
+    """
+    if (end_date - start_date).days >= APPOINTMENT_SLOTS_RANGE_MAX_DAYS:
+        raise ValueError(f"The date range cannot exceed {APPOINTMENT_SLOTS_RANGE_MAX_DAYS} days.")
+    snapshot = StaffScheduleSnapshot(staff_member, start_date, end_date)
+    slots_by_date = {}
+    date = start_date
+    while date <= end_date:
+        slots_by_date[date] = get_available_slots_for_staff(date, staff_member, get_weekday_num_from_date(date),
+                                                            snapshot=snapshot)
+        date += datetime.timedelta(days=1)
+    return slots_by_date
+
+
+def get_available_slots_for_service(service, date) -> list:
+    """Calculate the free time slots of a service on a date, across every staff member offering it.
+
+    The schedules of all the staff members are loaded together (one query per table for all of them), then each slot
+    is assigned to the free staff member with the most free slots that day, to spread the load.
+
+    :param service: The service to book.
+    :param date: The date for which to calculate the available slots.
+    :return: A list of dictionaries sorted by slot, each with the 'slot', the assigned 'staff_member' and every free
+        'staff_members'.
+    """
+    staff_members = list(StaffMember.objects.filter(services_offered=service).select_related('user').order_by('pk'))
+    snapshots = StaffScheduleSnapshot.for_staff_members(staff_members, date)
+    day_of_week = get_weekday_num_from_date(date)
+
+    free_staff_by_slot = {}
+    free_slot_count = {}
+    for staff_member in staff_members:
+        slots = get_available_slots_for_staff(date, staff_member, day_of_week, snapshot=snapshots[staff_member.pk])
+        free_slot_count[staff_member.pk] = len(slots)
+        for slot in slots:
+            free_staff_by_slot.setdefault(slot, []).append(staff_member)
+
+    return [{
+        'slot': slot,
+        'staff_member': max(free_staff, key=lambda sm: (free_slot_count[sm.pk], -sm.pk)),
+        'staff_members': free_staff,
+    } for slot, free_staff in sorted(free_staff_by_slot.items())]
+
+
+def get_next_available_date(staff_member, start_date=None, max_days: int = 365):
+    """Find the first date, from start_date on, on which the staff member has at least one free slot.
+
+    The search loads the schedule window by window (APPOINTMENT_SLOTS_RANGE_MAX_DAYS days at a time), so it costs a
+    few queries per window instead of several per day. Non-working days are skipped from the weekly working hours and
+    days off are jumped over in one step.
+
+    :param staff_member: The staff member for which to search.
+    :param start_date: The first date to consider, today by default.
+    :param max_days: The number of days to search.
+    :return: The first available date, or None if there is none in the searched period.
+    """
+    start_date = start_date or timezone.localdate()
+    end_date = start_date + datetime.timedelta(days=max_days - 1)
+    now = timezone.localtime().replace(tzinfo=None)
+
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(window_start + datetime.timedelta(days=APPOINTMENT_SLOTS_RANGE_MAX_DAYS - 1), end_date)
+        snapshot = StaffScheduleSnapshot(staff_member, window_start, window_end)
+        # Without working hours, no day can have a slot
+        if not snapshot.working_hours:
+            return None
+        date = window_start
+        while date <= window_end:
+            day_off_end = snapshot.get_day_off_end(date)
+            if day_off_end:
+                date = day_off_end + datetime.timedelta(days=1)
+                continue
+            weekday_num = get_weekday_num_from_date(date)
+            if snapshot.is_working_day(weekday_num):
+                slots = get_available_slots_for_staff(date, staff_member, weekday_num, snapshot=snapshot)
+                if any(slot > now for slot in slots):
+                    return date
+            date += datetime.timedelta(days=1)
+        window_start = window_end + datetime.timedelta(days=1)
+    return None
 
 
 def get_finish_button_text(service) -> str:
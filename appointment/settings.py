@@ -22,6 +22,25 @@ APPOINTMENT_SLOT_DURATION = getattr(settings, 'APPOINTMENT_SLOT_DURATION', 30)
 APPOINTMENT_BUFFER_TIME = getattr(settings, 'APPOINTMENT_BUFFER_TIME', 0)
 APPOINTMENT_LEAD_TIME = getattr(settings, 'APPOINTMENT_LEAD_TIME', (9, 0))
 APPOINTMENT_FINISH_TIME = getattr(settings, 'APPOINTMENT_FINISH_TIME', (18, 30))
+APPOINTMENT_SLOTS_RANGE_MAX_DAYS = getattr(settings, 'APPOINTMENT_SLOTS_RANGE_MAX_DAYS', 60)
+APPOINTMENT_SLOTS_CACHE_TIMEOUT = getattr(settings, 'APPOINTMENT_SLOTS_CACHE_TIMEOUT', 300)
+APPOINTMENT_CALENDAR_FEED_MAX_DAYS = getattr(settings, 'APPOINTMENT_CALENDAR_FEED_MAX_DAYS', 93)
+APPOINTMENT_TOMBSTONE_RETENTION_DAYS = getattr(settings, 'APPOINTMENT_TOMBSTONE_RETENTION_DAYS', 30)
+APPOINTMENT_SLOT_EVENTS_POLL_INTERVAL = getattr(settings, 'APPOINTMENT_SLOT_EVENTS_POLL_INTERVAL', 2)
+APPOINTMENT_SLOT_EVENTS_MAX_DURATION = getattr(settings, 'APPOINTMENT_SLOT_EVENTS_MAX_DURATION', 300)
+APPOINTMENT_SLOT_EVENTS_MAX_STREAMS = getattr(settings, 'APPOINTMENT_SLOT_EVENTS_MAX_STREAMS', 200)
+APPOINTMENT_LIST_COUNT_LIMIT = getattr(settings, 'APPOINTMENT_LIST_COUNT_LIMIT', 1000)
+APPOINTMENT_TRACING_ENABLED = getattr(settings, 'APPOINTMENT_TRACING_ENABLED', False)
+APPOINTMENT_TRACING_FILE = getattr(settings, 'APPOINTMENT_TRACING_FILE', 'appointment_traces.jsonl')
+APPOINTMENT_METRICS_ENABLED = getattr(settings, 'APPOINTMENT_METRICS_ENABLED', False)
+APPOINTMENT_METRICS_TOKEN = getattr(settings, 'APPOINTMENT_METRICS_TOKEN', None)
+APPOINTMENT_METRICS_DIR = getattr(settings, 'APPOINTMENT_METRICS_DIR', None)
+APPOINTMENT_METRICS_FLUSH_INTERVAL = getattr(settings, 'APPOINTMENT_METRICS_FLUSH_INTERVAL', 1)
+APPOINTMENT_QUERY_INSPECTOR_ENABLED = getattr(settings, 'APPOINTMENT_QUERY_INSPECTOR_ENABLED', False)
+APPOINTMENT_QUERY_INSPECTOR_FILE = getattr(settings, 'APPOINTMENT_QUERY_INSPECTOR_FILE',
+                                           'appointment_query_reports.jsonl')
+APPOINTMENT_SLOW_QUERY_MS = getattr(settings, 'APPOINTMENT_SLOW_QUERY_MS', 100)
+APPOINTMENT_REPEATED_QUERY_THRESHOLD = getattr(settings, 'APPOINTMENT_REPEATED_QUERY_THRESHOLD', 5)
 APP_DEFAULT_FROM_EMAIL = getattr(settings, 'DEFAULT_FROM_EMAIL', DEFAULT_FROM_EMAIL)
 
 
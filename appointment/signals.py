@@ -0,0 +1,223 @@
+# signals.py
+# Path: appointment/signals.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from appointment.models import (
+    Appointment, AppointmentRequest, AppointmentRescheduleHistory, AppointmentTombstone, Config, DayOff, Service,
+    StaffMember, WorkingHours
+)
+from appointment.utils.availability_cache import bump_availability_version
+from appointment.utils.config_cache import bump_config_version, config_memo
+from appointment.utils.daily_stats import add_to_daily_stats
+from appointment.utils.search import index_appointments, refresh_search_documents, unindex_appointments
+
+
+def get_request_staff_member_id(instance):
+    """Return the staff member id of the appointment request linked to the given instance, if any."""
+    try:
+        return instance.appointment_request.staff_member_id
+    except ObjectDoesNotExist:
+        return None
+
+
+def is_deleted_with_a_service(origin) -> bool:
+    """Whether a deletion started from a service (an instance or a queryset), whose appointments are handled in bulk
+    by record_deleted_service_appointments."""
+    return isinstance(origin, Service) or getattr(origin, 'model', None) is Service
+
+
+def bump_availability_version_on_commit(staff_member_id, using):
+    """Bump the availability version once the current transaction commits (right away outside of a transaction).
+
+    Bumping earlier would let another process read the new version while the change isn't visible yet, and cache
+    slots computed from the previous data under it.
+    """
+    transaction.on_commit(partial(bump_availability_version, staff_member_id), using=using)
+
+
+@receiver(pre_save, sender=AppointmentRequest)
+def remember_previous_staff_member(sender, instance, **kwargs):
+    """Keep the staff member, date and service an existing appointment request had, so both schedules are
+    invalidated and the daily statistics move along on a change."""
+    instance._previous_staff_member_id = None
+    instance._previous_stats_key = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values_list('date', 'service_id', 'staff_member_id').first()
+        if previous:
+            instance._previous_stats_key = previous
+            instance._previous_staff_member_id = previous[2]
+
+
+@receiver([post_save, post_delete], sender=AppointmentRequest)
+def invalidate_appointment_request_slots(sender, instance, using, **kwargs):
+    previous_staff_member_id = getattr(instance, '_previous_staff_member_id', None)
+    if previous_staff_member_id and previous_staff_member_id != instance.staff_member_id:
+        bump_availability_version_on_commit(previous_staff_member_id, using)
+    if instance.staff_member_id:
+        bump_availability_version_on_commit(instance.staff_member_id, using)
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+@receiver([post_save, post_delete], sender=AppointmentRescheduleHistory)
+def invalidate_appointment_slots(sender, instance, using, origin=None, **kwargs):
+    if is_deleted_with_a_service(origin):
+        # The appointment requests deleted along bump the versions, without loading them once per row
+        return
+    staff_member_id = get_request_staff_member_id(instance)
+    if staff_member_id:
+        bump_availability_version_on_commit(staff_member_id, using)
+
+
+def record_appointment_tombstones(rows):
+    """Record that appointments left the calendar of staff members, with one query.
+
+    The expired tombstones are removed by the prune_tombstones command, not here.
+
+    :param rows: The (appointment_id, staff_member_id) pairs.
+    """
+    AppointmentTombstone.objects.bulk_create([
+        AppointmentTombstone(appointment_id=appointment_id, staff_member_id=staff_member_id)
+        for appointment_id, staff_member_id in rows
+    ])
+
+
+@receiver(pre_delete, sender=Service)
+def record_deleted_service_appointments(sender, instance, using, **kwargs):
+    """Record the tombstones of all the appointments of a deleted service and remove them from the search index at
+    once, instead of one appointment at a time in the post_delete signals. Their daily statistics go away with the
+    service."""
+    rows = list(Appointment.objects.using(using).filter(appointment_request__service=instance).values_list(
+            'pk', 'appointment_request__staff_member_id'))
+    if rows:
+        record_appointment_tombstones(rows)
+        unindex_appointments([row[0] for row in rows], using=using)
+
+
+@receiver(post_delete, sender=Appointment)
+def record_deleted_appointment(sender, instance, origin=None, **kwargs):
+    if not is_deleted_with_a_service(origin):
+        record_appointment_tombstones([(instance.pk, get_request_staff_member_id(instance))])
+
+
+@receiver(post_save, sender=Appointment)
+def count_created_appointment(sender, instance, created, **kwargs):
+    if created:
+        request = instance.appointment_request
+        add_to_daily_stats(request.date, request.service_id, request.staff_member_id, 1)
+
+
+@receiver(post_delete, sender=Appointment)
+def uncount_deleted_appointment(sender, instance, origin=None, **kwargs):
+    if is_deleted_with_a_service(origin):
+        return
+    try:
+        request = instance.appointment_request
+    except ObjectDoesNotExist:
+        return
+    add_to_daily_stats(request.date, request.service_id, request.staff_member_id, -1)
+
+
+@receiver(post_save, sender=AppointmentRequest)
+def move_appointment_stats(sender, instance, created, **kwargs):
+    """A rescheduled appointment, or one given to another staff member or service, moves to other statistics."""
+    previous_key = getattr(instance, '_previous_stats_key', None)
+    key = (instance.date, instance.service_id, instance.staff_member_id)
+    if created or not previous_key or previous_key == key:
+        return
+    count = Appointment.objects.filter(appointment_request=instance).count()
+    if count:
+        add_to_daily_stats(*previous_key, -count)
+        add_to_daily_stats(*key, count)
+
+
+@receiver(post_save, sender=AppointmentRequest)
+def record_appointment_moved_away(sender, instance, created, **kwargs):
+    """An appointment given to another staff member is gone from the calendar of the previous one."""
+    previous_staff_member_id = getattr(instance, '_previous_staff_member_id', None)
+    if created or not previous_staff_member_id or previous_staff_member_id == instance.staff_member_id:
+        return
+    record_appointment_tombstones(
+            (appointment_id, previous_staff_member_id)
+            for appointment_id in Appointment.objects.filter(appointment_request=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Appointment)
+def index_saved_appointment(sender, instance, using, update_fields, **kwargs):
+    # Appointment.save adds search_document to update_fields when one of the fields it is built from is saved
+    if changes_search_fields(update_fields, {'search_document'}):
+        index_appointments([instance], using=using)
+
+
+@receiver(post_delete, sender=Appointment)
+def unindex_deleted_appointment(sender, instance, using, origin=None, **kwargs):
+    if not is_deleted_with_a_service(origin):
+        unindex_appointments([instance.pk], using=using)
+
+
+def changes_search_fields(update_fields, search_fields) -> bool:
+    return update_fields is None or not search_fields.isdisjoint(update_fields)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_client_search_documents(sender, instance, created, update_fields, **kwargs):
+    # A login only saves last_login
+    if not created and changes_search_fields(update_fields, {'first_name', 'last_name', 'email'}):
+        refresh_search_documents(Appointment.objects.filter(client=instance))
+
+
+@receiver(pre_save, sender=Service)
+def remember_previous_service_name(sender, instance, **kwargs):
+    instance._previous_name = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first() \
+        if instance.pk else None
+
+
+@receiver(post_save, sender=Service)
+def refresh_service_search_documents(sender, instance, created, **kwargs):
+    # A service can have many appointments: they are only read again when its name changed
+    previous_name = getattr(instance, '_previous_name', None)
+    if not created and previous_name is not None and previous_name != instance.name:
+        refresh_search_documents(Appointment.objects.filter(appointment_request__service=instance))
+
+
+@receiver(post_save, sender=AppointmentRequest)
+def refresh_request_search_documents(sender, instance, created, **kwargs):
+    previous_key = getattr(instance, '_previous_stats_key', None)
+    if not created and previous_key and previous_key[1] != instance.service_id:
+        refresh_search_documents(Appointment.objects.filter(appointment_request=instance))
+
+
+@receiver([post_save, post_delete], sender=WorkingHours)
+@receiver([post_save, post_delete], sender=DayOff)
+def invalidate_staff_schedule_slots(sender, instance, using, **kwargs):
+    bump_availability_version_on_commit(instance.staff_member_id, using)
+
+
+@receiver([post_save, post_delete], sender=StaffMember)
+def invalidate_staff_member_slots(sender, instance, using, **kwargs):
+    bump_availability_version_on_commit(instance.pk, using)
+
+
+@receiver([post_save, post_delete], sender=Config)
+def refresh_config(sender, instance, using, **kwargs):
+    # This process reloads it right away, the others once the change is committed
+    config_memo.clear()
+    transaction.on_commit(bump_config_version, using=using)
+
+
+@receiver([post_save, post_delete], sender=Config)
+def invalidate_config_slots(sender, instance, using, **kwargs):
+    # The configuration is the default of every staff member
+    bump_availability_version_on_commit(None, using)
@@ -5,7 +5,8 @@ const Constants = {
     SMALL_TABLET_WIDTH: 650,
     TABLET_WIDTH: 767,
     MEDIUM_WIDTH: 991,
-    DEFAULT_START_TIME: '09:00'
+    DEFAULT_START_TIME: '09:00',
+    CHANGES_POLL_INTERVAL: 30000
 };
 
 // Application State
@@ -15,6 +16,8 @@ const AppState = {
 
 document.addEventListener("DOMContentLoaded", initializeCalendar);
 window.addEventListener('resize', updateCalendarConfig);
+setInterval(syncAppointmentChanges, Constants.CHANGES_POLL_INTERVAL);
+document.addEventListener('visibilitychange', syncAppointmentChanges);
 document.getElementById('eventDetailsModal').addEventListener('keypress', function (event) {
     if (event.key === 'Enter') {
         event.preventDefault();
@@ -81,13 +84,55 @@ function attachEventListenersToDropdown() {
 
 
 function initializeCalendar() {
-    const formattedAppointments = formatAppointmentsForCalendar(appointments);
     const calendarEl = document.getElementById('calendar');
-    AppState.calendar = new FullCalendar.Calendar(calendarEl, getCalendarConfig(formattedAppointments));
+    AppState.calendar = new FullCalendar.Calendar(calendarEl, getCalendarConfig(getAppointmentsEventSource()));
     AppState.calendar.setOption('locale', locale);
     AppState.calendar.render();
 }
 
+// FullCalendar requests the feed with the start and end of the visible dates, and again on navigation
+function getAppointmentsEventSource() {
+    return {
+        id: 'appointments',
+        url: appointmentsFeedURL,
+        success: function (rawAppointments) {
+            appointments = rawAppointments;
+            return formatAppointmentsForCalendar(rawAppointments);
+        },
+        failure: function () {
+            showErrorModal(errorTxt);
+        }
+    };
+}
+
+// Bring the calendar up to date with the appointments created, updated or deleted since the last sync
+async function syncAppointmentChanges() {
+    if (document.hidden || !AppState.calendar || AppState.isEditingAppointment) return;
+    const response = await fetch(`${appointmentsChangesURL}?since=${encodeURIComponent(changesCursor)}`, {
+        headers: {'X-Requested-With': 'XMLHttpRequest'}
+    });
+    if (!response.ok) return;
+    const data = await response.json();
+    changesCursor = data.cursor;
+    if (data.reset) {
+        AppState.calendar.refetchEvents();
+        return;
+    }
+
+    const changedIds = data.deleted.concat(data.updated.map(appointment => Number(appointment.id)));
+    changedIds.forEach(id => {
+        const event = AppState.calendar.getEventById(id);
+        if (event) event.remove();
+    });
+    appointments = appointments.filter(appointment => !changedIds.includes(Number(appointment.id)));
+    // The changes outside the visible dates come back with the feed when the user navigates there
+    const view = AppState.calendar.view;
+    data.updated
+        .filter(appointment => new Date(appointment.start_time) < view.activeEnd &&
+            new Date(appointment.end_time) > view.activeStart)
+        .forEach(addNewAppointmentToCalendar);
+}
+
 function formatAppointmentsForCalendar(appointments) {
     return appointments.map(appointment => ({
         id: appointment.id,
@@ -851,7 +896,8 @@ async function sendAppointmentData(data) {
 function addNewAppointmentToCalendar(newAppointment) {
     const newEvent = formatAppointmentsForCalendar([newAppointment])[0];
     appointments.push(newAppointment);
-    AppState.calendar.addEvent(newEvent);
+    // Added to the feed's source, so that the next fetch of the feed replaces it instead of duplicating it
+    AppState.calendar.addEvent(newEvent, AppState.calendar.getEventSourceById('appointments'));
 }
 
 // Update existing appointment in calendar
@@ -7,6 +7,7 @@ let selectedDateIso = null;
 let staffId = null;
 let previouslySelectedCell = null;
 let isRequestInProgress = false;
+let slotEventSource = null;
 let calendar = null;
 let initializationAttempts = 0;
 const MAX_INITIALIZATION_ATTEMPTS = 5;
@@ -1073,6 +1074,7 @@ function getAvailableSlots(selectedDate, staffId = null) {
     const errorMessageContainer = $('.error-message');
 
     // Clear previous error messages and slots
+    closeSlotEvents();
     slotList.empty();
     errorMessageContainer.find('.djangoAppt_no-availability-text').remove();
 
@@ -1222,16 +1224,37 @@ function getAvailableSlots(selectedDate, staffId = null) {
                 }
 
                 // Attach click event to the slots
-                $('.djangoAppt_appointment-slot').on('click', function () {
-                    selectSlot($(this), data.date_chosen);
-                });
-                
-                // Attach keyboard event for accessibility
-                $('.djangoAppt_appointment-slot').on('keydown', function (e) {
-                    if (e.key === 'Enter' || e.key === ' ') {
-                        e.preventDefault();
+                attachSlotEvents($('.djangoAppt_appointment-slot'));
+
+                function attachSlotEvents($slots) {
+                    $slots.on('click', function () {
                         selectSlot($(this), data.date_chosen);
-                    }
+                    });
+
+                    // Attach keyboard event for accessibility
+                    $slots.on('keydown', function (e) {
+                        if (e.key === 'Enter' || e.key === ' ') {
+                            e.preventDefault();
+                            selectSlot($(this), data.date_chosen);
+                        }
+                    });
+                }
+
+                // Les créneaux pris ou libérés par d'autres clients sont poussés par le serveur (SSE)
+                listenToSlotEvents(data.date_iso, staffId, function (releasedSlots) {
+                    releasedSlots.forEach(function (slot) {
+                        const slotItem = $('<li class="djangoAppt_appointment-slot" role="button" tabindex="0" aria-label="Sélectionner le créneau ' + slot + '">' + slot + '</li>');
+                        attachSlotEvents(slotItem);
+                        // Les créneaux sont des dates ISO: l'ordre alphabétique est l'ordre chronologique
+                        const nextSlot = slotList.find('li').filter(function () {
+                            return $(this).text() > slot;
+                        }).first();
+                        if (nextSlot.length) {
+                            nextSlot.before(slotItem);
+                        } else {
+                            slotList.append(slotItem);
+                        }
+                    });
                 });
                 
                 function selectSlot($slot, dateChosen) {
@@ -1310,6 +1333,64 @@ function getAvailableSlots(selectedDate, staffId = null) {
     });
 }
 
+function closeSlotEvents() {
+    if (slotEventSource) {
+        slotEventSource.close();
+        slotEventSource = null;
+    }
+}
+
+// Écoute les créneaux pris et libérés pour le membre du personnel et la date affichés
+function listenToSlotEvents(dateIso, staffMemberId, onSlotsReleased) {
+    closeSlotEvents();
+    if (!window.EventSource) {
+        return;
+    }
+    const params = $.param({'selected_date': dateIso, 'staff_member': staffMemberId});
+    slotEventSource = new EventSource(`${slotEventsURL}?${params}`);
+
+    function displayedSlots() {
+        return $('.djangoAppt_appointment-slot').map(function () {
+            return $(this).text();
+        }).get();
+    }
+
+    function removeTakenSlots(takenSlots) {
+        $('.djangoAppt_appointment-slot').filter(function () {
+            return takenSlots.includes($(this).text());
+        }).each(function () {
+            if ($(this).hasClass('selected')) {
+                selectedDateIso = null;
+                $('#service-datetime-chosen').text($('.djangoAppt_date_chosen').text());
+                $('.error-message')
+                    .empty()
+                    .append('<p class="djangoAppt_no-availability-text">Ce créneau vient d\'être réservé. Veuillez en choisir un autre.</p>')
+                    .show();
+            }
+            $(this).remove();
+        });
+        updateSubmitState();
+    }
+
+    // Envoyé à chaque (re)connexion: la liste affichée a pu changer entre-temps
+    slotEventSource.addEventListener('slots', function (event) {
+        const slots = JSON.parse(event.data).slots;
+        const displayed = displayedSlots();
+        removeTakenSlots(displayed.filter(slot => !slots.includes(slot)));
+        onSlotsReleased(slots.filter(slot => !displayed.includes(slot)));
+    });
+    slotEventSource.addEventListener('slot-taken', function (event) {
+        removeTakenSlots(JSON.parse(event.data).slots);
+    });
+    slotEventSource.addEventListener('slot-released', function (event) {
+        onSlotsReleased(JSON.parse(event.data).slots);
+    });
+    // Le serveur termine le flux (durée maximale atteinte ou trop de flux ouverts): ne pas se reconnecter,
+    // la page garde les créneaux chargés en AJAX
+    slotEventSource.addEventListener('stop', closeSlotEvents);
+    slotEventSource.addEventListener('error', closeSlotEvents);
+}
+
 function requestNextAvailableSlot(serviceId) {
     const requestNextAvailableSlotURL = requestNextAvailableSlotURLTemplate.replace('0', serviceId);
     if (staffId === null) {
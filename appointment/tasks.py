@@ -11,6 +11,7 @@ from django.utils.translation import gettext as _
 from appointment.email_sender import notify_admin, send_email
 from appointment.logger_config import get_logger
 from appointment.models import Appointment
+from appointment.utils.metrics import EMAILS
 
 logger = get_logger(__name__)
 
@@ -21,7 +22,7 @@ def send_email_reminder(to_email, first_name, reschedule_link, appointment_id):
     """
 
     # Fetch the appointment using appointment_id
-    logger.info(f"Sending reminder to {to_email} for appointment {appointment_id}")
+    logger.info("Sending reminder to %s for appointment %s", to_email, appointment_id)
     appointment = Appointment.objects.get(id=appointment_id)
     recipient_type = 'client'
     email_context = {
@@ -35,7 +36,7 @@ def send_email_reminder(to_email, first_name, reschedule_link, appointment_id):
             template_url='email_sender/reminder_email.html', context=email_context
     )
     # Notify the admin
-    logger.info(f"Sending admin reminder also")
+    logger.info("Sending admin reminder also")
     email_context['recipient_type'] = 'admin'
     notify_admin(
             subject=_("Admin Reminder: Upcoming Appointment"),
@@ -60,8 +61,10 @@ def send_email_task(recipient_list, subject, message, html_message, from_email,
                 email.attach(*attachment)
 
         email.send(fail_silently=False)
+        EMAILS.inc(channel='django_q', result='sent')
     except Exception as e:
-        logger.error(f"Error sending email from task: {e}")
+        EMAILS.inc(channel='django_q', result='failed')
+        logger.error("Error sending email from task: %s", e)
 
 
 def notify_admin_task(subject, message, html_message):
@@ -70,7 +73,9 @@ def notify_admin_task(subject, message, html_message):
     """
     try:
         from django.core.mail import mail_admins
-        logger.info(f"Sending admin email with subject: {subject}")
+        logger.info("Sending admin email with subject: %s", subject)
         mail_admins(subject=subject, message=message, html_message=html_message, fail_silently=False)
+        EMAILS.inc(channel='django_q', result='sent')
     except Exception as e:
-        logger.error(f"Error sending admin email from task: {e}")
+        EMAILS.inc(channel='django_q', result='failed')
+        logger.error("Error sending admin email from task: %s", e)
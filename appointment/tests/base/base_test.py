@@ -1,5 +1,6 @@
 from datetime import timedelta
 
+from django.core.cache import cache
 from django.test import TestCase
 
 from appointment.models import Appointment, AppointmentRequest, Service, StaffMember
@@ -7,6 +8,7 @@ from appointment.tests.mixins.base_mixin import (
     AppointmentMixin, AppointmentRequestMixin, AppointmentRescheduleHistoryMixin, ServiceMixin, StaffMemberMixin,
     UserMixin
 )
+from appointment.utils.config_cache import config_memo
 from appointment.utils.db_helpers import get_user_model
 
 
@@ -42,6 +44,12 @@ class BaseTest(TestCase, UserMixin, StaffMemberMixin, ServiceMixin, AppointmentR
         cls.staff_member1 = cls.create_staff_member_(user=cls.users['staff1'], service=cls.service1)
         cls.staff_member2 = cls.create_staff_member_(user=cls.users['staff2'], service=cls.service2)
 
+    def setUp(self):
+        super().setUp()
+        # The database is rolled back between tests without sending signals, so cached data must be dropped too
+        cache.clear()
+        config_memo.clear()
+
     @classmethod
     def tearDownClass(cls):
         super().tearDownClass()
@@ -2,8 +2,10 @@ from copy import deepcopy
 from datetime import date, datetime, time, timedelta
 
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 
+from appointment.models import AppointmentRequest
 from appointment.tests.base.base_test import BaseTest
 
 
@@ -36,6 +38,13 @@ class AppointmentRequestCreationAndBasicAttributesTests(BaseTest):
         self.assertIsNotNone(self.ar.created_at)
         self.assertIsNotNone(self.ar.updated_at)
 
+    def test_id_request_is_unique(self):
+        self.assertEqual(len(self.ar.get_id_request()), 26)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                AppointmentRequest.objects.create(date=self.ar.date, start_time=time(11, 0), end_time=time(12, 0),
+                                                  service=self.service1, id_request=self.ar.get_id_request())
+
     def test_appointment_request_initial_state(self):
         """Check the initial state of "reschedule attempts" and string representation."""
         self.assertEqual(self.ar.reschedule_attempts, 0)
@@ -0,0 +1,37 @@
+# test_commands.py
+# Path: appointment/tests/test_commands.py
+
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from appointment.models import Appointment, AppointmentRequest, Service
+
+
+class GenerateLoadDatasetTests(TestCase):
+    def generate(self, **options):
+        call_command('generate_load_dataset', services=2, staff=2, clients=5, appointments=10, days=7,
+                     start_date='2030-01-07', batch_size=4, stdout=StringIO(), **options)
+
+    def test_generate(self):
+        self.generate()
+        self.assertEqual(Service.objects.filter(name__startswith='[load] ').count(), 2)
+        self.assertEqual(Appointment.objects.filter(id_request__startswith='load').count(), 10)
+        appointment = Appointment.objects.select_related('appointment_request').first()
+        self.assertEqual(appointment.id_request, appointment.appointment_request.id_request)
+        self.assertGreaterEqual(appointment.appointment_request.date, datetime.date(2030, 1, 7))
+
+    def test_generate_twice(self):
+        # Same seed: the second run must not reuse the request ids of the first one
+        self.generate()
+        self.generate()
+        self.assertEqual(AppointmentRequest.objects.filter(id_request__startswith='load').count(), 20)
+        self.assertEqual(Appointment.objects.values('id_request').distinct().count(), 20)
+
+    def test_clear(self):
+        self.generate()
+        self.generate(clear=True)
+        self.assertFalse(AppointmentRequest.objects.exists())
+        self.assertFalse(Service.objects.exists())
@@ -0,0 +1,110 @@
+# test_logger_config.py
+# Path: appointment/tests/test_logger_config.py
+
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+
+from django.test import SimpleTestCase, override_settings
+
+from appointment.logger_config import (
+    AppointmentQueueHandler, ColoredFormatter, JSONFormatter, configure_logging,
+    get_log_settings, get_logger
+)
+
+
+class GetLoggerTest(SimpleTestCase):
+    def test_handler_added_once(self):
+        for _ in range(3):
+            logger = get_logger('appointment.tests.test_logger_config')
+        self.assertEqual(logger.handlers, [])
+        handlers = logging.getLogger('appointment').handlers
+        self.assertEqual(handlers.count(configure_logging()), 1)
+
+    def test_same_handler_for_every_package(self):
+        get_logger('appointment.views')
+        get_logger('check_version')
+        self.assertIn(configure_logging(), logging.getLogger('check_version').handlers)
+
+
+class LogSettingsTest(SimpleTestCase):
+    @override_settings(DEBUG=False)
+    def test_info_without_debug(self):
+        self.assertEqual(get_log_settings(), (logging.INFO, 'color'))
+
+    @override_settings(DEBUG=True)
+    def test_debug_with_debug(self):
+        self.assertEqual(get_log_settings()[0], logging.DEBUG)
+
+    @override_settings(APPOINTMENT_LOG_LEVEL='warning', APPOINTMENT_LOG_FORMAT='json')
+    def test_from_settings(self):
+        self.assertEqual(get_log_settings(), (logging.WARNING, 'json'))
+
+
+class QueuePipelineTest(SimpleTestCase):
+    def setUp(self):
+        self.records = queue.SimpleQueue()
+        self.logger = logging.getLogger('appointment_pipeline_test')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(AppointmentQueueHandler(self.records))
+
+    def tearDown(self):
+        self.logger.handlers.clear()
+
+    def test_arguments_are_merged_lazily(self):
+        class Expensive:
+            formatted = 0
+
+            def __str__(self):
+                Expensive.formatted += 1
+                return 'expensive'
+
+        self.logger.debug("Not written: %s", Expensive())
+        self.assertEqual(Expensive.formatted, 0)
+        self.assertTrue(self.records.empty())
+
+        self.logger.info("Written: %s", Expensive())
+        record = self.records.get_nowait()
+        self.assertEqual((record.msg, record.args), ("Written: expensive", None))
+
+    def test_exception_is_kept_as_text(self):
+        try:
+            raise ValueError("Jaffa kree")
+        except ValueError:
+            self.logger.exception("Failed")
+        record = self.records.get_nowait()
+        self.assertIsNone(record.exc_info)
+        self.assertIn("ValueError: Jaffa kree", record.exc_text)
+        self.assertIn("ValueError: Jaffa kree", ColoredFormatter().format(record))
+
+    def test_written_by_listener(self):
+        written = []
+
+        class ListHandler(logging.Handler):
+            def emit(self, record):
+                written.append(self.format(record))
+
+        handler = ListHandler()
+        handler.setFormatter(JSONFormatter())
+        listener = QueueListener(self.records, handler)
+        listener.start()
+        self.logger.warning("Chevron %s locked", 7)
+        listener.stop()
+
+        entry = json.loads(written[0])
+        self.assertEqual(entry['message'], "Chevron 7 locked")
+        self.assertEqual(entry['level'], 'WARNING')
+        self.assertEqual(entry['logger'], 'appointment_pipeline_test')
+
+
+class JSONFormatterTest(SimpleTestCase):
+    def test_format(self):
+        record = logging.LogRecord('appointment.views', logging.ERROR, 'views.py', 12, "Payment %s failed",
+                                   ('1234',), None, func='pay')
+        entry = json.loads(JSONFormatter().format(record))
+        self.assertEqual({key: entry[key] for key in ('level', 'logger', 'function', 'line', 'message')},
+                         {'level': 'ERROR', 'logger': 'appointment.views', 'function': 'pay', 'line': 12,
+                          'message': "Payment 1234 failed"})
+        self.assertNotIn('exception', entry)
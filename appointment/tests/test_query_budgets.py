@@ -0,0 +1,300 @@
+# test_query_budgets.py
+# Path: appointment/tests/test_query_budgets.py
+
+import datetime
+import json
+import re
+from io import StringIO
+from typing import NamedTuple
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from appointment.models import (
+    Appointment, AppointmentRequest, AppointmentRescheduleHistory, DayOff, PasswordResetToken, PaymentInfo,
+    WorkingHours
+)
+from appointment.tests.base.base_test import BaseTest
+from appointment.utils.config_cache import config_memo
+
+
+class Budget(NamedTuple):
+    """The most a view may cost on the fixture of QueryBudgetTests.
+
+    The params are the query string of a GET, or the data of a POST (sent as JSON to the ajax views); '{name}' in a
+    value is replaced by the fixture value of that name, as are the route's parameters. The url_values maps a route's
+    parameter to another fixture value than the one of the same name.
+    """
+    queries: int
+    kilobytes: float
+    user: str = None
+    method: str = 'get'
+    params: dict = None
+    url_values: dict = None
+
+
+SLOT_PARAMS = {'selected_date': '{date}', 'staff_member': '{staff_member_id}', 'service_id': '{service_id}'}
+APPOINTMENT_MOVE = {'appointment_id': '{appointment_id}', 'date': '{date}'}
+
+# The budgets of every route of appointment/urls.py, measured with a cold cache: the query counts are exact, the
+# response sizes have about 20% of headroom. A view exceeding its budget, or a route added without one, fails the
+# suite: raise a budget only along with the change that justifies it.
+BUDGETS = {
+    # Public pages
+    '': Budget(3, 135),
+    'login/': Budget(2, 50),
+    'register/': Budget(2, 60),
+    'logout/': Budget(4, 0, user='client'),
+    'contact/': Budget(0, 115),
+    'metrics/': Budget(2, 1, user='superuser'),
+
+    # Client pages
+    'my-appointments/': Budget(6, 55, user='client'),
+    'new-appointment/': Budget(5, 50, user='client'),
+    'update-user-info-simple/': Budget(2, 40, user='client'),
+    'change-password-simple/': Budget(2, 40, user='client'),
+
+    # Booking, rescheduling and payment
+    'request/<int:service_id>/': Budget(8, 70),
+    'request-submit/': Budget(12, 0, method='post', params={
+        'date': '{date}', 'start_time': '06:00', 'end_time': '07:00', 'service': '{service_id}',
+        'staff_member': '{staff_member_id}'}),
+    'appointment/<str:id_request>/reschedule/': Budget(11, 75, user='client'),
+    'appointment-reschedule-submit/': Budget(11, 0, method='post', params={
+        'id_request': '{id_request}', 'date': '{date}', 'start_time': '06:00', 'end_time': '07:00',
+        'service': '{service_id}', 'staff_member': '{staff_member_id}'}),
+    'confirm-reschedule/<str:id_request>/': Budget(27, 0),
+    'client-info/<int:appointment_request_id>/<str:id_request>/': Budget(
+        2, 65, url_values={'id_request': 'pending_id_request'}),
+    'verification-code/<int:appointment_request_id>/<str:id_request>/': Budget(
+        1, 40, url_values={'id_request': 'pending_id_request'}),
+    'thank-you/<int:appointment_id>/': Budget(16, 10, user='client'),
+    'verify/<uidb64>/<str:token>/': Budget(2, 6),
+    'payment/<int:object_id>/<str:id_request>/': Budget(4, 40, url_values={'id_request': 'payment_id_request'}),
+    'payment/wallet/<int:object_id>/<str:id_request>/': Budget(
+        4, 45, url_values={'id_request': 'payment_id_request'}),
+    'payment/bankily/<int:object_id>/<str:id_request>/': Budget(
+        4, 40, url_values={'id_request': 'payment_id_request'}),
+    'payment/card/<int:object_id>/<str:id_request>/': Budget(4, 40, url_values={'id_request': 'payment_id_request'}),
+    'payment/bank-transfer/<int:object_id>/<str:id_request>/': Budget(
+        4, 40, url_values={'id_request': 'payment_id_request'}),
+    'payment/success/<int:appointment_id>/': Budget(3, 35),
+
+    # Admin pages
+    # Session, user, the service and staff counts, the appointment totals, the weekly counts, the popular services,
+    # the versions with the configuration stamp, and the Config row, which the cold cache reloads
+    'admin-dashboard/': Budget(8, 55, user='superuser'),
+    'calendar/': Budget(5, 50, user='superuser'),
+    'calendar/<int:year>/<int:month>/': Budget(5, 55, user='superuser'),
+    'verification-code/': Budget(2, 4, user='staff'),
+
+    # Ajax
+    # The versions with the configuration stamp, the staff member, the days off, the working hours, the Config row
+    # (cold cache) and the appointments of the day: the slots depend on each of them
+    'ajax/available_slots/': Budget(6, 1, params=SLOT_PARAMS),
+    # The test client runs the views under WSGI, where the stream is disabled and the view answers 204
+    'ajax/available_slots/events/': Budget(0, 0, params=SLOT_PARAMS),
+    'ajax/available_slots_range/': Budget(6, 3, params={
+        'start_date': '{date}', 'end_date': '{week_later}', 'staff_member': '{staff_member_id}',
+        'service_id': '{service_id}'}),
+    'ajax/available_slots_any_staff/<int:service_id>/': Budget(7, 2, params={'selected_date': '{date}'}),
+    'ajax/request_next_available_slot/<int:service_id>/': Budget(7, 1, params={'staff_member': '{staff_member_id}'}),
+    'ajax/request_staff_info/': Budget(1, 1, params={'staff_member': '{staff_member_id}'}),
+    'ajax/fetch_service_list_for_staff/': Budget(4, 1, user='superuser', params={
+        'staff_member': '{staff_member_id}'}),
+    'ajax/fetch_staff_list/': Budget(3, 1, user='superuser'),
+    'ajax/update_appt_min_info/': Budget(19, 1, user='superuser', method='post', params={
+        'isCreating': False, 'appointment_id': '{appointment_id}', 'service_id': '{service_id}',
+        'staff_member': '{staff_member_id}', 'client_name': 'Vala Mal Doran',
+        'client_email': 'vala.mal-doran@django-appointment.com', 'client_phone': '+12392350345',
+        'client_address': '456 Outer Rim, Free Jaffa Nation', 'want_reminder': 'false', 'additional_info': '',
+        'start_time': '{start_time}:00', 'date': '{date}'}),
+    'ajax/update_appt_date_time/': Budget(11, 1, user='superuser', method='post', params={
+        **APPOINTMENT_MOVE, 'start_time': '{start_time}:00.000Z'}),
+    'ajax/validate_appointment_date/': Budget(9, 1, user='superuser', method='post', params={
+        **APPOINTMENT_MOVE, 'start_time': '{date}T{start_time}:00'}),
+    'ajax/delete_appointment/': Budget(11, 1, user='superuser', method='post', params={
+        'appointment_id': '{appointment_id}'}),
+    'ajax/is_user_staff_admin/': Budget(3, 1, user='staff'),
+    'ajax/calendar_appointments/': Budget(3, 1, user='superuser', params={'year': '{year}', 'month': '{month}'}),
+
+    # Staff administration
+    'app-admin/appointments/<str:response_type>/': Budget(3, 345, user='superuser'),
+    'app-admin/appointments/': Budget(2, 65, user='superuser'),
+    'app-admin/appointments-feed/': Budget(3, 450, user='superuser', params={
+        'start': '{month_start}T00:00:00', 'end': '{month_end}T00:00:00'}),
+    'app-admin/appointments-changes/': Budget(6, 450, user='superuser', params={'since': '{since}'}),
+    'app-admin/add-staff-member-info/': Budget(4, 30, user='superuser'),
+    'app-admin/create-new-staff-member/': Budget(2, 9, user='superuser'),
+    'app-admin/update-staff-member/<int:user_id>/': Budget(6, 45, user='superuser'),
+    'app-admin/add-staff-member/': Budget(8, 45, user='superuser'),
+    'app-admin/make-superuser-staff-member/': Budget(6, 0, user='superuser'),
+    'app-admin/remove-superuser-staff-member/': Budget(3, 0, user='superuser'),
+    'app-admin/remove-staff-member/<int:staff_user_id>/': Budget(16, 0, user='superuser'),
+    'app-admin/add-service/': Budget(2, 12, user='superuser'),
+    'app-admin/update-service/<int:service_id>/': Budget(3, 13, user='superuser'),
+    # The tombstones and the search index of the appointments of the service are handled in bulk
+    'app-admin/delete-service/<int:service_id>/': Budget(16, 0, user='superuser'),
+    'app-admin/service-list/': Budget(3, 65, user='superuser'),
+    'app-admin/service-list/<str:response_type>/': Budget(3, 3, user='superuser'),
+    'app-admin/view-service/<int:service_id>/<int:view>/': Budget(3, 14, user='superuser'),
+    'app-admin/display-appointment/<int:appointment_id>/': Budget(8, 50, user='superuser'),
+    'app-admin/user-profile/<int:staff_user_id>/': Budget(9, 40, user='superuser'),
+    'app-admin/user-profile/': Budget(8, 40, user='staff'),
+    'app-admin/update-user-info/<int:staff_user_id>/': Budget(3, 9, user='superuser'),
+    'app-admin/update-user-info/': Budget(2, 9, user='superuser'),
+    'app-admin/add-day-off/<int:staff_user_id>/': Budget(3, 16, user='superuser'),
+    'app-admin/update-day-off/<int:day_off_id>/<int:staff_user_id>/': Budget(6, 16, user='superuser'),
+    'app-admin/delete-day-off/<int:day_off_id>/<int:staff_user_id>/': Budget(6, 0, user='superuser'),
+    'app-admin/update-day-off/<int:day_off_id>/': Budget(6, 16, user='staff'),
+    'app-admin/delete-day-off/<int:day_off_id>/': Budget(6, 0, user='superuser'),
+    'app-admin/update-working-hours/<int:working_hours_id>/<int:staff_user_id>/': Budget(6, 19, user='superuser'),
+    'app-admin/add-working-hours/<int:staff_user_id>/': Budget(3, 19, user='superuser'),
+    'app-admin/delete-working-hours/<int:working_hours_id>/<int:staff_user_id>/': Budget(7, 0, user='superuser'),
+    'app-admin/update-working-hours/<int:working_hours_id>/': Budget(6, 19, user='staff'),
+    'app-admin/add-working-hours/': Budget(3, 19, user='staff'),
+    'app-admin/delete-working-hours/<int:working_hours_id>/': Budget(7, 0, user='superuser'),
+    'app-admin/delete-appointment/<int:appointment_id>/': Budget(11, 0, user='superuser'),
+}
+
+
+def get_routes(patterns, prefix=''):
+    """The routes of the URL patterns, the included ones too, with the name of each."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from get_routes(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif isinstance(pattern, URLPattern):
+            yield prefix + str(pattern.pattern), pattern.name
+
+
+def format_queries(queries) -> str:
+    return '\n'.join(f'{number}. {query["sql"]}' for number, query in enumerate(queries, start=1))
+
+
+@patch('appointment.views_metrics.APPOINTMENT_METRICS_ENABLED', True)
+class QueryBudgetTests(BaseTest):
+    """Every view, run against a dataset of realistic size, within the query and response size budgets of BUDGETS."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # The next month starting on a Monday: every appointment is in the future, in the same calendar month, and
+        # the dataset is laid out the same whatever the day the tests run
+        start_date = timezone.localdate().replace(day=1)
+        while True:
+            start_date = (start_date + datetime.timedelta(days=31)).replace(day=1)
+            if start_date.weekday() == 0:
+                break
+        call_command('generate_load_dataset', services=8, staff=10, clients=200, appointments=600, days=28,
+                     start_date=start_date.isoformat(), stdout=StringIO())
+        cls.superuser = cls.users['superuser']
+        cls.superuser.is_superuser = cls.superuser.is_staff = True
+        cls.superuser.save()
+
+        cls.appointment = Appointment.objects.filter(id_request__startswith='load').select_related(
+            'appointment_request', 'client').order_by('pk').first()
+        appointment_request = cls.appointment.appointment_request
+        cls.staff_member = appointment_request.staff_member
+        cls.client_user = cls.appointment.client
+        cls.staff_member.user.is_staff = True
+        cls.staff_member.user.save()
+        pending_request = AppointmentRequest.objects.create(
+            date=appointment_request.date, start_time=datetime.time(6), end_time=datetime.time(7),
+            service=appointment_request.service, staff_member=cls.staff_member)
+        AppointmentRescheduleHistory.objects.create(
+            appointment_request=appointment_request, date=appointment_request.date + datetime.timedelta(days=1),
+            start_time=appointment_request.start_time, end_time=appointment_request.end_time,
+            staff_member=cls.staff_member)
+        payment_info = PaymentInfo.objects.create(appointment=cls.appointment)
+        token = PasswordResetToken.create_token(user=cls.client_user)
+        date = appointment_request.date
+        month_start = date.replace(day=1)
+        cls.values = {
+            'appointment_id': cls.appointment.id,
+            'appointment_request_id': pending_request.id,
+            'day_off_id': DayOff.objects.filter(staff_member=cls.staff_member).order_by('pk').first().id,
+            'working_hours_id': WorkingHours.objects.filter(staff_member=cls.staff_member).order_by('pk').first().id,
+            'id_request': appointment_request.id_request,
+            'pending_id_request': pending_request.id_request,
+            'payment_id_request': payment_info.get_id_request(),
+            'object_id': payment_info.id,
+            'service_id': appointment_request.service_id,
+            'staff_member_id': cls.staff_member.id,
+            'staff_user_id': cls.staff_member.user_id,
+            'user_id': cls.staff_member.user_id,
+            'uidb64': urlsafe_base64_encode(force_bytes(cls.client_user.pk)),
+            'token': str(token.token),
+            'response_type': 'json',
+            'view': 1,
+            'date': date.isoformat(),
+            'week_later': (date + datetime.timedelta(days=7)).isoformat(),
+            'start_time': appointment_request.start_time.strftime('%H:%M'),
+            'year': date.year,
+            'month': date.month,
+            'month_start': month_start.isoformat(),
+            'month_end': (month_start + datetime.timedelta(days=31)).replace(day=1).isoformat(),
+            'since': (timezone.now() - datetime.timedelta(hours=1)).isoformat(),
+        }
+
+    def get_user(self, name):
+        return {'superuser': self.superuser, 'staff': self.staff_member.user, 'client': self.client_user}[name]
+
+    def get_url(self, route, name, budget):
+        url_values = budget.url_values or {}
+        kwargs = {parameter: self.values[url_values.get(parameter, parameter)]
+                  for parameter in re.findall(r'<(?:\w+:)?(\w+)>', route)}
+        return reverse(f'appointment:{name}', kwargs=kwargs)
+
+    def request(self, route, name, budget):
+        """Run the request of a route, in a transaction rolled back afterwards as the views deleting data would
+        leave the next ones without it.
+
+        :return: A tuple (url, response, queries).
+        """
+        url = self.get_url(route, name, budget)
+        params = {key: value.format(**self.values) if isinstance(value, str) else value
+                  for key, value in (budget.params or {}).items()}
+        extra = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'} if route.startswith('ajax/') else {}
+        self.client.logout()
+        if budget.user:
+            self.client.force_login(self.get_user(budget.user))
+        cache.clear()
+        config_memo.clear()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                if budget.method == 'get':
+                    response = self.client.get(url, params, **extra)
+                elif route.startswith('ajax/'):
+                    response = self.client.post(url, json.dumps(params), content_type='application/json', **extra)
+                else:
+                    response = self.client.post(url, params, **extra)
+            transaction.set_rollback(True)
+        return url, response, queries.captured_queries
+
+    def test_every_route_has_a_budget(self):
+        routes = {route for route, _name in get_routes(get_resolver('appointment.urls').url_patterns)}
+        self.assertEqual(routes - set(BUDGETS), set(), "Routes without a budget")
+        self.assertEqual(set(BUDGETS) - routes, set(), "Budgets of routes that no longer exist")
+
+    def test_budgets(self):
+        for route, name in get_routes(get_resolver('appointment.urls').url_patterns):
+            budget = BUDGETS[route]
+            with self.subTest(route=route):
+                url, response, queries = self.request(route, name, budget)
+                # An error response would measure the cost of the error, not the one of the view
+                self.assertLess(response.status_code, 400, url)
+                self.assertLessEqual(len(queries), budget.queries,
+                                     f"{budget.method.upper()} {url} ran {len(queries)} queries, over its budget "
+                                     f"of {budget.queries}:\n{format_queries(queries)}")
+                if not response.streaming:
+                    kilobytes = len(response.content) / 1024
+                    self.assertLessEqual(kilobytes, budget.kilobytes,
+                                         f"{budget.method.upper()} {url} returned {kilobytes:.1f} KB, over its "
+                                         f"budget of {budget.kilobytes} KB")
@@ -14,17 +14,22 @@ from django.utils import timezone
 from django.utils.translation import gettext as _, gettext_lazy as _
 
 from appointment.forms import StaffDaysOffForm
+from appointment.models import AppointmentTombstone
 from appointment.services import (
     create_staff_member_service, email_change_verification_service, fetch_user_appointments, get_available_slots,
-    get_available_slots_for_staff, get_finish_button_text, handle_day_off_form, handle_entity_management_request,
+    get_available_slots_for_range, get_available_slots_for_service, get_available_slots_for_staff,
+    get_finish_button_text, get_next_available_date, handle_day_off_form, handle_entity_management_request,
     handle_service_management_request, handle_working_hours_form, prepare_appointment_display_data,
-    prepare_user_profile_data, save_appointment, save_appt_date_time, update_personal_info_service
+    prepare_user_profile_data, prune_appointment_tombstones, save_appointment, save_appt_date_time,
+    update_personal_info_service
 )
 from appointment.tests.base.base_test import BaseTest
 from appointment.tests.mixins.base_mixin import (
     ConfigMixin)
 from appointment.utils.date_time import convert_str_to_time, get_ar_end_time
-from appointment.utils.db_helpers import Config, DayOff, EmailVerificationCode, StaffMember, WorkingHours
+from appointment.utils.db_helpers import (
+    Config, DayOff, EmailVerificationCode, StaffMember, WorkingHours, get_config
+)
 from appointment.views import get_appointments_and_slots
 
 
@@ -134,6 +139,23 @@ class FetchUserAppointmentsTests(BaseTest):
         self.assertEqual(appointments, [], "Expected an empty list for a staff user without a staff member instance.")
 
 
+class PruneAppointmentTombstonesTests(BaseTest):
+    def test_only_expired_tombstones_are_deleted(self):
+        self.create_appt_for_sm1().delete()
+        self.create_appt_for_sm2().delete()
+        expired = AppointmentTombstone.objects.filter(staff_member=self.staff_member1)
+        expired.update(deleted_at=timezone.now() - timedelta(days=31))
+        self.assertEqual(prune_appointment_tombstones(), 1)
+        self.assertEqual(list(AppointmentTombstone.objects.values_list('staff_member_id', flat=True)),
+                         [self.staff_member2.pk])
+
+    def test_deleting_an_appointment_does_not_prune(self):
+        self.create_appt_for_sm1().delete()
+        AppointmentTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=31))
+        self.create_appt_for_sm2().delete()
+        self.assertEqual(AppointmentTombstone.objects.count(), 2)
+
+
 class PrepareAppointmentDisplayDataTests(BaseTest):
     """Test suite for the `prepare_appointment_display_data` service function."""
 
@@ -650,14 +672,15 @@ class GetAvailableSlotsForStaffTests(BaseTest):
         # Test 3: Book an appointment on Wednesday 10-11, then check remaining slots
         start_time = datetime.time(10, 0)
         end_time = datetime.time(11, 0)
-        appt_request = self.create_appointment_request_(
-                service=self.service1,
-                staff_member=self.staff_member1,
-                date_=self.next_wednesday,
-                start_time=start_time,
-                end_time=end_time
-        )
-        self.create_appointment_(user=self.users['client1'], appointment_request=appt_request)
+        with self.captureOnCommitCallbacks(execute=True):
+            appt_request = self.create_appointment_request_(
+                    service=self.service1,
+                    staff_member=self.staff_member1,
+                    date_=self.next_wednesday,
+                    start_time=start_time,
+                    end_time=end_time
+            )
+            self.create_appointment_(user=self.users['client1'], appointment_request=appt_request)
 
         # Re-calculate slots after booking
         updated_slots = get_available_slots_for_staff(self.next_wednesday, self.staff_member1, 3)
@@ -678,6 +701,110 @@ class GetAvailableSlotsForStaffTests(BaseTest):
         tuesday_slots = get_available_slots_for_staff(self.next_tuesday, self.staff_member1, 2)
         self.assertEqual(tuesday_slots, [], "Tuesday should have no slots (staff doesn't work)")
 
+    def test_available_slots_for_range(self):
+        """The slots of a range match the slots computed one day at a time."""
+        start_date = self.today + datetime.timedelta(days=1)
+        end_date = start_date + datetime.timedelta(days=13)
+        appt_request = self.create_appointment_request_(service=self.service1, staff_member=self.staff_member1,
+                                                        date_=self.next_wednesday, start_time=datetime.time(10, 0),
+                                                        end_time=datetime.time(11, 0))
+        self.create_appointment_(user=self.users['client1'], appointment_request=appt_request)
+        slots_by_date = get_available_slots_for_range(self.staff_member1, start_date, end_date)
+        self.assertEqual(len(slots_by_date), 14)
+        for date_, slots in slots_by_date.items():
+            day_slots = get_available_slots_for_staff(date_, self.staff_member1, (date_.weekday() + 1) % 7)
+            self.assertEqual(slots, day_slots)
+        self.assertEqual(len(slots_by_date[self.next_wednesday]), 7)
+
+    def test_available_slots_for_range_query_count(self):
+        """The number of queries doesn't depend on the number of days in the range."""
+        start_date = self.today + datetime.timedelta(days=1)
+        get_config()  # Warm the configuration cache, only its version is read again
+        with self.assertNumQueries(5):
+            get_available_slots_for_range(self.staff_member1, start_date, start_date + datetime.timedelta(days=59))
+
+    def test_next_available_date_skips_days_off_and_non_working_days(self):
+        wednesday = self.next_monday + datetime.timedelta(days=2)
+        self.assertEqual(get_next_available_date(self.staff_member1, start_date=self.next_monday), wednesday)
+
+    def test_next_available_date_skips_fully_booked_days(self):
+        wednesday = self.next_monday + datetime.timedelta(days=2)
+        for hour in range(9, 17):
+            appt_request = self.create_appointment_request_(service=self.service1, staff_member=self.staff_member1,
+                                                            date_=wednesday, start_time=datetime.time(hour, 0),
+                                                            end_time=datetime.time(hour + 1, 0))
+            self.create_appointment_(user=self.users['client1'], appointment_request=appt_request)
+        self.assertEqual(get_next_available_date(self.staff_member1, start_date=self.next_monday),
+                         self.next_monday + datetime.timedelta(days=7))
+
+    def test_next_available_date_none(self):
+        """Without working hours, or on a period made only of days off, there is no available date."""
+        self.assertIsNone(get_next_available_date(self.staff_member2))
+        self.assertIsNone(get_next_available_date(self.staff_member1, start_date=self.next_monday, max_days=1))
+
+    def test_next_available_date_query_count(self):
+        """The search costs a few queries per window of 60 days, whatever the number of days in it."""
+        DayOff.objects.create(staff_member=self.staff_member1, start_date=self.next_monday,
+                              end_date=self.next_monday + datetime.timedelta(days=300))
+        get_config()  # Warm the configuration cache
+        # 5 windows made only of days off (working hours + days off), then the working hours, days off, availability
+        # and configuration versions and intervals of the 6th window
+        with self.assertNumQueries(5 * 2 + 5):
+            self.assertIsNotNone(get_next_available_date(self.staff_member1, start_date=self.next_monday))
+
+    def test_available_slots_for_range_too_long(self):
+        start_date = self.today + datetime.timedelta(days=1)
+        with self.assertRaises(ValueError):
+            get_available_slots_for_range(self.staff_member1, start_date, start_date + datetime.timedelta(days=60))
+
+
+class GetAvailableSlotsForServiceTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.staff_member2.services_offered.add(self.service1)
+        self.date = get_next_weekday(datetime.date.today(), 2)  # Next Wednesday (day_of_week 3)
+        WorkingHours.objects.create(staff_member=self.staff_member1, day_of_week=3,
+                                    start_time=datetime.time(9, 0), end_time=datetime.time(12, 0))
+        WorkingHours.objects.create(staff_member=self.staff_member2, day_of_week=3,
+                                    start_time=datetime.time(11, 0), end_time=datetime.time(14, 0))
+        Config.objects.create(slot_duration=60, lead_time=datetime.time(9, 0), finish_time=datetime.time(17, 0),
+                              appointment_buffer_time=0)
+        get_config()
+
+    def tearDown(self):
+        WorkingHours.objects.all().delete()
+        Config.objects.all().delete()
+        super().tearDown()
+
+    def at(self, hour):
+        return datetime.datetime.combine(self.date, datetime.time(hour, 0))
+
+    def test_union_of_staff_slots(self):
+        offers = get_available_slots_for_service(self.service1, self.date)
+        self.assertEqual([offer['slot'] for offer in offers], [self.at(hour) for hour in range(9, 14)])
+        self.assertEqual(offers[0]['staff_member'], self.staff_member1)
+        self.assertEqual(offers[-1]['staff_member'], self.staff_member2)
+        # At 11:00, both are free
+        self.assertEqual(offers[2]['staff_members'], [self.staff_member1, self.staff_member2])
+
+    def test_assigns_the_least_busy_staff_member(self):
+        ar = self.create_appt_request_for_sm1(date_=self.date, start_time=datetime.time(9, 0),
+                                              end_time=datetime.time(10, 0))
+        self.create_appt_for_sm1(appointment_request=ar)
+        offers = {offer['slot']: offer for offer in get_available_slots_for_service(self.service1, self.date)}
+        self.assertNotIn(self.at(9), offers)
+        # staff_member1 has 2 free slots left, staff_member2 has 3
+        self.assertEqual(offers[self.at(11)]['staff_member'], self.staff_member2)
+
+    def test_staff_not_offering_the_service_is_ignored(self):
+        self.assertEqual(get_available_slots_for_service(self.service2, self.date)[0]['slot'], self.at(11))
+
+    def test_query_count_does_not_depend_on_staff_count(self):
+        """The staff members and the configuration version, then the availability versions, working hours, days off
+        and intervals of all of them."""
+        with self.assertNumQueries(6):
+            get_available_slots_for_service(self.service1, self.date)
+
 
 class UpdatePersonalInfoServiceTest(BaseTest):
 
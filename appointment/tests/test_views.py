@@ -7,11 +7,12 @@ import uuid
 from datetime import date, time, timedelta
 from unittest.mock import MagicMock, patch
 
+from asgiref.sync import iscoroutinefunction
 from django.contrib import messages
 from django.contrib.messages import get_messages
 from django.contrib.messages.middleware import MessageMiddleware
 from django.contrib.sessions.middleware import SessionMiddleware
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect
 from django.test import Client
 from django.test.client import RequestFactory
 from django.urls import reverse
@@ -32,6 +33,7 @@ from appointment.utils.error_codes import ErrorCode
 from appointment.views import (
     create_appointment, redirect_to_payment_or_thank_you_page, verify_user_and_login
 )
+from appointments.middleware import StaticFilesMiddleware
 
 
 class SlotTestCase(BaseTest):
@@ -68,6 +70,79 @@ class SlotTestCase(BaseTest):
         self.assertEqual(response.json()['message'], 'Date is in the past')
 
 
+class SlotRangeTestCase(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.url = reverse('appointment:available_slots_range_ajax')
+        self.start_date = date.today() + timedelta(days=1)
+
+    def get_(self, **params):
+        return self.client.get(self.url, params, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def test_get_available_slots_range_ajax(self):
+        """The view should return the available slots of every date in the range, keyed by ISO date."""
+        end_date = self.start_date + timedelta(days=6)
+        response = self.get_(start_date=self.start_date.isoformat(), end_date=end_date.isoformat(),
+                             staff_member=self.staff_member1.pk)
+        self.assertEqual(response.status_code, 200)
+        response_data = response.json()
+        self.assertTrue(response_data['success'])
+        self.assertEqual(len(response_data['available_slots']), 7)
+        self.assertIn(self.start_date.isoformat(), response_data['available_slots'])
+
+    def test_get_available_slots_range_ajax_past_date(self):
+        past_date = (date.today() - timedelta(days=1)).isoformat()
+        response = self.get_(start_date=past_date, end_date=self.start_date.isoformat(),
+                             staff_member=self.staff_member1.pk)
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(response.json()['errorCode'], ErrorCode.PAST_DATE.value)
+
+    def test_get_available_slots_range_ajax_range_too_long(self):
+        end_date = self.start_date + timedelta(days=60)
+        response = self.get_(start_date=self.start_date.isoformat(), end_date=end_date.isoformat(),
+                             staff_member=self.staff_member1.pk)
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(response.json()['errorCode'], ErrorCode.INVALID_DATE.value)
+
+    def test_get_available_slots_range_ajax_end_before_start(self):
+        end_date = self.start_date - timedelta(days=1)
+        response = self.get_(start_date=self.start_date.isoformat(), end_date=end_date.isoformat(),
+                             staff_member=self.staff_member1.pk)
+        self.assertFalse(response.json()['success'])
+
+
+class SlotAnyStaffTestCase(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.url = reverse('appointment:available_slots_any_staff_ajax', args=[self.service1.id])
+
+    def test_get_available_slots_any_staff_ajax(self):
+        selected_date = date.today() + timedelta(days=1)
+        WorkingHours.objects.create(staff_member=self.staff_member1, day_of_week=(selected_date.weekday() + 1) % 7,
+                                    start_time=time(9, 0), end_time=time(12, 0))
+        response = self.client.get(self.url, {'selected_date': selected_date.isoformat()},
+                                   HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 200)
+        response_data = response.json()
+        self.assertTrue(response_data['success'])
+        self.assertTrue(response_data['available_slots'])
+        self.assertEqual(response_data['available_slots'][0]['staff_member_id'], self.staff_member1.id)
+
+    def test_get_available_slots_any_staff_ajax_past_date(self):
+        past_date = (date.today() - timedelta(days=1)).isoformat()
+        response = self.client.get(self.url, {'selected_date': past_date}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(response.json()['errorCode'], ErrorCode.PAST_DATE.value)
+
+    def test_get_available_slots_any_staff_ajax_invalid_date(self):
+        for params in ({'selected_date': 'not-a-date'}, {}):
+            response = self.client.get(self.url, params, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            self.assertFalse(response.json()['success'])
+            self.assertEqual(response.json()['errorCode'], ErrorCode.INVALID_DATE.value)
+
+
 class AppointmentRequestTestCase(BaseTest):
     def setUp(self):
         super().setUp()
@@ -378,6 +453,141 @@ class AppointmentTestCase(BaseTest):
         self.assertTrue(Appointment.objects.filter(id=different_appointment.id).exists())
 
 
+class UserAppointmentsFeedTestCase(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.date = date.today() + timedelta(days=10)
+        self.appointment1 = self.create_appt_for_sm1(self.create_appt_request_for_sm1(date_=self.date))
+        self.appointment2 = self.create_appt_for_sm2(self.create_appt_request_for_sm2(date_=self.date))
+        # Outside of the requested window
+        self.create_appt_for_sm1(self.create_appt_request_for_sm1(date_=self.date + timedelta(days=40)))
+        self.url = reverse('appointment:get_user_appointments_feed')
+        self.window = {'start': f"{self.date - timedelta(days=7)}T00:00:00",
+                       'end': f"{self.date + timedelta(days=7)}T00:00:00"}
+
+    def test_staff_member_gets_own_appointments_in_window(self):
+        self.need_staff_login()
+        response = self.client.get(self.url, self.window)
+        self.assertEqual(response.status_code, 200)
+        events = response.json()
+        self.assertEqual([event['id'] for event in events], [self.appointment1.id])
+        self.assertEqual(events[0]['start'], self.appointment1.get_start_time().isoformat())
+        self.assertEqual(events[0]['title'], self.service1.name)
+
+    def test_superuser_gets_every_appointment_without_extra_queries(self):
+        self.need_superuser_login()
+        self.client.get(self.url, self.window)  # Warm the session and the cache
+        # Session, user, appointments: the rows bring their client, service and staff member along
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, self.window)
+        self.assertEqual({event['id'] for event in response.json()}, {self.appointment1.id, self.appointment2.id})
+
+    def test_end_is_excluded(self):
+        self.need_staff_login()
+        response = self.client.get(self.url, {'start': f"{self.date - timedelta(days=7)}T00:00:00",
+                                              'end': f"{self.date}T00:00:00"})
+        self.assertEqual(response.json(), [])
+        response = self.client.get(self.url, {'start': f"{self.date}T00:00:00", 'end': f"{self.date}T12:00:00"})
+        self.assertEqual(len(response.json()), 1)
+
+    def test_invalid_window(self):
+        self.need_staff_login()
+        response = self.client.get(self.url, {'start': self.window['end'], 'end': self.window['start']})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {'start': '2030-01-01', 'end': '2031-01-01'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 400)
+
+    def test_calendar_page_does_not_embed_appointments(self):
+        self.need_staff_login()
+        response = self.client.get(reverse('appointment:get_user_appointments'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.url)
+        self.assertNotContains(response, self.appointment1.get_absolute_url())
+
+
+class UserAppointmentsChangesTestCase(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.appointment1 = self.create_appt_for_sm1()
+        self.appointment2 = self.create_appt_for_sm2()
+        # Rows written long before the cursor
+        long_ago = timezone.now() - timedelta(hours=1)
+        Appointment.objects.update(updated_at=long_ago)
+        AppointmentRequest.objects.update(updated_at=long_ago)
+        self.since = timezone.now().isoformat()
+        self.url = reverse('appointment:get_user_appointments_changes')
+
+    def get_changes(self):
+        response = self.client.get(self.url, {'since': self.since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_no_changes(self):
+        self.need_staff_login()
+        data = self.get_changes()
+        self.assertEqual((data['updated'], data['deleted'], data['reset']), ([], [], False))
+        self.assertTrue(data['cursor'])
+
+    def test_updated_appointment(self):
+        self.need_staff_login()
+        self.appointment1.phone = '+12392350345'
+        self.appointment1.save()
+        data = self.get_changes()
+        self.assertEqual([event['id'] for event in data['updated']], [self.appointment1.id])
+        self.assertEqual(data['deleted'], [])
+
+    def test_rescheduled_appointment_request(self):
+        self.need_staff_login()
+        appointment_request = self.appointment1.appointment_request
+        appointment_request.date += timedelta(days=1)
+        appointment_request.save()
+        self.assertEqual([event['id'] for event in self.get_changes()['updated']], [self.appointment1.id])
+
+    def test_deleted_appointment(self):
+        self.need_staff_login()
+        appointment_id = self.appointment1.id
+        self.appointment1.delete()
+        self.appointment2.delete()  # Not in the staff member's calendar
+        data = self.get_changes()
+        self.assertEqual((data['updated'], data['deleted']), ([], [appointment_id]))
+
+    def test_deleted_service(self):
+        self.need_staff_login()
+        appointment_id = self.appointment1.id
+        self.service1.delete()
+        self.assertEqual(self.get_changes()['deleted'], [appointment_id])
+
+    def test_appointment_moved_to_another_staff_member(self):
+        appointment_request = self.appointment1.appointment_request
+        appointment_request.staff_member = self.staff_member2
+        appointment_request.save()
+        self.need_staff_login()
+        self.assertEqual(self.get_changes()['deleted'], [self.appointment1.id])
+        # Still in the calendar of the superuser, who sees every appointment
+        self.need_superuser_login()
+        data = self.get_changes()
+        self.assertEqual([event['id'] for event in data['updated']], [self.appointment1.id])
+        self.assertEqual(data['deleted'], [])
+
+    def test_expired_cursor_resets_the_calendar(self):
+        self.need_staff_login()
+        self.since = (timezone.now() - timedelta(days=365)).isoformat()
+        self.assertTrue(self.get_changes()['reset'])
+
+    def test_invalid_cursor(self):
+        self.need_staff_login()
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'since': 'yesterday'}).status_code, 400)
+
+    def test_calendar_page_gives_the_first_cursor(self):
+        self.need_staff_login()
+        response = self.client.get(reverse('appointment:get_user_appointments'))
+        self.assertContains(response, self.url)
+        self.assertIn('changes_cursor', response.context)
+
+
 class UpdateAppointmentTestCase(BaseTest):
     @classmethod
     def setUpClass(cls):
@@ -967,6 +1177,140 @@ class GetNonWorkingDaysAjaxTests(BaseTest):
         self.assertEqual(non_ajax_response.status_code, 200)
 
 
+class AsyncAjaxViewsTests(BaseTest):
+    """The hot AJAX views are async: served through the ASGI request path here."""
+
+    def setUp(self):
+        super().setUp()
+        # Mondays only (day_of_week 1)
+        WorkingHours.objects.create(staff_member=self.staff_member1, day_of_week=1, start_time=time(9, 0),
+                                    end_time=time(12, 0))
+        Config.objects.create(slot_duration=60, lead_time=time(9, 0), finish_time=time(17, 0),
+                              appointment_buffer_time=0)
+        today = date.today()
+        self.next_monday = today + timedelta(days=(7 - today.weekday()) % 7 or 7)
+        self.appointment = self.create_appt_for_sm1(self.create_appt_request_for_sm1(date_=self.next_monday))
+        self.ajax = {'X-Requested-With': 'XMLHttpRequest'}
+        self.superuser = self.users['superuser']
+        self.superuser.is_superuser = True
+        self.superuser.save()
+
+    async def test_available_slots(self):
+        response = await self.async_client.get(
+            reverse('appointment:available_slots_ajax'),
+            {'selected_date': self.next_monday.isoformat(), 'staff_member': self.staff_member1.pk},
+            headers=self.ajax)
+        self.assertEqual(response.status_code, 200)
+        # 9:00 is booked
+        self.assertEqual(response.json()['available_slots'], [f"{self.next_monday.isoformat()}T10:00:00",
+                                                              f"{self.next_monday.isoformat()}T11:00:00"])
+
+    async def test_available_slots_requires_ajax(self):
+        response = await self.async_client.get(reverse('appointment:available_slots_ajax'))
+        self.assertEqual(response.status_code, 400)
+
+    async def test_non_working_days(self):
+        response = await self.async_client.get(reverse('appointment:get_non_working_days_ajax'),
+                                               {'staff_member': self.staff_member1.pk},
+                                               headers=self.ajax)
+        self.assertEqual(sorted(response.json()['non_working_days']), [0, 2, 3, 4, 5, 6])
+
+    async def test_next_available_date(self):
+        url = reverse('appointment:request_next_available_slot', args=[self.service1.pk])
+        response = await self.async_client.get(url, {'staff_member': self.staff_member1.pk},
+                                               headers=self.ajax)
+        self.assertEqual(response.json()['next_available_date'], self.next_monday.isoformat())
+        response = await self.async_client.get(url, {'staff_member': 0}, headers=self.ajax)
+        self.assertEqual(response.json()['errorCode'], ErrorCode.STAFF_ID_REQUIRED.value)
+
+    async def test_calendar_appointments(self):
+        url = reverse('appointment:get_calendar_appointments_ajax')
+        data = {'year': self.next_monday.year, 'month': self.next_monday.month}
+        response = await self.async_client.get(url, data, headers=self.ajax)
+        self.assertEqual(response.status_code, 401)
+
+        await self.async_client.aforce_login(self.superuser)
+        response = await self.async_client.get(url, data, headers=self.ajax)
+        self.assertEqual(response.json()['days'], {self.next_monday.isoformat(): 1})
+
+    async def test_calendar_day_appointments(self):
+        await self.async_client.aforce_login(self.superuser)
+        response = await self.async_client.get(reverse('appointment:get_calendar_appointments_ajax'),
+                                               {'date': self.next_monday.isoformat()}, headers=self.ajax)
+        self.assertEqual(response.json()['appointments'], [
+            {'id': self.appointment.pk, 'service': self.service1.name, 'time': '09:00',
+             'client': self.appointment.get_client_name()}])
+
+    async def test_static_files_middleware_runs_in_async_mode(self):
+        async def view(request):
+            return HttpResponse("view")
+
+        middleware = StaticFilesMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().get('/static/js/appointments.js'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.get('Content-Type'), 'text/html; charset=utf-8')
+        response.close()
+        self.assertEqual((await middleware(RequestFactory().get('/static/missing.js'))).content, b"view")
+        self.assertEqual((await middleware(RequestFactory().get('/'))).content, b"view")
+
+
+class CalendarViewTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.superuser = self.users['superuser']
+        self.superuser.is_superuser = True
+        self.superuser.save()
+        # The last day of a month, the first day of the next one, and another day of the first month
+        self.last_day = date(2030, 1, 31)
+        for date_ in [self.last_day, self.last_day, date(2030, 2, 1), date(2030, 1, 2)]:
+            self.create_appt_for_sm1(self.create_appt_request_for_sm1(date_=date_))
+        self.ajax = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+        self.client.force_login(self.superuser)
+
+    def test_month_counts(self):
+        response = self.client.get(reverse('appointment:get_calendar_appointments_ajax'),
+                                   {'year': 2030, 'month': 1}, **self.ajax)
+        self.assertEqual(response.json()['days'], {'2030-01-02': 1, '2030-01-31': 2})
+
+    def test_december(self):
+        self.create_appt_for_sm1(self.create_appt_request_for_sm1(date_=date(2030, 12, 31)))
+        response = self.client.get(reverse('appointment:get_calendar_appointments_ajax'),
+                                   {'year': 2030, 'month': 12}, **self.ajax)
+        self.assertEqual(response.json()['days'], {'2030-12-31': 1})
+
+    def test_month_counts_in_one_query(self):
+        url = reverse('appointment:get_calendar_appointments_ajax')
+        self.client.get(url, {'year': 2030, 'month': 1}, **self.ajax)  # Warm the cache
+        with self.assertNumQueries(3):  # Session, user, aggregate
+            self.client.get(url, {'year': 2030, 'month': 1}, **self.ajax)
+
+    def test_day_appointments_in_one_query(self):
+        url = reverse('appointment:get_calendar_appointments_ajax')
+        self.client.get(url, {'date': self.last_day.isoformat()}, **self.ajax)  # Warm the cache
+        with self.assertNumQueries(3):  # Session, user, appointments with their service and client
+            response = self.client.get(url, {'date': self.last_day.isoformat()}, **self.ajax)
+        self.assertEqual(len(response.json()['appointments']), 2)
+
+    def test_invalid_day(self):
+        response = self.client.get(reverse('appointment:get_calendar_appointments_ajax'), {'date': '2030-02-30'},
+                                   **self.ajax)
+        self.assertEqual(response.status_code, 400)
+
+    def test_calendar_page_shows_counts(self):
+        response = self.client.get(reverse('appointment:calendar_view', args=[2030, 1]))
+        self.assertEqual(response.context['total_appointments'], 3)
+        days = {day['date']: day['count'] for week in response.context['calendar_days'] for day in week if day}
+        self.assertEqual(days[self.last_day], 2)
+        self.assertEqual(days[date(2030, 1, 3)], 0)
+
+    def test_client_sees_only_own_appointments(self):
+        self.client.force_login(self.users['client2'])
+        response = self.client.get(reverse('appointment:get_calendar_appointments_ajax'),
+                                   {'year': 2030, 'month': 1}, **self.ajax)
+        self.assertEqual(response.json()['days'], {})
+
+
 class AppointmentClientInformationTest(BaseTest):
     @classmethod
     def setUpClass(cls):
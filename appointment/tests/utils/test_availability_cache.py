@@ -0,0 +1,137 @@
+# test_availability_cache.py
+# Path: appointment/tests/utils/test_availability_cache.py
+
+import datetime
+
+from appointment.models import CacheVersion
+from appointment.services import get_available_slots_for_staff
+from appointment.tests.base.base_test import BaseTest
+from appointment.utils.availability_cache import (
+    bump_availability_version, get_availability_version, get_or_compute_slots, get_staff_version_key
+)
+from appointment.utils.db_helpers import Config, DayOff, WorkingHours, get_config
+
+
+class AvailabilityVersionTests(BaseTest):
+    def test_bump_staff_version(self):
+        version = get_availability_version(self.staff_member1.pk)
+        bump_availability_version(self.staff_member1.pk)
+        self.assertNotEqual(get_availability_version(self.staff_member1.pk), version)
+
+    def test_bump_global_version(self):
+        versions = [get_availability_version(sm.pk) for sm in (self.staff_member1, self.staff_member2)]
+        bump_availability_version()
+        for sm, version in zip((self.staff_member1, self.staff_member2), versions):
+            self.assertNotEqual(get_availability_version(sm.pk), version)
+
+    def test_get_or_compute_slots(self):
+        date = datetime.date(2030, 1, 7)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return ['slot']
+
+        self.assertEqual(get_or_compute_slots(self.staff_member1.pk, date, 1, 30, compute), ['slot'])
+        self.assertEqual(get_or_compute_slots(self.staff_member1.pk, date, 1, 30, compute), ['slot'])
+        self.assertEqual(len(calls), 1)
+        # Another slot duration is cached apart
+        get_or_compute_slots(self.staff_member1.pk, date, 1, 60, compute)
+        self.assertEqual(len(calls), 2)
+
+
+class AvailableSlotsCacheInvalidationTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        today = datetime.date.today()
+        # Next Wednesday (day_of_week 3)
+        self.date = today + datetime.timedelta(days=(2 - today.weekday()) % 7 + 7)
+        self.working_hours = WorkingHours.objects.create(staff_member=self.staff_member1, day_of_week=3,
+                                                         start_time=datetime.time(9, 0),
+                                                         end_time=datetime.time(12, 0))
+        Config.objects.create(slot_duration=60, lead_time=datetime.time(9, 0), finish_time=datetime.time(17, 0),
+                              appointment_buffer_time=0)
+        get_config()
+
+    def get_slots(self):
+        return get_available_slots_for_staff(self.date, self.staff_member1, 3)
+
+    def at(self, hour):
+        return datetime.datetime.combine(self.date, datetime.time(hour, 0))
+
+    def test_cache_hit_only_reads_the_versions(self):
+        self.assertEqual(len(self.get_slots()), 3)
+        # The availability version, and the configuration version as this isn't a request
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.get_slots()), 3)
+
+    def test_bumped_on_commit(self):
+        """Until the change is committed, other processes must keep reading the previous version."""
+        version = get_availability_version(self.staff_member1.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            DayOff.objects.create(staff_member=self.staff_member1, start_date=self.date, end_date=self.date)
+            self.assertEqual(get_availability_version(self.staff_member1.pk), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_availability_version(self.staff_member1.pk), version)
+
+    def test_version_bumped_by_another_process(self):
+        self.assertEqual(len(self.get_slots()), 3)
+        WorkingHours.objects.filter(pk=self.working_hours.pk).update(end_time=datetime.time(10, 0))
+        CacheVersion.objects.create(key=get_staff_version_key(self.staff_member1.pk), version=1)
+        self.assertEqual(self.get_slots(), [self.at(9)])
+
+    def test_new_appointment_invalidates(self):
+        self.get_slots()
+        with self.captureOnCommitCallbacks(execute=True):
+            ar = self.create_appt_request_for_sm1(date_=self.date, start_time=datetime.time(10, 0),
+                                                  end_time=datetime.time(11, 0))
+            self.create_appt_for_sm1(appointment_request=ar)
+        self.assertEqual(self.get_slots(), [self.at(9), self.at(11)])
+
+    def test_deleted_appointment_invalidates(self):
+        ar = self.create_appt_request_for_sm1(date_=self.date, start_time=datetime.time(10, 0),
+                                              end_time=datetime.time(11, 0))
+        appointment = self.create_appt_for_sm1(appointment_request=ar)
+        self.assertEqual(len(self.get_slots()), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+        self.assertEqual(len(self.get_slots()), 3)
+
+    def test_appointment_moved_to_another_staff_member_invalidates(self):
+        ar = self.create_appt_request_for_sm1(date_=self.date, start_time=datetime.time(10, 0),
+                                              end_time=datetime.time(11, 0))
+        self.create_appt_for_sm1(appointment_request=ar)
+        self.assertEqual(len(self.get_slots()), 2)
+        ar.staff_member = self.staff_member2
+        with self.captureOnCommitCallbacks(execute=True):
+            ar.save()
+        self.assertEqual(len(self.get_slots()), 3)
+
+    def test_working_hours_change_invalidates(self):
+        self.get_slots()
+        self.working_hours.end_time = datetime.time(10, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.working_hours.save()
+        self.assertEqual(self.get_slots(), [self.at(9)])
+
+    def test_day_off_invalidates(self):
+        self.get_slots()
+        with self.captureOnCommitCallbacks(execute=True):
+            DayOff.objects.create(staff_member=self.staff_member1, start_date=self.date, end_date=self.date)
+        self.assertEqual(self.get_slots(), [])
+
+    def test_staff_member_change_invalidates(self):
+        self.get_slots()
+        self.staff_member1.slot_duration = 30
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff_member1.save()
+        self.assertEqual(len(self.get_slots()), 6)
+
+    def test_config_change_invalidates(self):
+        self.get_slots()
+        config = Config.objects.get()
+        config.slot_duration = 90
+        with self.captureOnCommitCallbacks(execute=True):
+            config.save()
+        self.assertEqual(self.get_slots(), [self.at(9), datetime.datetime.combine(self.date, datetime.time(10, 30))])
@@ -0,0 +1,60 @@
+# test_benchmark.py
+# Path: appointment/tests/utils/test_benchmark.py
+
+from django.test import TestCase
+
+from appointment.models import Service
+from appointment.utils.benchmark import build_report, compare_reports, measure, percentile, summarize
+
+
+class PercentileTests(TestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([3, 1, 2], 0), 1)
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            percentile([], 50)
+
+    def test_summarize_in_milliseconds(self):
+        summary = summarize([0.001, 0.002, 0.003])
+        self.assertEqual(summary['min'], 1)
+        self.assertEqual(summary['p50'], 2)
+        self.assertEqual(summary['max'], 3)
+
+
+class MeasureTests(TestCase):
+    def test_measure(self):
+        calls = []
+        result = measure(lambda: list(Service.objects.all()), repeat=3, setup=lambda: calls.append(1))
+        self.assertEqual(result['runs'], 3)
+        self.assertEqual(result['queries'], 1)
+        self.assertGreater(result['peak_memory_bytes'], 0)
+        # One setup per timed run, plus one for the run counting the queries
+        self.assertEqual(len(calls), 4)
+
+    def test_invalid_repeat(self):
+        with self.assertRaises(ValueError):
+            measure(lambda: None, repeat=0)
+
+
+class CompareReportsTests(TestCase):
+    def report(self, p50, queries):
+        return build_report('test', [{'name': 'case', 'size': 10, 'wall_time_ms': {'p50': p50}, 'queries': queries}])
+
+    def test_no_regression(self):
+        self.assertEqual(compare_reports(self.report(10, 3), self.report(12, 3), threshold=0.25), [])
+
+    def test_slower(self):
+        regressions = compare_reports(self.report(10, 3), self.report(13, 3), threshold=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('case [10]', regressions[0])
+
+    def test_more_queries(self):
+        self.assertEqual(len(compare_reports(self.report(10, 3), self.report(10, 4))), 1)
+
+    def test_missing_results_are_ignored(self):
+        self.assertEqual(compare_reports({'results': []}, self.report(100, 30)), [])
@@ -0,0 +1,131 @@
+# test_config_cache.py
+# Path: appointment/tests/utils/test_config_cache.py
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from appointment.middleware import ConfigVersionMiddleware
+from appointment.tests.base.base_test import BaseTest
+from appointment.utils.cache_versions import bump_version
+from appointment.utils.config_cache import (
+    CONFIG_VERSION_KEY, get_cached_config, get_config_version, get_versions_checking_config
+)
+from appointment.utils.db_helpers import Config, get_website_name
+
+
+class GetCachedConfigTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.config = Config.objects.create(slot_duration=30, website_name="Stargate Command")
+
+    def tearDown(self):
+        Config.objects.all().delete()
+        cache.clear()
+        super().tearDown()
+
+    def test_memoized(self):
+        self.assertEqual(get_cached_config(), self.config)
+        # Outside of a request, only the version stamp is read each time
+        with self.assertNumQueries(2):
+            self.assertEqual(get_cached_config(), self.config)
+            self.assertEqual(get_website_name(), "Stargate Command")
+
+    def test_save_invalidates(self):
+        get_cached_config()
+        self.config.website_name = "Atlantis"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.config.save()
+        self.assertEqual(get_cached_config().website_name, "Atlantis")
+        self.assertEqual(get_website_name(), "Atlantis")
+
+    def test_version_bumped_on_commit(self):
+        """Other processes keep the previous configuration until the change is committed."""
+        get_cached_config()
+        version = get_config_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.config.save()
+        self.assertEqual(get_config_version(), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_config_version(), version)
+
+    def test_version_bumped_by_another_process(self):
+        """A change saved by another worker only reaches this one through the shared version stamp."""
+        get_cached_config()
+        Config.objects.filter(pk=self.config.pk).update(slot_duration=45)
+        self.assertEqual(get_cached_config().slot_duration, 30)
+        bump_version(CONFIG_VERSION_KEY)
+        self.assertEqual(get_cached_config().slot_duration, 45)
+
+
+class StaffMemberConfigTests(BaseTest):
+    def tearDown(self):
+        Config.objects.all().delete()
+        super().tearDown()
+
+    def test_staff_member_methods_do_not_query_the_config(self):
+        Config.objects.create(slot_duration=30)
+        get_cached_config()
+        # Only the version stamp, once per call outside of a request
+        with self.assertNumQueries(4):
+            self.assertEqual(self.staff_member1.get_slot_duration(), 30)
+            self.staff_member1.get_lead_time()
+            self.staff_member1.get_finish_time()
+            self.staff_member1.get_appointment_buffer_time()
+
+
+class ConfigVersionMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.config = Config.objects.create(website_name="Stargate Command")
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        Config.objects.all().delete()
+        cache.clear()
+        super().tearDown()
+
+    def test_version_checked_once_per_request(self):
+        def view(request):
+            name = get_website_name()
+            # Even a change from another worker isn't picked up in the middle of a request
+            bump_version(CONFIG_VERSION_KEY)
+            Config.objects.filter(pk=self.config.pk).update(website_name="Atlantis")
+            with self.assertNumQueries(0):
+                self.assertEqual(get_website_name(), name)
+            return HttpResponse(name)
+
+        middleware = ConfigVersionMiddleware(view)
+        self.assertEqual(middleware(self.factory.get('/')).content, b"Stargate Command")
+        self.assertEqual(ConfigVersionMiddleware(lambda request: HttpResponse(get_website_name()))(
+                self.factory.get('/')).content, b"Atlantis")
+
+    def test_stamp_checked_with_the_versions(self):
+        def view(request):
+            with self.assertNumQueries(1):
+                get_versions_checking_config(['test:version'])
+                name = get_website_name()
+            return HttpResponse(name)
+
+        get_website_name()
+        middleware = ConfigVersionMiddleware(view)
+        self.assertEqual(middleware(self.factory.get('/')).content, b"Stargate Command")
+
+    def test_no_query_without_a_config_read(self):
+        middleware = ConfigVersionMiddleware(lambda request: HttpResponse("Contact"))
+        with self.assertNumQueries(0):
+            middleware(self.factory.get('/'))
+
+    async def test_async_middleware(self):
+        async def view(request):
+            name = await sync_to_async(get_website_name)()
+            await sync_to_async(bump_version)(CONFIG_VERSION_KEY)
+            # Checked once for the request, even though the first read ran in a worker thread
+            self.assertEqual(await sync_to_async(get_website_name)(), name)
+            return HttpResponse(name)
+
+        middleware = ConfigVersionMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual((await middleware(self.factory.get('/'))).content, b"Stargate Command")
@@ -0,0 +1,122 @@
+# test_daily_stats.py
+# Path: appointment/tests/utils/test_daily_stats.py
+
+import datetime
+import json
+
+from django.urls import reverse
+from django.utils import timezone
+
+from appointment.models import Appointment, AppointmentRequest, DailyAppointmentStats, Service, StaffMember
+from appointment.tests.base.base_test import BaseTest
+from appointment.utils.daily_stats import add_to_daily_stats, rebuild_daily_stats
+
+
+class DailyStatsTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.date = datetime.date(2030, 1, 7)
+
+    def stats(self):
+        return sorted(DailyAppointmentStats.objects.filter(count__gt=0).values_list(
+            'date', 'service_id', 'staff_member_id', 'count'))
+
+    def book(self, date, count=1):
+        return [self.create_appt_for_sm1(self.create_appt_request_for_sm1(date_=date)) for _ in range(count)]
+
+    def test_kept_up_to_date_by_signals(self):
+        appointments = self.book(self.date, 2)
+        self.assertEqual(self.stats(), [(self.date, self.service1.pk, self.staff_member1.pk, 2)])
+        appointments[0].delete()
+        self.assertEqual(self.stats(), [(self.date, self.service1.pk, self.staff_member1.pk, 1)])
+
+    def test_rescheduled_appointment_moves(self):
+        appointment = self.book(self.date)[0]
+        request = appointment.appointment_request
+        request.date = self.date + datetime.timedelta(days=1)
+        request.staff_member = self.staff_member2
+        request.save()
+        self.assertEqual(self.stats(), [(request.date, self.service1.pk, self.staff_member2.pk, 1)])
+
+    def test_deleted_request_is_uncounted(self):
+        appointment = self.book(self.date)[0]
+        appointment.appointment_request.delete()
+        self.assertEqual(self.stats(), [])
+
+    def test_deleted_service_takes_its_statistics(self):
+        self.book(self.date, 2)
+        self.service1.delete()
+        self.assertFalse(DailyAppointmentStats.objects.exists())
+
+    def test_add_without_staff_member(self):
+        add_to_daily_stats(self.date, self.service1.pk, None, 1)
+        add_to_daily_stats(self.date, self.service1.pk, None, 1)
+        self.assertEqual(self.stats(), [(self.date, self.service1.pk, None, 2)])
+
+    def test_rebuild(self):
+        self.book(self.date, 2)
+        self.book(self.date + datetime.timedelta(days=3))
+        # Changes made without signals
+        DailyAppointmentStats.objects.all().delete()
+        Appointment.objects.filter(appointment_request__date=self.date).first().delete()
+        DailyAppointmentStats.objects.all().delete()
+
+        self.assertEqual(rebuild_daily_stats(), 2)
+        self.assertEqual(self.stats(), [(self.date, self.service1.pk, self.staff_member1.pk, 1),
+                                        (self.date + datetime.timedelta(days=3), self.service1.pk,
+                                         self.staff_member1.pk, 1)])
+
+    def test_rebuild_from_a_date(self):
+        self.book(self.date)
+        DailyAppointmentStats.objects.update(count=5)
+        rebuild_daily_stats(start=self.date + datetime.timedelta(days=1))
+        self.assertEqual(self.stats(), [(self.date, self.service1.pk, self.staff_member1.pk, 5)])
+
+
+class AdminDashboardTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        superuser = self.users['superuser']
+        superuser.is_superuser = True
+        superuser.save()
+        self.client.force_login(superuser)
+        self.today = timezone.now().date()
+        for days in [0, -1, -1, 3, -30]:
+            self.book(self.create_appt_request_for_sm1(date_=self.today + datetime.timedelta(days=max(days, 0))), days)
+        self.book(self.create_appt_request_for_sm2(date_=self.today), 0)
+
+    def book(self, appointment_request, days):
+        """Book an appointment, moved to today + days: past dates can't be booked, so the statistics are rebuilt."""
+        self.create_appointment_(user=self.users['client1'], appointment_request=appointment_request)
+        AppointmentRequest.objects.filter(pk=appointment_request.pk).update(
+            date=self.today + datetime.timedelta(days=days))
+        rebuild_daily_stats()
+
+    def test_statistics(self):
+        response = self.client.get(reverse('appointment:admin_dashboard'))
+        self.assertEqual(response.context['total_appointments'], 6)
+        self.assertEqual(response.context['confirmed_appointments'], 3)
+        self.assertEqual(response.context['past_appointments'], 3)
+        self.assertEqual(response.context['total_services'], Service.objects.count())
+        self.assertEqual(response.context['total_staff'], StaffMember.objects.count())
+        popular_services = [(service.pk, service.appointment_count) for service in
+                            response.context['popular_services']]
+        self.assertEqual(popular_services[:2], [(self.service1.pk, 5), (self.service2.pk, 1)])
+
+    def test_last_seven_days(self):
+        response = self.client.get(reverse('appointment:admin_dashboard'))
+        days = json.loads(response.context['appointments_by_day'])
+        self.assertEqual(len(days), 7)
+        self.assertEqual(days[-1], {'date': self.today.strftime('%Y-%m-%d'), 'day': self.today.strftime('%a'),
+                                    'count': 2})
+        self.assertEqual(days[-2]['count'], 2)
+
+    def test_number_of_queries_does_not_depend_on_appointments(self):
+        url = reverse('appointment:admin_dashboard')
+        self.client.get(url)  # Warm the cache
+        with self.assertNumQueries(7) as queries:
+            self.client.get(url)
+        for days in range(10):
+            self.book(self.create_appt_request_for_sm1(date_=self.today), -days)
+        with self.assertNumQueries(len(queries)):
+            self.client.get(url)
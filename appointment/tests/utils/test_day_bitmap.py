@@ -0,0 +1,108 @@
+# test_day_bitmap.py
+# Path: appointment/tests/utils/test_day_bitmap.py
+
+import datetime
+import random
+
+from django.test import TestCase
+
+from appointment.utils.day_bitmap import DayBitmap, MINUTES_PER_DAY, get_free_slot_starts, minute_of, time_of
+from appointment.utils.db_helpers import calculate_slots
+from appointment.utils.intervals import exclude_intervals
+
+
+class MinuteOfTests(TestCase):
+    def test_minute_of(self):
+        self.assertEqual(minute_of(datetime.time(9, 30)), 570)
+        self.assertEqual(minute_of(datetime.datetime(2030, 1, 7, 9, 30, 15)), 570)
+
+    def test_round_up(self):
+        self.assertEqual(minute_of(datetime.time(9, 30), round_up=True), 570)
+        self.assertEqual(minute_of(datetime.time(9, 30, 15), round_up=True), 571)
+
+    def test_time_of(self):
+        self.assertEqual(time_of(570), datetime.time(9, 30))
+
+
+class DayBitmapTests(TestCase):
+    def test_add_and_contains(self):
+        bitmap = DayBitmap.from_range(540, 600)
+        self.assertIn(540, bitmap)
+        self.assertIn(599, bitmap)
+        self.assertNotIn(600, bitmap)
+        self.assertNotIn(MINUTES_PER_DAY, bitmap)
+
+    def test_clipped_to_the_day(self):
+        self.assertEqual(DayBitmap.from_range(-10, 5).to_ranges(), [(0, 5)])
+        self.assertEqual(DayBitmap.from_range(1430, 2000).to_ranges(), [(1430, MINUTES_PER_DAY)])
+        self.assertFalse(DayBitmap.from_range(600, 540))
+
+    def test_overlaps_and_covers(self):
+        bitmap = DayBitmap.from_range(540, 600)
+        self.assertTrue(bitmap.overlaps(590, 620))
+        self.assertFalse(bitmap.overlaps(600, 620))
+        self.assertTrue(bitmap.covers(550, 560))
+        self.assertFalse(bitmap.covers(590, 620))
+
+    def test_discard_and_difference(self):
+        bitmap = DayBitmap.from_range(540, 600)
+        bitmap.discard(560, 570)
+        self.assertEqual(bitmap.to_ranges(), [(540, 560), (570, 600)])
+        self.assertEqual((bitmap - DayBitmap.from_range(540, 550)).to_ranges(), [(550, 560), (570, 600)])
+
+    def test_from_intervals_rounds_partial_end_minute_up(self):
+        bitmap = DayBitmap.from_intervals([(datetime.time(9, 0), datetime.time(9, 10, 30))])
+        self.assertEqual(bitmap.to_ranges(), [(540, 551)])
+
+    def test_run_starts(self):
+        bitmap = DayBitmap.from_range(10, 20) | DayBitmap.from_range(30, 33)
+        self.assertEqual(bitmap.run_starts(7).minutes(), [10, 11, 12, 13])
+        self.assertEqual(bitmap.run_starts(3).minutes(), list(range(10, 18)) + [30])
+        self.assertEqual(bitmap.run_starts(11).minutes(), [])
+
+    def test_grid(self):
+        self.assertEqual(DayBitmap.grid(540, 600, 15).minutes(), [540, 555, 570, 585])
+
+
+class GetFreeSlotStartsTests(TestCase):
+    def test_working_hours_only(self):
+        self.assertEqual(get_free_slot_starts(DayBitmap.from_range(540, 720), 60, grid_start=540), [540, 600, 660])
+
+    def test_booked_held_and_buffer(self):
+        booked = DayBitmap.from_range(630, 650)
+        held = DayBitmap.from_range(720, 730)
+        slots = get_free_slot_starts(DayBitmap.from_range(540, 780), 30, grid_start=540, first_start=560,
+                                     booked=booked, held=held)
+        # 540 is before the buffer, 630 overlaps the booking, 720 is held
+        self.assertEqual(slots, [570, 600, 660, 690, 750])
+
+    def test_invalid_slot_duration(self):
+        with self.assertRaises(ValueError):
+            get_free_slot_starts(DayBitmap.from_range(540, 720), 0, grid_start=540)
+
+    def test_matches_datetime_slots(self):
+        """The bitmap gives the same slots as calculate_slots followed by exclude_intervals."""
+        rng = random.Random(42)
+        date = datetime.date(2030, 1, 7)
+
+        def at(minute):
+            return datetime.datetime.combine(date, time_of(minute))
+
+        for _ in range(200):
+            start = rng.randrange(0, 720)
+            end = rng.randrange(start, MINUTES_PER_DAY)
+            slot_duration = rng.choice([5, 15, 20, 30, 45, 60, 90])
+            buffer_time = rng.choice([0, 0, 10, 30, 95])
+            booked = [(m, m + rng.randrange(1, 60)) for m in (rng.randrange(0, 1380) for _ in range(rng.randrange(6)))]
+            held = [(m, m + rng.randrange(1, 60)) for m in (rng.randrange(0, 1380) for _ in range(rng.randrange(3)))]
+
+            expected = calculate_slots(at(start), at(end), at(start) + datetime.timedelta(minutes=buffer_time),
+                                       datetime.timedelta(minutes=slot_duration))
+            expected = exclude_intervals(expected, booked=[(at(s), at(e)) for s, e in booked],
+                                         held=[(at(s), at(e)) for s, e in held],
+                                         slot_duration=datetime.timedelta(minutes=slot_duration))
+            minutes = get_free_slot_starts(DayBitmap.from_range(start, end), slot_duration, grid_start=start,
+                                           first_start=start + buffer_time,
+                                           booked=DayBitmap.from_intervals((at(s), at(e)) for s, e in booked),
+                                           held=DayBitmap.from_intervals((at(s), at(e)) for s, e in held))
+            self.assertEqual([at(minute) for minute in minutes], expected)
@@ -19,6 +19,7 @@ from appointment.models import Config, DayOff, PaymentInfo
 from appointment.settings import check_q_cluster
 from appointment.tests.base.base_test import BaseTest
 from appointment.tests.mixins.base_mixin import ConfigMixin
+from appointment.utils.config_cache import config_memo
 from appointment.utils.db_helpers import (
     Appointment, AppointmentRequest, AppointmentRescheduleHistory, Config, WorkingHours, calculate_slots,
     calculate_staff_slots, can_appointment_be_rescheduled, cancel_existing_reminder, check_day_off_for_staff,
@@ -242,7 +243,7 @@ class TestCreateAndSaveAppointment(BaseTest, TestCase):
         self.assertIsNotNone(appointment)
         self.assertEqual(appointment.client.email, client_data['email'])
         mock_logger_warning.assert_called_with(
-                f"Email reminder requested for appointment {appointment.id}, but django-q is not available.")
+                "Email reminder requested for appointment %s, but django-q is not available.", appointment.id)
 
 
 def get_mock_reverse(url_name, **kwargs):
@@ -339,7 +340,8 @@ class UpdateAppointmentReminderTest(BaseTest, TestCase):
 
         # Check that the logger.info was called with the expected message
         mock_logger.info.assert_called_once_with(
-                f"Reminder for appointment {self.appointment.id} is not scheduled per user's preference or past datetime."
+                "Reminder for appointment %s is not scheduled per user's preference or past datetime.",
+                self.appointment.id
         )
 
     @patch('appointment.utils.db_helpers.logger')
@@ -353,7 +355,8 @@ class UpdateAppointmentReminderTest(BaseTest, TestCase):
 
         # Check that the logger.info was called with the expected message
         mock_logger.info.assert_called_once_with(
-                f"Reminder for appointment {self.appointment.id} is not scheduled per user's preference or past datetime."
+                "Reminder for appointment %s is not scheduled per user's preference or past datetime.",
+                self.appointment.id
         )
 
 
@@ -404,6 +407,11 @@ class CanAppointmentBeRescheduledTests(BaseTest, ConfigMixin):
 
 
 class StaffChangeAllowedOnRescheduleTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        # The configuration is read through the memo of the process
+        config_memo.clear()
+
     def tearDown(self):
         super().tearDown()
         # Reset or delete the Config instance to ensure test isolation
@@ -618,6 +626,10 @@ class TestGetAppointmentByID(BaseTest):
 @patch('appointment.utils.db_helpers.APPOINTMENT_SLOT_DURATION', 30)
 @patch('appointment.utils.db_helpers.APPOINTMENT_WEBSITE_NAME', "django-appointment-website")
 class TestGetAppointmentConfigTimes(TestCase):
+    def setUp(self):
+        super().setUp()
+        config_memo.clear()
+
     def tearDown(self):
         super().tearDown()
         # Reset or delete the Config instance to ensure test isolation
@@ -739,15 +751,15 @@ class TestGetConfig(TestCase):
         self.assertEqual(config, db_config)
 
     def test_config_in_cache(self):
-        """Test when there's a Config object in the cache."""
-        db_config = Config.objects.create(finish_time='17:00:00')
-        cache.set('config', db_config)
+        """Test when the Config object is memoized."""
+        db_config = Config.objects.create(finish_time=datetime.time(17, 0))
+        get_config()
 
-        # Clear the database to ensure it won't be accessed
-        Config.objects.all().delete()
+        # Change the database without signals to ensure the row won't be read again
+        Config.objects.filter(pk=db_config.pk).update(finish_time='18:00:00')
 
         config = get_config()
-        self.assertEqual(config, db_config)
+        self.assertEqual(config.finish_time, db_config.finish_time)
 
 
 class TestGetDayOffById(BaseTest):  # Assuming you have a BaseTest class with some initial setups
@@ -0,0 +1,71 @@
+# test_intervals.py
+# Path: appointment/tests/utils/test_intervals.py
+
+import datetime
+
+from django.test import TestCase
+
+from appointment.utils.intervals import exclude_intervals, merge_intervals
+
+
+def dt(hour, minute=0):
+    return datetime.datetime(2030, 1, 7, hour, minute)
+
+
+class MergeIntervalsTests(TestCase):
+    def test_empty(self):
+        self.assertEqual(merge_intervals([]), [])
+
+    def test_sorts_and_merges_overlapping_and_touching(self):
+        intervals = [(dt(13), dt(14)), (dt(9), dt(10)), (dt(9, 30), dt(11)), (dt(11), dt(12))]
+        self.assertEqual(merge_intervals(intervals), [(dt(9), dt(12)), (dt(13), dt(14))])
+
+    def test_contained_interval(self):
+        self.assertEqual(merge_intervals([(dt(9), dt(17)), (dt(10), dt(11))]), [(dt(9), dt(17))])
+
+
+class ExcludeIntervalsTests(TestCase):
+    def setUp(self):
+        self.slots = [dt(hour) for hour in range(8, 13)]
+        self.slot_duration = datetime.timedelta(hours=1)
+
+    def test_no_intervals(self):
+        self.assertEqual(exclude_intervals(self.slots, slot_duration=self.slot_duration), self.slots)
+
+    def test_booked_interval_excludes_overlapping_slots(self):
+        """A booking from 10:30 to 11:30 overlaps both the 10:00 and the 11:00 slots."""
+        result = exclude_intervals(self.slots, booked=[(dt(10, 30), dt(11, 30))], slot_duration=self.slot_duration)
+        self.assertEqual(result, [dt(8), dt(9), dt(12)])
+
+    def test_booked_interval_touching_slot_is_not_an_overlap(self):
+        result = exclude_intervals(self.slots, booked=[(dt(9), dt(10))], slot_duration=self.slot_duration)
+        self.assertEqual(result, [dt(8), dt(10), dt(11), dt(12)])
+
+    def test_held_interval_excludes_slots_starting_inside(self):
+        """A hold only excludes the slots that start inside it, its end being excluded."""
+        result = exclude_intervals(self.slots, held=[(dt(9, 30), dt(11))])
+        self.assertEqual(result, [dt(8), dt(9), dt(11), dt(12)])
+
+    def test_booked_and_held_in_a_single_pass(self):
+        result = exclude_intervals(self.slots, booked=[(dt(8), dt(9))], held=[(dt(12), dt(12, 30))],
+                                   slot_duration=self.slot_duration)
+        self.assertEqual(result, [dt(9), dt(10), dt(11)])
+
+    def test_unsorted_input(self):
+        booked = [(dt(12), dt(13)), (dt(8), dt(9))]
+        result = exclude_intervals(list(reversed(self.slots)), booked=booked, slot_duration=self.slot_duration)
+        self.assertEqual(result, [dt(9), dt(10), dt(11)])
+
+    def test_matches_nested_loop(self):
+        """The sweep gives the same result as checking every slot against every booking."""
+        slot_duration = datetime.timedelta(minutes=15)
+        slots = [dt(8) + i * slot_duration for i in range(40)]
+        booked = [(dt(8) + datetime.timedelta(minutes=m), dt(8) + datetime.timedelta(minutes=m + d))
+                  for m, d in [(7, 20), (50, 5), (52, 60), (200, 45), (320, 1), (590, 30)]]
+        expected = [slot for slot in slots
+                    if not any(start < slot + slot_duration and slot < end for start, end in booked)]
+        self.assertEqual(exclude_intervals(slots, booked=booked, slot_duration=slot_duration), expected)
+
+    def test_booked_without_slot_duration(self):
+        with self.assertRaises(ValueError):
+            exclude_intervals(self.slots, booked=[(dt(8), dt(9))])
@@ -0,0 +1,104 @@
+# test_keyset.py
+# Path: appointment/tests/utils/test_keyset.py
+
+import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+
+from appointment.models import Appointment
+from appointment.tests.base.base_test import BaseTest
+from appointment.utils.keyset import KeysetPage, count_up_to, decode_cursor, encode_cursor
+
+ORDERING = ['-appointment_request__date', '-appointment_request__start_time', '-appointment_request_id']
+
+
+class CursorTests(TestCase):
+    def test_round_trip(self):
+        cursor = encode_cursor([datetime.date(2030, 1, 7), datetime.time(9, 30), 12])
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_cursor(cursor, 3), ['2030-01-07', '09:30:00', '12'])
+
+    def test_invalid(self):
+        self.assertIsNone(decode_cursor('not a cursor', 3))
+        self.assertIsNone(decode_cursor(encode_cursor([1, 2]), 3))
+
+
+class KeysetPageTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        # Two appointments at the same time, to check the tie-break on the id
+        date = datetime.date(2030, 1, 7)
+        times = [(date, 9), (date, 9), (date, 10), (date + datetime.timedelta(days=1), 8), (date, 11)]
+        for date_, hour in times:
+            self.create_appt_for_sm1(self.create_appt_request_for_sm1(
+                date_=date_, start_time=datetime.time(hour), end_time=datetime.time(hour, 30)))
+        self.expected = list(Appointment.objects.order_by(*ORDERING).values_list('pk', flat=True))
+
+    def pages(self, per_page):
+        pages, cursor = [], None
+        while True:
+            page = KeysetPage(Appointment.objects.all(), ORDERING, per_page, after=cursor)
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            cursor = page.next_cursor
+
+    def test_walks_every_row_once(self):
+        pages = self.pages(2)
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual([appointment.pk for page in pages for appointment in page], self.expected)
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+
+    def test_previous_page(self):
+        pages = self.pages(2)
+        page = KeysetPage(Appointment.objects.all(), ORDERING, 2, before=pages[2].previous_cursor)
+        self.assertEqual([appointment.pk for appointment in page], [appointment.pk for appointment in pages[1]])
+        self.assertTrue(page.has_next())
+        page = KeysetPage(Appointment.objects.all(), ORDERING, 2, before=page.previous_cursor)
+        self.assertEqual([appointment.pk for appointment in page], self.expected[:2])
+        self.assertFalse(page.has_previous())
+
+    def test_invalid_cursor_gives_the_first_page(self):
+        for cursor in ['garbage', encode_cursor(['not a date', '09:00', '1'])]:
+            page = KeysetPage(Appointment.objects.all(), ORDERING, 2, after=cursor)
+            self.assertEqual([appointment.pk for appointment in page], self.expected[:2])
+
+    def test_page_in_one_query(self):
+        cursor = self.pages(2)[1].next_cursor
+        with self.assertNumQueries(1):
+            KeysetPage(Appointment.objects.all(), ORDERING, 2, after=cursor)
+
+    def test_count_up_to(self):
+        self.assertEqual(count_up_to(Appointment.objects.all(), 3), (3, True))
+        self.assertEqual(count_up_to(Appointment.objects.all(), 5), (5, False))
+
+
+class MyAppointmentsTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        for day in range(12):
+            self.create_appt_for_sm1(self.create_appt_request_for_sm1(
+                date_=datetime.date(2030, 1, 1) + datetime.timedelta(days=day)))
+        self.client.force_login(self.users['client1'])
+        self.url = reverse('appointment:my_appointments')
+
+    def test_pages(self):
+        response = self.client.get(self.url)
+        first_page = response.context['appointments']
+        self.assertEqual(len(first_page), 10)
+        self.assertEqual(first_page[0].appointment_request.date, datetime.date(2030, 1, 12))
+        self.assertEqual(response.context['total_count'], 12)
+        self.assertFalse(response.context['more_than_total'])
+
+        response = self.client.get(self.url, {'after': first_page.next_cursor})
+        second_page = response.context['appointments']
+        self.assertEqual([a.appointment_request.date.day for a in second_page], [2, 1])
+        self.assertFalse(second_page.has_next())
+        self.assertContains(response, f'?before={second_page.previous_cursor}')
+
+    def test_other_clients_appointments_are_hidden(self):
+        self.client.force_login(self.users['client2'])
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['appointments']), 0)
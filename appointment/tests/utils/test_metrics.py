@@ -0,0 +1,137 @@
+# test_metrics.py
+# Path: appointment/tests/utils/test_metrics.py
+
+import datetime
+import tempfile
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from appointment.tests.base.base_test import BaseTest
+from appointment.utils import metrics
+from appointment.utils.availability_cache import get_or_compute_slots
+from appointment.utils.metrics import MetricsRegistry
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def test_counter(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('emails_total', 'Emails.', ['result'])
+        counter.inc(result='sent')
+        counter.inc(2, result='sent')
+        counter.inc(result='say "hi"\n')
+        self.assertEqual(registry.expose(), '# HELP emails_total Emails.\n'
+                                            '# TYPE emails_total counter\n'
+                                            'emails_total{result="say \\"hi\\"\\n"} 1\n'
+                                            'emails_total{result="sent"} 3\n')
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('queries', 'Queries.', ['view'], buckets=(1, 5))
+        for value in [0, 3, 4, 8]:
+            histogram.observe(value, view='index')
+        lines = registry.expose().splitlines()[2:]
+        self.assertEqual(lines, ['queries_bucket{view="index",le="1"} 1',
+                                 'queries_bucket{view="index",le="5"} 3',
+                                 'queries_bucket{view="index",le="+Inf"} 4',
+                                 'queries_sum{view="index"} 15',
+                                 'queries_count{view="index"} 4'])
+
+    def test_gauges(self):
+        self.assertIn('# TYPE pending gauge\npending 7\n', MetricsRegistry().expose([('pending', 'Pending.', 7)]))
+
+    def test_workers_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            workers = [MetricsRegistry(directory, flush_interval=60) for _ in range(2)]
+            for worker in workers:
+                # Cancel the pending flush before the directory is removed
+                self.addCleanup(worker.reset)
+            for worker in workers:
+                worker.counter('emails_total', 'Emails.').inc()
+                worker.histogram('duration', 'Duration.', buckets=(1,)).observe(0.5)
+            # The first record of a worker is written to its file at once, the next ones wait for the flush interval
+            text = workers[0].expose()
+            self.assertIn('emails_total 2\n', text)
+            self.assertIn('duration_count 1\n', text)
+            workers[1].flush()
+            text = workers[0].expose()
+            self.assertIn('duration_bucket{le="1"} 2\n', text)
+            self.assertIn('duration_count 2\n', text)
+
+    def test_values_are_written_at_the_end_of_the_interval(self):
+        with tempfile.TemporaryDirectory() as directory:
+            worker, scraper = MetricsRegistry(directory, flush_interval=0.5), MetricsRegistry(directory)
+            self.addCleanup(worker.reset)
+            counter = worker.counter('emails_total', 'Emails.')
+            scraper.counter('emails_total', 'Emails.')
+            counter.inc()
+            # Within the interval of the first flush, and no other request comes afterwards
+            counter.inc()
+            self.assertIn('emails_total 1\n', scraper.expose())
+            deadline = time.monotonic() + 5
+            while 'emails_total 2\n' not in scraper.expose() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertIn('emails_total 2\n', scraper.expose())
+
+    def test_forked_worker_starts_from_zero(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = MetricsRegistry(directory)
+            counter = registry.counter('emails_total', 'Emails.')
+            counter.inc()
+            path = registry.path
+            registry.reset()
+            self.assertNotEqual(registry.path, path)
+            self.assertEqual(counter.values, {})
+
+
+class SlotComputationsTests(SimpleTestCase):
+    def test_cache_hits_and_misses(self):
+        cache.clear()
+        before = dict(metrics.SLOT_COMPUTATIONS.values)
+        for _ in range(3):
+            get_or_compute_slots(1, datetime.date(2030, 1, 7), 1, 30, lambda: [], version='0.0')
+        self.assertEqual(metrics.SLOT_COMPUTATIONS.values[('miss',)] - before.get(('miss',), 0), 1)
+        self.assertEqual(metrics.SLOT_COMPUTATIONS.values[('hit',)] - before.get(('hit',), 0), 2)
+
+
+@patch('appointment.views_metrics.APPOINTMENT_METRICS_ENABLED', True)
+@patch('appointment.views_metrics.APPOINTMENT_METRICS_TOKEN', 'chevron-seven')
+class MetricsViewTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('appointment:metrics')
+
+    def test_disabled(self):
+        with patch('appointment.views_metrics.APPOINTMENT_METRICS_ENABLED', False):
+            self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_forbidden_without_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.client.force_login(self.users['client1'])
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_token(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer chevron-seven')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('appointment_email_reminders_pending 0\n', response.content.decode())
+
+    def test_superuser(self):
+        superuser = self.users['superuser']
+        superuser.is_superuser = True
+        superuser.save()
+        self.client.force_login(superuser)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_requests_are_recorded(self):
+        with patch('appointment.middleware.APPOINTMENT_METRICS_ENABLED', True):
+            self.client.get(reverse('appointment:index'))
+            response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer chevron-seven')
+        text = response.content.decode()
+        self.assertIn('appointment_http_request_duration_seconds_count{view="appointment:index",method="GET",'
+                      'status="200"}', text)
+        self.assertIn('appointment_db_queries_per_request_count{view="appointment:index"}', text)
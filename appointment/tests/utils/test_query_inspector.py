@@ -0,0 +1,119 @@
+# test_query_inspector.py
+# Path: appointment/tests/utils/test_query_inspector.py
+
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from django.test.client import RequestFactory
+from django.urls import reverse
+
+from appointment.models import StaffMember
+from appointment.tests.base.base_test import BaseTest
+from appointment.utils.query_inspector import (
+    QueryInspection, get_query_shape, instrument, read_reports, request_inspection, write_report
+)
+
+
+class QueryShapeTests(SimpleTestCase):
+    def test_parameters_are_ignored(self):
+        self.assertEqual(get_query_shape('SELECT "a"."id" FROM "a" WHERE "a"."id" = %s LIMIT 21'),
+                         'SELECT "a"."id" FROM "a" WHERE "a"."id" = ? LIMIT ?')
+        self.assertEqual(get_query_shape("SELECT * FROM t1 WHERE name = 'O''Neill' AND id IN (%s, %s, %s)"),
+                         get_query_shape("SELECT * FROM t1 WHERE name = 'Carter' AND id IN (%s)"))
+
+    def test_different_tables_differ(self):
+        self.assertNotEqual(get_query_shape('SELECT * FROM a WHERE id = %s'),
+                            get_query_shape('SELECT * FROM b WHERE id = %s'))
+
+
+class QueryInspectionTests(BaseTest):
+    def inspect(self, func, slow_query_ms=1000, repeat_threshold=2):
+        instrument()
+        inspection = QueryInspection(slow_query_ms, repeat_threshold)
+        token = request_inspection.set(inspection)
+        try:
+            func()
+        finally:
+            request_inspection.reset(token)
+        return inspection.get_report(RequestFactory().get('/fr/staff/'))
+
+    def test_n_plus_one_is_attributed_to_the_line(self):
+        def get_names():
+            return [staff_member.get_staff_member_name() for staff_member in StaffMember.objects.all()]
+
+        report = self.inspect(get_names)
+        self.assertEqual(report['queries'], 3)
+        repeated = report['repeated_queries']
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0]['count'], 2)
+        self.assertIn(get_user_model()._meta.db_table, repeated[0]['sql'])
+        self.assertRegex(repeated[0]['frame'], r'^appointment/models\.py:\d+ in get_staff_member_name$')
+
+    def test_no_report_without_finding(self):
+        self.assertIsNone(self.inspect(lambda: list(StaffMember.objects.select_related('user'))))
+
+    def test_slow_query(self):
+        report = self.inspect(lambda: StaffMember.objects.count(), slow_query_ms=0)
+        self.assertEqual(len(report['slow_queries']), 1)
+        self.assertIn('COUNT', report['slow_queries'][0]['sql'])
+        self.assertRegex(report['slow_queries'][0]['frame'], r'test_query_inspector\.py:\d+ in <lambda>$')
+
+    def test_queries_outside_a_request_are_not_inspected(self):
+        instrument()
+        with patch.object(QueryInspection, 'record') as record:
+            StaffMember.objects.count()
+        record.assert_not_called()
+
+
+class ReportFileTests(SimpleTestCase):
+    def test_newest_first(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'reports.jsonl')
+            self.assertEqual(read_reports(path), [])
+            for index in range(3):
+                write_report({'path': f'/{index}/', 'slow_queries': [], 'repeated_queries': []}, path)
+            with open(path, 'a', encoding='utf-8') as file:
+                file.write('{"path": "/being-writ')
+            self.assertEqual([report['path'] for report in read_reports(path, limit=3)], ['/2/', '/1/'])
+
+
+class QueryInspectorMiddlewareTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'reports.jsonl')
+        self.superuser = self.users['superuser']
+        self.superuser.is_superuser = self.superuser.is_staff = True
+        self.superuser.save()
+        self.client.force_login(self.superuser)
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def test_request_reported_and_listed(self):
+        with patch('appointment.middleware.APPOINTMENT_QUERY_INSPECTOR_ENABLED', True), \
+                patch('appointment.middleware.APPOINTMENT_QUERY_INSPECTOR_FILE', self.path), \
+                patch('appointment.middleware.APPOINTMENT_REPEATED_QUERY_THRESHOLD', 2):
+            self.client.get(reverse('appointment:user_profile', args=[self.users['staff1'].pk]))
+        with open(self.path, encoding='utf-8') as file:
+            report = json.loads(file.readline())
+        self.assertEqual(report['view'], 'appointment:user_profile')
+        self.assertIn('prepare_user_profile_data', report['repeated_queries'][0]['frame'])
+
+        with patch('appointment.admin.APPOINTMENT_QUERY_INSPECTOR_FILE', self.path):
+            response = self.client.get(reverse('admin:appointment_query_reports'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['reports'], [report])
+        self.assertContains(response, 'prepare_user_profile_data')
+
+    def test_admin_page_is_for_superusers(self):
+        staff = self.users['client1']
+        staff.is_staff = True
+        staff.save()
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(reverse('admin:appointment_query_reports')).status_code, 403)
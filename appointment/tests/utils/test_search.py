@@ -0,0 +1,115 @@
+# test_search.py
+# Path: appointment/tests/utils/test_search.py
+
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from appointment.models import Appointment
+from appointment.tests.base.base_test import BaseTest
+from appointment.utils.search import (
+    SQLITE_SEARCH_TABLE, get_search_terms, refresh_search_documents, search_appointments, uses_sqlite_search_table
+)
+
+
+class SearchTermsTests(TestCase):
+    def test_words(self):
+        self.assertEqual(get_search_terms(' Jack  O\'Neill '), ['jack', 'o', 'neill'])
+        self.assertEqual(get_search_terms('"*'), [])
+
+
+class SearchAppointmentsTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        # client1 is Georges Hammond, client2 Tealc Kree
+        self.appointment1 = self.create_appt_for_sm1()
+        self.appointment2 = self.create_appt_for_sm2()
+
+    def search(self, query):
+        return sorted(search_appointments(Appointment.objects.all(), query).values_list('pk', flat=True))
+
+    def test_search_document(self):
+        client = self.users['client1']
+        self.assertEqual(self.appointment1.search_document,
+                         f"{client.first_name} {client.last_name} {client.email} "
+                         f"{client.email.replace('@', ' ').replace('.', ' ').replace('-', ' ')} "
+                         f"{self.service1.name}".lower())
+
+    def test_prefix_search(self):
+        self.assertEqual(self.search('geo'), [self.appointment1.pk])
+        self.assertEqual(self.search('TEAL kre'), [self.appointment2.pk])
+        # Every word must match
+        self.assertEqual(self.search('tealc hammond'), [])
+
+    def test_search_by_email_and_service(self):
+        self.assertEqual(self.search(self.users['client2'].email), [self.appointment2.pk])
+        self.assertEqual(self.search('django-appointment'), [self.appointment1.pk, self.appointment2.pk])
+        self.assertEqual(self.search(self.service1.name.split()[0]), [self.appointment1.pk])
+
+    def test_empty_query(self):
+        self.assertEqual(self.search('  '), [self.appointment1.pk, self.appointment2.pk])
+
+    def test_client_renamed(self):
+        client = self.users['client1']
+        client.first_name = 'Vala'
+        client.email = 'vala.maldoran@example.com'
+        client.save()
+        self.assertEqual(self.search('vala'), [self.appointment1.pk])
+        self.assertEqual(self.search('georges'), [])
+
+    def test_login_does_not_refresh(self):
+        client = self.users['client1']
+        with self.assertNumQueries(1):
+            client.save(update_fields=['last_login'])
+
+    def test_client_changed_with_update_fields(self):
+        self.appointment1.client = self.users['client2']
+        self.appointment1.save(update_fields=['client'])
+        self.assertEqual(self.search('tealc'), [self.appointment1.pk, self.appointment2.pk])
+        self.assertEqual(self.search('georges'), [])
+
+    def test_other_update_fields_keep_the_document(self):
+        self.appointment1.want_reminder = True
+        with patch('appointment.signals.index_appointments') as index_appointments, \
+                patch.object(Appointment, 'get_search_document') as get_search_document:
+            self.appointment1.save(update_fields=['want_reminder'])
+        index_appointments.assert_not_called()
+        get_search_document.assert_not_called()
+
+    def test_service_renamed(self):
+        self.service2.name = 'Stargate Calibration'
+        self.service2.save()
+        self.assertEqual(self.search('calib'), [self.appointment2.pk])
+
+    def test_deleted_appointment(self):
+        self.appointment2.delete()
+        self.assertEqual(self.search('tealc'), [])
+
+    def test_deleted_service(self):
+        self.service2.delete()
+        self.assertEqual(self.search('tealc'), [])
+        if uses_sqlite_search_table(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT rowid FROM {SQLITE_SEARCH_TABLE}')
+                self.assertEqual([row[0] for row in cursor.fetchall()], [self.appointment1.pk])
+
+    def test_refresh_only_writes_changes(self):
+        self.assertEqual(refresh_search_documents(Appointment.objects.all()), 0)
+        Appointment.objects.filter(pk=self.appointment1.pk).update(search_document='')
+        self.assertEqual(refresh_search_documents(Appointment.objects.all()), 1)
+
+    def test_uses_the_full_text_index(self):
+        if not uses_sqlite_search_table(connection):
+            self.skipTest("No FTS5 table on this database")
+        self.assertIn(SQLITE_SEARCH_TABLE, str(search_appointments(Appointment.objects.all(), 'geo').query))
+
+    def test_my_appointments_search(self):
+        superuser = self.users['superuser']
+        superuser.is_superuser = True
+        superuser.save()
+        self.client.force_login(superuser)
+        response = self.client.get(reverse('appointment:my_appointments'), {'search': 'tealc'})
+        self.assertEqual([appointment.pk for appointment in response.context['appointments']],
+                         [self.appointment2.pk])
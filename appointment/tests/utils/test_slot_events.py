@@ -0,0 +1,132 @@
+# test_slot_events.py
+# Path: appointment/tests/utils/test_slot_events.py
+
+import datetime
+import json
+
+from asgiref.sync import sync_to_async
+from django.urls import reverse
+
+from appointment.tests.base.base_test import BaseTest
+from appointment.utils.db_helpers import Config, WorkingHours, get_config
+from appointment.utils import slot_events
+from appointment.utils.slot_events import format_event, stream_slot_events
+
+
+def parse_event(chunk):
+    fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+    return fields['event'], json.loads(fields['data'])
+
+
+class FormatEventTests(BaseTest):
+    def test_format_event(self):
+        event = format_event('slot-taken', {'slots': [datetime.datetime(2030, 1, 7, 9)]}, event_id='1.2')
+        self.assertEqual(event, 'id: 1.2\nevent: slot-taken\ndata: {"slots": ["2030-01-07T09:00:00"]}\n\n')
+
+    def test_format_event_without_id(self):
+        self.assertEqual(format_event('slots', {}), 'event: slots\ndata: {}\n\n')
+
+
+class StreamSlotEventsTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        today = datetime.date.today()
+        # Next Wednesday (day_of_week 3)
+        self.date = today + datetime.timedelta(days=(2 - today.weekday()) % 7 + 7)
+        WorkingHours.objects.create(staff_member=self.staff_member1, day_of_week=3, start_time=datetime.time(9, 0),
+                                    end_time=datetime.time(12, 0))
+        Config.objects.create(slot_duration=60, lead_time=datetime.time(9, 0), finish_time=datetime.time(17, 0),
+                              appointment_buffer_time=0)
+        get_config()
+        self.now = 0
+
+    def clock(self):
+        return self.now
+
+    async def stream(self, changes, max_duration=10, max_streams=10):
+        """Run the stream, applying one change of the schedule per poll, and return its events."""
+        changes = iter(changes)
+
+        def apply(change):
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+
+        async def sleep(seconds):
+            self.now += seconds
+            change = next(changes, None)
+            if change:
+                await sync_to_async(apply)(change)
+
+        events = stream_slot_events(self.staff_member1, self.date, poll_interval=1, max_duration=max_duration,
+                                    max_streams=max_streams, heartbeat_interval=5, sleep=sleep, clock=self.clock)
+        return [chunk async for chunk in events]
+
+    def at(self, hour):
+        return datetime.datetime.combine(self.date, datetime.time(hour, 0)).isoformat()
+
+    def book(self, hour):
+        ar = self.create_appt_request_for_sm1(date_=self.date, start_time=datetime.time(hour, 0),
+                                              end_time=datetime.time(hour + 1, 0))
+        self.appointment = self.create_appt_for_sm1(appointment_request=ar)
+
+    async def test_starts_with_the_available_slots(self):
+        chunks = await self.stream([], max_duration=0)
+        self.assertEqual(parse_event(chunks[0]), ('slots', {'date': self.date.isoformat(),
+                                                            'slots': [self.at(9), self.at(10), self.at(11)]}))
+
+    async def test_ends_with_a_stop_event(self):
+        chunks = await self.stream([], max_duration=0)
+        self.assertEqual(parse_event(chunks[-1]), ('stop', {'reason': 'timeout'}))
+        self.assertEqual(slot_events.open_streams, 0)
+
+    async def test_slot_taken_then_released(self):
+        chunks = await self.stream([lambda: self.book(10), lambda: self.appointment.delete()], max_duration=2)
+        events = [parse_event(chunk) for chunk in chunks[1:-1]]
+        self.assertEqual(events, [
+            ('slot-taken', {'date': self.date.isoformat(), 'slots': [self.at(10)]}),
+            ('slot-released', {'date': self.date.isoformat(), 'slots': [self.at(10)]}),
+        ])
+
+    async def test_unrelated_change_sends_nothing(self):
+        # Another staff member's schedule, then a change of this one's that leaves the slots as they are
+        other = await sync_to_async(self.create_appt_request_for_sm2)(
+            date_=self.date, start_time=datetime.time(10, 0), end_time=datetime.time(11, 0))
+        chunks = await self.stream([lambda: self.create_appt_for_sm2(appointment_request=other),
+                                    lambda: self.staff_member1.save()], max_duration=3)
+        self.assertEqual(len(chunks), 2)
+
+    async def test_keepalive_when_idle(self):
+        chunks = await self.stream([], max_duration=10)
+        self.assertEqual(chunks[1:-1], [': keepalive\n\n'] * 2)
+
+    async def test_stops_when_too_many_streams_are_open(self):
+        first = stream_slot_events(self.staff_member1, self.date, poll_interval=1, max_duration=10, max_streams=1)
+        await anext(first)
+        try:
+            chunks = await self.stream([], max_streams=1)
+        finally:
+            await first.aclose()
+        self.assertEqual([parse_event(chunk) for chunk in chunks], [('stop', {'reason': 'busy'})])
+        self.assertEqual(slot_events.open_streams, 0)
+
+    async def test_view_streams_events(self):
+        response = await self.async_client.get(reverse('appointment:available_slots_events'),
+                                               {'selected_date': self.date.isoformat(),
+                                                'staff_member': self.staff_member1.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(parse_event((await anext(stream)).decode())[1]['slots'],
+                         [self.at(9), self.at(10), self.at(11)])
+        await stream.aclose()
+
+    async def test_view_invalid_request(self):
+        response = await self.async_client.get(reverse('appointment:available_slots_events'), {'staff_member': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_view_disabled_under_wsgi(self):
+        # A stream would hold a sync worker for its whole duration
+        response = self.client.get(reverse('appointment:available_slots_events'),
+                                   {'selected_date': self.date.isoformat(), 'staff_member': self.staff_member1.pk})
+        self.assertEqual(response.status_code, 204)
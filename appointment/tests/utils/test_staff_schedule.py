@@ -0,0 +1,99 @@
+# test_staff_schedule.py
+# Path: appointment/tests/utils/test_staff_schedule.py
+
+import datetime
+
+from django.core.cache import cache
+
+from appointment.services import get_available_slots_for_staff
+from appointment.tests.base.base_test import BaseTest
+from appointment.utils.db_helpers import (
+    AppointmentRescheduleHistory, Config, DayOff, WorkingHours, calculate_staff_slots, check_day_off_for_staff,
+    get_config, get_working_hours_for_staff_and_day, is_working_day
+)
+from appointment.utils.staff_schedule import StaffScheduleSnapshot
+
+
+def next_weekday(weekday: int) -> datetime.date:
+    """Return the next date (after today) falling on the given python weekday (0=Monday)."""
+    today = datetime.date.today()
+    return today + datetime.timedelta(days=(weekday - today.weekday() - 1) % 7 + 1)
+
+
+class StaffScheduleSnapshotTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.monday = next_weekday(0)
+        self.wednesday = self.monday + datetime.timedelta(days=2)
+        # day_of_week: 0=Sunday, 1=Monday, ...
+        WorkingHours.objects.create(staff_member=self.staff_member1, day_of_week=1,
+                                    start_time=datetime.time(9, 0), end_time=datetime.time(17, 0))
+        WorkingHours.objects.create(staff_member=self.staff_member1, day_of_week=3,
+                                    start_time=datetime.time(9, 0), end_time=datetime.time(12, 0))
+        DayOff.objects.create(staff_member=self.staff_member1, start_date=self.monday, end_date=self.monday)
+        Config.objects.create(slot_duration=60, lead_time=datetime.time(9, 0), finish_time=datetime.time(17, 0),
+                              appointment_buffer_time=0)
+        get_config()  # Warm the configuration cache, as it would be after the first request
+
+    def tearDown(self):
+        WorkingHours.objects.all().delete()
+        DayOff.objects.all().delete()
+        Config.objects.all().delete()
+        cache.clear()
+        super().tearDown()
+
+    def test_end_date_before_start_date(self):
+        with self.assertRaises(ValueError):
+            StaffScheduleSnapshot(self.staff_member1, self.wednesday, self.monday)
+
+    def test_date_outside_of_range(self):
+        snapshot = StaffScheduleSnapshot(self.staff_member1, self.monday)
+        with self.assertRaises(ValueError):
+            snapshot.is_day_off(self.wednesday)
+
+    def test_matches_database_helpers(self):
+        snapshot = StaffScheduleSnapshot(self.staff_member1, self.monday, self.wednesday)
+        for date in (self.monday, self.wednesday):
+            self.assertEqual(check_day_off_for_staff(self.staff_member1, date, snapshot=snapshot),
+                             check_day_off_for_staff(self.staff_member1, date))
+            self.assertEqual(calculate_staff_slots(date, self.staff_member1, snapshot=snapshot),
+                             calculate_staff_slots(date, self.staff_member1))
+        for day in range(7):
+            self.assertEqual(is_working_day(self.staff_member1, day, snapshot=snapshot),
+                             is_working_day(self.staff_member1, day))
+            self.assertEqual(get_working_hours_for_staff_and_day(self.staff_member1, day, snapshot=snapshot),
+                             get_working_hours_for_staff_and_day(self.staff_member1, day))
+
+    def test_no_working_hours_means_every_day_is_a_working_day(self):
+        snapshot = StaffScheduleSnapshot(self.staff_member2, self.monday)
+        self.assertTrue(all(snapshot.is_working_day(day) for day in range(7)))
+
+    def test_booked_and_held_intervals(self):
+        ar = self.create_appt_request_for_sm1(date_=self.wednesday, start_time=datetime.time(10, 0),
+                                              end_time=datetime.time(11, 0))
+        self.create_appt_for_sm1(appointment_request=ar)
+        AppointmentRescheduleHistory.objects.create(
+                appointment_request=ar, date=self.wednesday, start_time=datetime.time(9, 0),
+                end_time=datetime.time(10, 0), staff_member=self.staff_member1, reschedule_status='pending')
+        snapshot = StaffScheduleSnapshot(self.staff_member1, self.monday, self.wednesday)
+
+        def at(hour):
+            return datetime.datetime.combine(self.wednesday, datetime.time(hour, 0))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(snapshot.get_booked_intervals(self.wednesday), [(at(10), at(11))])
+            self.assertEqual(snapshot.get_held_intervals(self.wednesday), [(at(9), at(10))])
+            self.assertEqual(snapshot.get_booked_intervals(self.monday), [])
+        self.assertEqual(get_available_slots_for_staff(self.wednesday, self.staff_member1, 3, snapshot=snapshot),
+                         [at(11)])
+
+    def test_available_slots_query_count(self):
+        """A working day costs one query per table: availability and configuration versions, working hours, days off
+        and booked/held intervals."""
+        with self.assertNumQueries(5):
+            slots = get_available_slots_for_staff(self.wednesday, self.staff_member1, 3)
+        self.assertEqual(len(slots), 3)
+        # A day off stops before touching the other tables
+        with self.assertNumQueries(3):
+            self.assertEqual(get_available_slots_for_staff(self.monday, self.staff_member1, 1), [])
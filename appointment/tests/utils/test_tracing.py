@@ -0,0 +1,134 @@
+# test_tracing.py
+# Path: appointment/tests/utils/test_tracing.py
+
+import json
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.template import Context, Template
+from django.test import TestCase
+from django.urls import reverse
+
+from appointment.middleware import TracingMiddleware
+from appointment.models import Service
+from appointment.utils.tracing import (
+    NULL_SPAN, SPAN_KIND_CLIENT, SPAN_KIND_SERVER, STATUS_CODE_ERROR, export_trace, instrument, record_trace,
+    start_span, traced
+)
+
+
+@traced('test.double')
+def double(value):
+    return value * 2
+
+
+class TracingTests(TestCase):
+    def test_nothing_recorded_outside_a_trace(self):
+        self.assertIs(start_span('idle'), NULL_SPAN)
+        self.assertEqual(double(2), 4)
+
+    def test_nested_spans(self):
+        with record_trace('GET') as root:
+            with start_span('outer', step=1) as outer:
+                self.assertEqual(double(3), 6)
+        spans = {span.name: span for span in root.trace.spans}
+        self.assertEqual(set(spans), {'GET', 'outer', 'test.double'})
+        self.assertIs(spans['test.double'].parent, outer)
+        self.assertIs(outer.parent, root)
+        self.assertIsNone(root.parent)
+        self.assertEqual(root.kind, SPAN_KIND_SERVER)
+        self.assertGreaterEqual(root.duration_ms, outer.duration_ms)
+
+    def test_error_status(self):
+        with self.assertRaises(ValueError):
+            with record_trace('GET') as root:
+                with start_span('failing'):
+                    raise ValueError
+        self.assertEqual([span.status for span in root.trace.spans], [STATUS_CODE_ERROR, STATUS_CODE_ERROR])
+        self.assertEqual(root.trace.spans[0].attributes['exception.type'], 'ValueError')
+
+    def test_queries_and_templates(self):
+        instrument()
+        with record_trace('GET') as root:
+            list(Service.objects.all())
+            Template('{% for i in "ab" %}{{ i }}{% endfor %}').render(Context())
+        query = next(span for span in root.trace.spans if span.name == 'db.query')
+        self.assertEqual(query.kind, SPAN_KIND_CLIENT)
+        self.assertIn('appointment_service', query.attributes['db.statement'])
+        self.assertIn('template.render', [span.name for span in root.trace.spans])
+
+    def test_export_otlp_json_lines(self):
+        with record_trace('GET', **{'http.request.method': 'GET', 'http.response.status_code': 200}) as root:
+            double(1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'traces.jsonl')
+            export_trace(root.trace, path)
+            export_trace(root.trace, path)
+            with open(path, encoding='utf-8') as file:
+                lines = file.readlines()
+        self.assertEqual(len(lines), 2)
+        spans = json.loads(lines[0])['resourceSpans'][0]['scopeSpans'][0]['spans']
+        child, parent = spans
+        self.assertEqual(child['parentSpanId'], parent['spanId'])
+        self.assertEqual(len(parent['traceId']), 32)
+        self.assertNotIn('parentSpanId', parent)
+        self.assertIn({'key': 'http.response.status_code', 'value': {'intValue': '200'}}, parent['attributes'])
+        self.assertLessEqual(int(parent['startTimeUnixNano']), int(child['startTimeUnixNano']))
+
+    def test_long_lines_do_not_interleave(self):
+        with record_trace('GET', **{'db.statement': 'x' * 100_000}) as root:
+            pass
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'traces.jsonl')
+            threads = [threading.Thread(target=lambda: [export_trace(root.trace, path) for _ in range(5)])
+                       for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with open(path, encoding='utf-8') as file:
+                lines = file.readlines()
+        self.assertEqual(len(lines), 20)
+        for line in lines:
+            self.assertEqual(json.loads(line), root.trace.to_otlp())
+
+
+class TracingMiddlewareTests(TestCase):
+    def test_not_used_when_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            TracingMiddleware(lambda request: None)
+
+    def test_request_exported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'traces.jsonl')
+            with patch('appointment.middleware.APPOINTMENT_TRACING_ENABLED', True), \
+                    patch('appointment.middleware.APPOINTMENT_TRACING_FILE', path):
+                self.client.get(reverse('appointment:index'))
+            with open(path, encoding='utf-8') as file:
+                lines = file.readlines()
+        self.assertEqual(len(lines), 1)
+        spans = json.loads(lines[0])['resourceSpans'][0]['scopeSpans'][0]['spans']
+        root = spans[-1]
+        self.assertTrue(root['name'].startswith('GET '))
+        attributes = {attribute['key']: attribute['value'] for attribute in root['attributes']}
+        self.assertEqual(attributes['http.response.status_code'], {'intValue': '200'})
+        self.assertEqual(attributes['django.view'], {'stringValue': 'appointment:index'})
+        self.assertIn('template.render', [span['name'] for span in spans])
+
+    async def test_async_request_exported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'traces.jsonl')
+            with patch('appointment.middleware.APPOINTMENT_TRACING_ENABLED', True), \
+                    patch('appointment.middleware.APPOINTMENT_TRACING_FILE', path), \
+                    patch('appointment.middleware.export_trace', wraps=export_trace) as export:
+                await self.async_client.get(reverse('appointment:index'))
+            with open(path, encoding='utf-8') as file:
+                lines = file.readlines()
+        self.assertEqual(len(lines), 1)
+        # Exported once, by the middleware, and not by record_trace on the event loop
+        export.assert_called_once()
+        root = json.loads(lines[0])['resourceSpans'][0]['scopeSpans'][0]['spans'][-1]
+        self.assertTrue(root['name'].startswith('GET '))
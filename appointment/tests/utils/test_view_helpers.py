@@ -4,7 +4,7 @@
 from django.http import HttpRequest
 from django.test import TestCase
 
-from appointment.utils.view_helpers import generate_random_id, get_locale, is_ajax
+from appointment.utils.view_helpers import CROCKFORD_BASE32, generate_random_id, generate_request_id, get_locale, is_ajax
 
 
 class GetLocaleTests(TestCase):
@@ -53,3 +53,22 @@ class GenerateRandomIdTests(TestCase):
         id1 = generate_random_id()
         id2 = generate_random_id()
         self.assertNotEqual(id1, id2)
+
+
+class GenerateRequestIdTests(TestCase):
+    """Test cases for generate_request_id"""
+
+    def test_format(self):
+        request_id = generate_request_id()
+        self.assertEqual(len(request_id), 26)
+        self.assertTrue(set(request_id) <= set(CROCKFORD_BASE32))
+        self.assertNotEqual(generate_request_id(), request_id)
+
+    def test_timestamp_prefix(self):
+        # The 10 first characters hold the milliseconds
+        self.assertEqual(generate_request_id(0)[:10], '0' * 10)
+        self.assertEqual(generate_request_id(1469918176.385)[:10], '01ARYZ6S41')
+
+    def test_sorted_by_creation_time(self):
+        ids = [generate_request_id(timestamp) for timestamp in (1700000000, 1700000000.001, 1800000000)]
+        self.assertEqual(sorted(ids), ids)
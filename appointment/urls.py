@@ -10,20 +10,23 @@ from django.urls import include, path
 
 from appointment.views import (
     admin_dashboard, appointment_client_information, appointment_request, appointment_request_submit, change_password_simple,
-    confirm_reschedule, contact, custom_logout, default_thank_you, enter_verification_code, get_available_slots_ajax, get_next_available_date_ajax,
-    get_non_working_days_ajax, index, my_appointments, new_appointment, prepare_reschedule_appointment, reschedule_appointment_submit, set_passwd,
+    confirm_reschedule, contact, custom_logout, default_thank_you, enter_verification_code, get_available_slots_ajax, get_available_slots_any_staff_ajax, get_available_slots_range_ajax, get_next_available_date_ajax,
+    get_non_working_days_ajax, get_slot_events, index, my_appointments, new_appointment, prepare_reschedule_appointment,
+    reschedule_appointment_submit, set_passwd,
     update_user_info_simple, user_login, user_register
     
 )
 from appointment.views_payment import select_payment_method, select_digital_wallet, bankily_payment, card_payment, bank_transfer, payment_success
 from appointment.views_calendar import calendar_view, get_calendar_appointments_ajax
+from appointment.views_metrics import metrics
 from appointment.views_admin import (
     add_day_off, add_or_update_service, add_or_update_staff_info, add_staff_member_info, add_working_hours,
     create_new_staff_member, delete_appointment, delete_appointment_ajax, delete_day_off, delete_service,
     delete_working_hours, display_appointment, email_change_verification_code, fetch_service_list_for_staff,
-    fetch_staff_list, get_service_list, get_user_appointments, is_user_staff_admin, make_superuser_staff_member,
-    remove_staff_member, remove_superuser_staff_member, update_appt_date_time, update_appt_min_info, update_day_off,
-    update_personal_info, update_working_hours, user_profile, validate_appointment_date
+    fetch_staff_list, get_service_list, get_user_appointments, get_user_appointments_changes,
+    get_user_appointments_feed, is_user_staff_admin, make_superuser_staff_member, remove_staff_member,
+    remove_superuser_staff_member, update_appt_date_time, update_appt_min_info, update_day_off, update_personal_info,
+    update_working_hours, user_profile, validate_appointment_date
 )
 
 app_name = 'appointment'
@@ -32,6 +35,8 @@ admin_urlpatterns = [
     # display the calendar with the events
     path('appointments/<str:response_type>/', get_user_appointments, name='get_user_event_type'),
     path('appointments/', get_user_appointments, name='get_user_appointments'),
+    path('appointments-feed/', get_user_appointments_feed, name='get_user_appointments_feed'),
+    path('appointments-changes/', get_user_appointments_changes, name='get_user_appointments_changes'),
 
     # create a new staff member and make/remove superuser staff member
     path('add-staff-member-info/', add_staff_member_info, name='add_staff_member_info'),
@@ -88,6 +93,10 @@ admin_urlpatterns = [
 
 ajax_urlpatterns = [
     path('available_slots/', get_available_slots_ajax, name='available_slots_ajax'),
+    path('available_slots/events/', get_slot_events, name='available_slots_events'),
+    path('available_slots_range/', get_available_slots_range_ajax, name='available_slots_range_ajax'),
+    path('available_slots_any_staff/<int:service_id>/', get_available_slots_any_staff_ajax,
+         name='available_slots_any_staff_ajax'),
     path('request_next_available_slot/<int:service_id>/', get_next_available_date_ajax,
          name='request_next_available_slot'),
     path('request_staff_info/', get_non_working_days_ajax, name='get_non_working_days_ajax'),
@@ -118,6 +127,7 @@ urlpatterns = [
     path('admin-dashboard/', admin_dashboard, name='admin_dashboard'),
     path('calendar/', calendar_view, name='calendar_view'),
     path('calendar/<int:year>/<int:month>/', calendar_view, name='calendar_view'),
+    path('metrics/', metrics, name='metrics'),
     # Profil utilisateur simplifié
     path('update-user-info-simple/', update_user_info_simple, name='update_user_info_simple'),
     path('change-password-simple/', change_password_simple, name='change_password_simple'),
@@ -0,0 +1,91 @@
+# availability_cache.py
+# Path: appointment/utils/availability_cache.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+import datetime
+
+from django.core.cache import cache
+
+from appointment.settings import APPOINTMENT_SLOTS_CACHE_TIMEOUT
+from appointment.utils.cache_versions import aget_versions, bump_version
+from appointment.utils.config_cache import get_versions_checking_config
+from appointment.utils.metrics import SLOT_COMPUTATIONS
+
+SLOTS_CACHE_PREFIX = 'appointment:slots'
+GLOBAL_VERSION_KEY = f'{SLOTS_CACHE_PREFIX}:version'
+
+
+def get_staff_version_key(staff_member_id) -> str:
+    return f'{SLOTS_CACHE_PREFIX}:version:{staff_member_id}'
+
+
+def bump_availability_version(staff_member_id=None):
+    """Invalidate the cached slots of a staff member, or of every staff member when no id is given.
+
+    Nothing is deleted: the version is part of the cache keys, so the old entries are simply never read again and
+    expire on their own. The version counters are kept in the database, so a bump made by any process reaches every
+    process. The signals call it once the transaction commits, so that no process caches slots computed from the data
+    being replaced under the new version.
+
+    :param staff_member_id: The id of the staff member whose schedule changed, or None for a global change.
+    """
+    bump_version(GLOBAL_VERSION_KEY if staff_member_id is None else get_staff_version_key(staff_member_id))
+
+
+def get_availability_versions(staff_member_ids) -> dict:
+    """Return the current version of the cached slots of several staff members, with one query, which also checks
+    the configuration stamp of the request if needed.
+
+    :param staff_member_ids: The ids of the staff members.
+    :return: A dictionary mapping each staff member id to its version.
+    """
+    staff_keys = {staff_member_id: get_staff_version_key(staff_member_id) for staff_member_id in staff_member_ids}
+    versions = get_versions_checking_config([GLOBAL_VERSION_KEY, *staff_keys.values()])
+    return {staff_member_id: f"{versions[GLOBAL_VERSION_KEY]}.{versions[key]}"
+            for staff_member_id, key in staff_keys.items()}
+
+
+def get_availability_version(staff_member_id) -> str:
+    """Return the current version of the cached slots of a staff member."""
+    return get_availability_versions([staff_member_id])[staff_member_id]
+
+
+async def aget_availability_version(staff_member_id) -> str:
+    """Async version of get_availability_version."""
+    staff_key = get_staff_version_key(staff_member_id)
+    versions = await aget_versions([GLOBAL_VERSION_KEY, staff_key])
+    return f"{versions[GLOBAL_VERSION_KEY]}.{versions[staff_key]}"
+
+
+def get_slots_cache_key(staff_member_id, date: datetime.date, day_of_week: int, slot_duration, version=None) -> str:
+    if version is None:
+        version = get_availability_version(staff_member_id)
+    return f'{SLOTS_CACHE_PREFIX}:{version}:{staff_member_id}:{date.isoformat()}:{day_of_week}:{slot_duration}'
+
+
+def get_or_compute_slots(staff_member_id, date: datetime.date, day_of_week: int, slot_duration, compute,
+                         version=None) -> list:
+    """Return the cached slot list of a staff member on a date, computing and caching it on a miss.
+
+    :param staff_member_id: The id of the staff member.
+    :param date: The date of the slots.
+    :param day_of_week: The day of the week the slots are computed for (0=Sunday, 6=Saturday).
+    :param slot_duration: The slot duration in minutes, slot lists of different durations are cached apart.
+    :param compute: A callable without arguments returning the slot list.
+    :param version: The availability version of the staff member, when the caller already read it. It must be read
+                    before the data the slots are computed from.
+    :return: The list of available slots.
+    """
+    key = get_slots_cache_key(staff_member_id, date, day_of_week, slot_duration, version)
+    slots = cache.get(key)
+    if slots is None:
+        SLOT_COMPUTATIONS.inc(cache='miss')
+        slots = compute()
+        cache.set(key, slots, APPOINTMENT_SLOTS_CACHE_TIMEOUT)
+    else:
+        SLOT_COMPUTATIONS.inc(cache='hit')
+    return slots
@@ -0,0 +1,138 @@
+# benchmark.py
+# Path: appointment/utils/benchmark.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+import datetime
+import json
+import math
+import platform
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, List
+
+import django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """Return the pct-th percentile of the values, with the nearest-rank method.
+
+    :param values: The measured values.
+    :param pct: The percentile, between 0 and 100.
+    :return: The smallest value such that at least pct percent of the values are lower or equal.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        raise ValueError("percentile of an empty list")
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Return the min, mean, max and the 50th, 95th and 99th percentiles of timings given in seconds, in ms."""
+    return {
+        'min': round(min(values) * 1000, 4),
+        'mean': round(statistics.fmean(values) * 1000, 4),
+        'p50': round(percentile(values, 50) * 1000, 4),
+        'p95': round(percentile(values, 95) * 1000, 4),
+        'p99': round(percentile(values, 99) * 1000, 4),
+        'max': round(max(values) * 1000, 4),
+    }
+
+
+def measure(func: Callable, repeat: int = 5, setup: Callable = None) -> dict:
+    """Measure the wall time, the number of queries and the peak memory of a callable.
+
+    The timed runs are done without tracemalloc, which slows Python code down a lot; the queries and the peak
+    memory are taken from one more run.
+
+    :param func: The callable to measure, called without arguments.
+    :param repeat: The number of timed runs.
+    :param setup: An optional callable run before each run and not measured (e.g. to clear a cache).
+    :return: A dict with the runs, wall_time_ms (see summarize), queries and peak_memory_bytes.
+    """
+    if repeat <= 0:
+        raise ValueError("repeat must be greater than 0.")
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {
+        'runs': repeat,
+        'wall_time_ms': summarize(timings),
+        'queries': len(queries.captured_queries),
+        'peak_memory_bytes': peak,
+    }
+
+
+def build_report(name: str, results: List[dict], **parameters) -> dict:
+    """Wrap benchmark results with what is needed to compare them between commits.
+
+    :param name: The name of the benchmark suite.
+    :param results: The results, each one a dict with at least a 'name' and a 'size'.
+    :param parameters: The parameters the suite was run with.
+    :return: The report, ready to be dumped as JSON.
+    """
+    return {
+        'benchmark': name,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'machine': platform.machine(),
+        },
+        'parameters': parameters,
+        'results': results,
+    }
+
+
+def write_report(report: dict, path: str):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, default=str)
+
+
+def compare_reports(baseline: dict, current: dict, threshold: float = 0.25, metric: str = 'p50') -> List[str]:
+    """List the regressions of a report against a baseline report of the same suite.
+
+    A result regresses when its wall time metric grew by more than the threshold, or when it runs more queries.
+    Results missing from either report are ignored.
+
+    :param baseline: The reference report.
+    :param current: The new report.
+    :param threshold: The tolerated relative slowdown, e.g. 0.25 for 25 %.
+    :param metric: The wall time statistic to compare.
+    :return: A description of each regression, empty when there is none.
+    """
+    reference = {(result['name'], result['size']): result for result in baseline.get('results', [])}
+    regressions = []
+    for result in current.get('results', []):
+        before = reference.get((result['name'], result['size']))
+        if before is None:
+            continue
+        label = f"{result['name']} [{result['size']}]"
+        old_time, new_time = before['wall_time_ms'][metric], result['wall_time_ms'][metric]
+        if old_time > 0 and new_time > old_time * (1 + threshold):
+            regressions.append(f"{label}: {metric} {old_time} ms -> {new_time} ms")
+        if result['queries'] > before['queries']:
+            regressions.append(f"{label}: {before['queries']} -> {result['queries']} queries")
+    return regressions
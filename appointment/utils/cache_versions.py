@@ -0,0 +1,48 @@
+# cache_versions.py
+# Path: appointment/utils/cache_versions.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+from django.apps import apps
+from django.db.models import F
+
+
+def get_versions(keys) -> dict:
+    """Return the current version of each key, with one query.
+
+    A key that was never bumped is at version 0. The counters live in the database, so every process reads the same
+    ones and they are never evicted.
+
+    :param keys: The version keys.
+    :return: A dictionary mapping each key to its version.
+    """
+    CacheVersion = apps.get_model('appointment', 'CacheVersion')
+    versions = dict.fromkeys(keys, 0)
+    versions.update(CacheVersion.objects.filter(key__in=versions).values_list('key', 'version'))
+    return versions
+
+
+async def aget_versions(keys) -> dict:
+    """Async version of get_versions."""
+    CacheVersion = apps.get_model('appointment', 'CacheVersion')
+    versions = dict.fromkeys(keys, 0)
+    async for key, version in CacheVersion.objects.filter(key__in=versions).values_list('key', 'version'):
+        versions[key] = version
+    return versions
+
+
+def bump_version(key):
+    """Increment the version of a key, atomically, creating its counter on the first bump.
+
+    :param key: The version key.
+    """
+    CacheVersion = apps.get_model('appointment', 'CacheVersion')
+    if CacheVersion.objects.filter(key=key).update(version=F('version') + 1):
+        return
+    _, created = CacheVersion.objects.get_or_create(key=key, defaults={'version': 1})
+    if not created:
+        # Created by another process in the meantime
+        CacheVersion.objects.filter(key=key).update(version=F('version') + 1)
@@ -0,0 +1,111 @@
+# config_cache.py
+# Path: appointment/utils/config_cache.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+from contextvars import ContextVar
+
+from django.apps import apps
+
+from appointment.utils.cache_versions import bump_version, get_versions
+
+CONFIG_VERSION_KEY = 'appointment:config:version'
+
+
+class ConfigVersionCheck:
+    """Whether the version stamp has been checked during the current request.
+
+    ConfigVersionMiddleware sets a new one for each request. It is mutable rather than a plain flag, so that a check
+    made in a worker thread (sync_to_async runs in a copy of the context) is seen by the rest of the request.
+    """
+
+    def __init__(self):
+        self.checked = False
+
+
+# Set by ConfigVersionMiddleware for the current request; None outside of a request
+config_version_check = ContextVar('config_version_check', default=None)
+
+
+class ConfigMemo:
+    """Process-local copy of the Config row, valid as long as the shared version stamp doesn't change.
+
+    The state is a single (version, config) tuple so that it is always read and replaced atomically.
+    """
+
+    def __init__(self):
+        self.state = None
+
+    def clear(self):
+        self.state = None
+
+
+config_memo = ConfigMemo()
+
+
+def get_config_version() -> int:
+    """Return the shared version stamp of the configuration, kept in the database so every process reads the same."""
+    return get_versions([CONFIG_VERSION_KEY])[CONFIG_VERSION_KEY]
+
+
+def bump_config_version():
+    """Make every process reload the configuration on its next request.
+
+    The signals call it once the transaction commits, so that no process reloads the previous configuration under the
+    new stamp.
+    """
+    bump_version(CONFIG_VERSION_KEY)
+    config_memo.clear()
+
+
+def refresh_config_memo(version: int = None):
+    """Reload the memoized configuration if the shared version stamp changed since it was loaded.
+
+    :param version: The version stamp, when the caller already read it.
+    :return: The (version, config) state of the memo.
+    """
+    if version is None:
+        version = get_config_version()
+    state = config_memo.state
+    if state is None or state[0] != version:
+        Config = apps.get_model('appointment', 'Config')
+        state = (version, Config.objects.first())
+        config_memo.state = state
+    return state
+
+
+def get_cached_config():
+    """Return the configuration, from the process-local memo whenever it is up-to-date.
+
+    Within a request going through ConfigVersionMiddleware, the version stamp is checked by the first call only, so
+    the later ones cost no query, and a request that never reads the configuration doesn't query the stamp at all.
+    Elsewhere (management commands, tasks, tests), the stamp is checked each time, with one query.
+
+    :return: The Config object, or None if there is none.
+    """
+    check = config_version_check.get()
+    state = config_memo.state
+    if state is None or check is None or not check.checked:
+        state = refresh_config_memo()
+        if check is not None:
+            check.checked = True
+    return state[1]
+
+
+def get_versions_checking_config(keys) -> dict:
+    """Return the current version of each key, like get_versions, and check the configuration stamp in the same query
+    if the current request hasn't checked it yet, so that a request reading both pays for a single query.
+
+    :param keys: The version keys.
+    :return: A dictionary mapping each key to its version.
+    """
+    check = config_version_check.get()
+    if check is None or check.checked:
+        return get_versions(keys)
+    versions = get_versions([*keys, CONFIG_VERSION_KEY])
+    refresh_config_memo(versions[CONFIG_VERSION_KEY])
+    check.checked = True
+    return {key: versions[key] for key in keys}
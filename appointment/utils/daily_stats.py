@@ -0,0 +1,69 @@
+# daily_stats.py
+# Path: appointment/utils/daily_stats.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from appointment.models import Appointment, DailyAppointmentStats
+
+
+def add_to_daily_stats(date, service_id, staff_member_id, delta: int):
+    """Add delta appointments to the statistics of a date, service and staff member.
+
+    The counter is updated in SQL (count = count + delta), so concurrent bookings don't overwrite each other. It never
+    goes below zero, even when an appointment already deleted is deleted again.
+
+    :param date: The date of the appointments.
+    :param service_id: The id of their service.
+    :param staff_member_id: The id of their staff member, or None.
+    :param delta: The number of appointments added (negative when they are removed).
+    """
+    rows = DailyAppointmentStats.objects.filter(date=date, service_id=service_id, staff_member_id=staff_member_id)
+    # A unique constraint doesn't stop NULL duplicates (a deleted staff member): only one row is updated
+    first_row = rows.order_by('pk').values('pk')[:1]
+    updated = DailyAppointmentStats.objects.filter(pk__in=first_row).update(count=Greatest(F('count') + delta, 0))
+    if updated or delta <= 0:
+        return
+    try:
+        with transaction.atomic():
+            DailyAppointmentStats.objects.create(date=date, service_id=service_id, staff_member_id=staff_member_id,
+                                                 count=delta)
+    except IntegrityError:
+        # Created by a concurrent booking in the meantime
+        rows.update(count=F('count') + delta)
+
+
+def rebuild_daily_stats(start=None, end=None) -> int:
+    """Compute the statistics again from the appointments, with a single grouped query.
+
+    :param start: The first date to rebuild (included), or None for no lower bound.
+    :param end: The last date to rebuild (excluded), or None for no upper bound.
+    :return: The number of statistics rows written.
+    """
+    appointments = Appointment.objects.all()
+    stats = DailyAppointmentStats.objects.all()
+    if start:
+        appointments = appointments.filter(appointment_request__date__gte=start)
+        stats = stats.filter(date__gte=start)
+    if end:
+        appointments = appointments.filter(appointment_request__date__lt=end)
+        stats = stats.filter(date__lt=end)
+    rows = appointments.values(
+        'appointment_request__date', 'appointment_request__service_id', 'appointment_request__staff_member_id'
+    ).annotate(count=Count('id')).order_by()
+    with transaction.atomic():
+        stats.delete()
+        created = DailyAppointmentStats.objects.bulk_create([
+            DailyAppointmentStats(date=row['appointment_request__date'],
+                                  service_id=row['appointment_request__service_id'],
+                                  staff_member_id=row['appointment_request__staff_member_id'],
+                                  count=row['count'])
+            for row in rows.iterator()
+        ], batch_size=1000)
+    return len(created)
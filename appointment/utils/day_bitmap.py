@@ -0,0 +1,168 @@
+# day_bitmap.py
+# Path: appointment/utils/day_bitmap.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+import datetime
+from typing import Iterable, List, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def minute_of(value, round_up: bool = False) -> int:
+    """Return the minute of the day of a time or a datetime.
+
+    :param value: A datetime.time or a datetime.datetime.
+    :param round_up: Round a time with seconds up to the next minute instead of down, for the end of a range.
+    :return: The minute of the day, between 0 and 1440.
+    """
+    minute = value.hour * 60 + value.minute
+    if round_up and (value.second or value.microsecond):
+        minute += 1
+    return minute
+
+
+def time_of(minute: int) -> datetime.time:
+    """Return the time of a minute of the day."""
+    return datetime.time(minute // 60, minute % 60)
+
+
+class DayBitmap:
+    """Minute-granularity occupancy of a single day, stored in one integer: bit `m` is set when minute `m` is covered.
+
+    Adding a range, testing an overlap or finding every start of a free run of `n` minutes are a handful of integer
+    operations on 1440 bits, instead of comparisons between lists of datetime objects.
+    """
+
+    __slots__ = ('bits',)
+
+    def __init__(self, bits: int = 0):
+        self.bits = bits
+
+    def __repr__(self):
+        return f"<DayBitmap {self.to_ranges()}>"
+
+    def __eq__(self, other):
+        return isinstance(other, DayBitmap) and self.bits == other.bits
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __contains__(self, minute: int) -> bool:
+        return 0 <= minute < MINUTES_PER_DAY and bool(self.bits >> minute & 1)
+
+    @staticmethod
+    def mask(start: int, end: int) -> int:
+        """Return the bits of the half-open range of minutes [start, end), clipped to the day."""
+        start, end = max(start, 0), min(end, MINUTES_PER_DAY)
+        if end <= start:
+            return 0
+        return ((1 << (end - start)) - 1) << start
+
+    @classmethod
+    def from_range(cls, start: int, end: int) -> 'DayBitmap':
+        return cls(cls.mask(start, end))
+
+    @classmethod
+    def from_intervals(cls, intervals: Iterable[Tuple]) -> 'DayBitmap':
+        """Build a bitmap from (start, end) times or datetimes, a partial minute at the end counting as covered."""
+        bitmap = cls()
+        for start, end in intervals:
+            bitmap.add(minute_of(start), minute_of(end, round_up=True))
+        return bitmap
+
+    @classmethod
+    def grid(cls, start: int, end: int, step: int) -> 'DayBitmap':
+        """Return the bitmap of the minutes start, start + step, start + 2 × step, ... before end."""
+        bits = 0
+        for minute in range(max(start, 0), min(end, MINUTES_PER_DAY), step):
+            bits |= 1 << minute
+        return cls(bits)
+
+    def add(self, start: int, end: int):
+        self.bits |= self.mask(start, end)
+
+    def discard(self, start: int, end: int):
+        self.bits &= ~self.mask(start, end)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        return bool(self.bits & self.mask(start, end))
+
+    def covers(self, start: int, end: int) -> bool:
+        mask = self.mask(start, end)
+        return mask != 0 and self.bits & mask == mask
+
+    def __and__(self, other: 'DayBitmap') -> 'DayBitmap':
+        return DayBitmap(self.bits & other.bits)
+
+    def __or__(self, other: 'DayBitmap') -> 'DayBitmap':
+        return DayBitmap(self.bits | other.bits)
+
+    def __sub__(self, other: 'DayBitmap') -> 'DayBitmap':
+        return DayBitmap(self.bits & ~other.bits)
+
+    def run_starts(self, length: int) -> 'DayBitmap':
+        """Return the minutes at which a run of `length` set minutes starts.
+
+        Bit `m` of the result is set when minutes m to m + length - 1 are all set. The shifted copies are combined by
+        doubling, so it costs O(log length) operations.
+        """
+        if length <= 0:
+            return DayBitmap(self.bits)
+        bits, span = self.bits, 1
+        while span * 2 <= length:
+            bits &= bits >> span
+            span *= 2
+        if span < length:
+            bits &= bits >> (length - span)
+        return DayBitmap(bits)
+
+    def minutes(self) -> List[int]:
+        """Return the set minutes, in ascending order."""
+        result, bits = [], self.bits
+        while bits:
+            lowest = bits & -bits
+            result.append(lowest.bit_length() - 1)
+            bits ^= lowest
+        return result
+
+    def to_ranges(self) -> List[Tuple[int, int]]:
+        """Return the set minutes as a list of half-open [start, end) ranges."""
+        ranges = []
+        for minute in self.minutes():
+            if ranges and ranges[-1][1] == minute:
+                ranges[-1] = (ranges[-1][0], minute + 1)
+            else:
+                ranges.append((minute, minute + 1))
+        return ranges
+
+
+def get_free_slot_starts(working: DayBitmap, slot_duration: int, grid_start: int, first_start: int = None,
+                         booked: DayBitmap = None, held: DayBitmap = None) -> List[int]:
+    """Return the start minutes of the slots that fit in the working minutes without touching a booked minute.
+
+    A slot starts on the grid grid_start + k × slot_duration, at or after first_start, and needs slot_duration
+    working and unbooked minutes. A slot starting on a held minute is excluded too.
+
+    :param working: The working minutes of the day.
+    :param slot_duration: The duration of a slot, in minutes.
+    :param grid_start: The first minute of the slot grid, usually the start of the working hours.
+    :param first_start: The earliest minute a slot may start at (e.g. after the buffer time).
+    :param booked: The minutes taken by appointments.
+    :param held: The minutes held by pending reschedules.
+    :return: The start minutes of the available slots, in ascending order.
+    """
+    if slot_duration <= 0:
+        raise ValueError("slot_duration must be greater than 0.")
+    first = grid_start
+    if first_start is not None and first_start > grid_start:
+        # The first point of the grid at or after first_start
+        first = grid_start - (grid_start - first_start) // slot_duration * slot_duration
+    free = working - booked if booked else working
+    starts = free.run_starts(slot_duration) & DayBitmap.grid(first, MINUTES_PER_DAY, slot_duration)
+    if held:
+        starts = starts - held
+    return starts.minutes()
@@ -13,7 +13,6 @@ from urllib.parse import urlparse
 from django.apps import apps
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
 from django.core.exceptions import FieldDoesNotExist
 from django.db import OperationalError
 from django.urls import reverse
@@ -24,7 +23,10 @@ from appointment.settings import (
     APPOINTMENT_BUFFER_TIME, APPOINTMENT_FINISH_TIME, APPOINTMENT_LEAD_TIME, APPOINTMENT_PAYMENT_URL,
     APPOINTMENT_SLOT_DURATION, APPOINTMENT_WEBSITE_NAME
 )
+from appointment.utils.config_cache import get_cached_config
 from appointment.utils.date_time import combine_date_and_time, get_weekday_num
+from appointment.utils.intervals import exclude_intervals
+from appointment.utils.tracing import traced
 
 logger = get_logger(__name__)
 
@@ -77,39 +79,45 @@ def calculate_slots(start_time, end_time, buffer_time, slot_duration):
     return slots
 
 
-def calculate_staff_slots(date, staff_member):
+@traced('slots.calculate_staff_slots')
+def calculate_staff_slots(date, staff_member, snapshot=None):
     """Calculate the available slots for the given staff member on the given date.
 
     :param date: The date to calculate the slots for.
     :param staff_member: The staff member to calculate the slots for.
+    :param snapshot: An optional StaffScheduleSnapshot covering the date, to read from instead of the database.
     :return: A list of available slots.
     """
     # Convert the times to datetime objects
     weekday_num = get_weekday_num_from_date(date)
-    if not is_working_day(staff_member, weekday_num):
+    if not is_working_day(staff_member, weekday_num, snapshot=snapshot):
         return []
-    staff_member_start_time = get_staff_member_start_time(staff_member, date)
+    staff_member_start_time = get_staff_member_start_time(staff_member, date, snapshot=snapshot)
     start_time = datetime.datetime.combine(date, staff_member_start_time)
-    end_time = datetime.datetime.combine(date, get_staff_member_end_time(staff_member, date))
+    end_time = datetime.datetime.combine(date, get_staff_member_end_time(staff_member, date, snapshot=snapshot))
 
     # Convert the buffer duration in minutes to a timedelta object
-    buffer_duration_minutes = get_staff_member_buffer_time(staff_member, date)
+    buffer_duration_minutes = get_staff_member_buffer_time(staff_member, date, snapshot=snapshot)
     buffer_duration = datetime.timedelta(minutes=buffer_duration_minutes)
     buffer_time_init = datetime.datetime.combine(date, staff_member_start_time)
     buffer_time = buffer_time_init + buffer_duration
 
     # Convert slot duration to a timedelta object
-    slot_duration_minutes = get_staff_member_slot_duration(staff_member, date)
+    slot_duration_minutes = get_staff_member_slot_duration(staff_member, date, snapshot=snapshot)
     slot_duration = datetime.timedelta(minutes=slot_duration_minutes)
 
     return calculate_slots(start_time, end_time, buffer_time, slot_duration)
 
 
-def check_day_off_for_staff(staff_member, date) -> bool:
+@traced('slots.check_day_off_for_staff')
+def check_day_off_for_staff(staff_member, date, snapshot=None) -> bool:
     """Check if the given staff member is off on the given date.
     :param staff_member: The staff member to check.
     :param date: The date to check.
+    :param snapshot: An optional StaffScheduleSnapshot covering the date, to read from instead of the database.
     """
+    if snapshot is not None:
+        return snapshot.is_day_off(date)
     return DayOff.objects.filter(staff_member=staff_member, start_date__lte=date, end_date__gte=date).exists()
 
 
@@ -128,13 +136,14 @@ def create_and_save_appointment(ar, client_data: dict, appointment_data: dict, r
             **appointment_data
     )
     appointment.save()
-    logger.info(f"New appointment created: {appointment.to_dict()}")
+    logger.info("New appointment created: %s", appointment.to_dict())
     if appointment.want_reminder:
-        logger.info(f"User wants a reminder for appointment {appointment.id}, scheduling it...")
+        logger.info("User wants a reminder for appointment %s, scheduling it...", appointment.id)
         if DJANGO_Q_AVAILABLE:
             schedule_email_reminder(appointment, request)
         else:
-            logger.warning(f"Email reminder requested for appointment {appointment.id}, but django-q is not available.")
+            logger.warning("Email reminder requested for appointment %s, but django-q is not available.",
+                           appointment.id)
     return appointment
 
 
@@ -157,7 +166,7 @@ def schedule_email_reminder(appointment, request, appointment_datetime=None):
     relative_reschedule_url = reverse('appointment:prepare_reschedule_appointment', args=[ar_id_request])
     reschedule_link = get_absolute_url_(relative_reschedule_url, request)
 
-    logger.info(f"Scheduling email reminder for appointment {appointment.id} at {reminder_datetime}")
+    logger.info("Scheduling email reminder for appointment %s at %s", appointment.id, reminder_datetime)
 
     # Schedule the email reminder task with Django-Q
     try:
@@ -173,8 +182,8 @@ def schedule_email_reminder(appointment, request, appointment_datetime=None):
         # Handle case where django-q tables don't exist (migrations not run)
         if 'django_q_schedule' in str(e) or 'no such table' in str(e).lower():
             logger.warning(
-                f"Django-Q tables not found. Please run migrations: python manage.py migrate django_q. "
-                f"Email reminder for appointment {appointment.id} will not be scheduled."
+                "Django-Q tables not found. Please run migrations: python manage.py migrate django_q. "
+                "Email reminder for appointment %s will not be scheduled.", appointment.id
             )
         else:
             # Re-raise if it's a different OperationalError
@@ -182,8 +191,8 @@ def schedule_email_reminder(appointment, request, appointment_datetime=None):
     except Exception as e:
         # Catch any other errors that might occur during scheduling
         logger.error(
-            f"Error scheduling email reminder for appointment {appointment.id}: {str(e)}. "
-            f"Email reminder will not be scheduled."
+            "Error scheduling email reminder for appointment %s: %s. "
+            "Email reminder will not be scheduled.", appointment.id, str(e)
         )
 
 
@@ -223,8 +232,8 @@ def update_appointment_reminder(appointment, new_date, new_start_time, request,
             schedule_email_reminder(appointment, request, new_datetime)
         else:
             logger.info(
-                    f"Reminder for appointment {appointment.id} is not scheduled per "
-                    f"user's preference or past datetime.")
+                    "Reminder for appointment %s is not scheduled per "
+                    "user's preference or past datetime.", appointment.id)
 
     # Update the appointment's reminder preference
     appointment.want_reminder = want_reminder
@@ -245,8 +254,8 @@ def cancel_existing_reminder(appointment_id_request):
         # Handle case where django-q tables don't exist (migrations not run)
         if 'django_q_schedule' in str(e) or 'no such table' in str(e).lower():
             logger.warning(
-                f"Django-Q tables not found. Please run migrations: python manage.py migrate django_q. "
-                f"Existing reminder for appointment {appointment_id_request} cannot be cancelled."
+                "Django-Q tables not found. Please run migrations: python manage.py migrate django_q. "
+                "Existing reminder for appointment %s cannot be cancelled.", appointment_id_request
             )
         else:
             # Re-raise if it's a different OperationalError
@@ -254,7 +263,7 @@ def cancel_existing_reminder(appointment_id_request):
     except Exception as e:
         # Catch any other errors that might occur
         logger.error(
-            f"Error cancelling reminder for appointment {appointment_id_request}: {str(e)}"
+            "Error cancelling reminder for appointment %s: %s", appointment_id_request, str(e)
         )
 
 
@@ -270,18 +279,19 @@ def can_appointment_be_rescheduled(appointment_request):
     # Determine which rescheduled limit to use based on service settings
     if service.allow_rescheduling:
         # If rescheduling is allowed
-        logger.info(f"Rescheduling is allowed for service {service.name} -> "
-                    f"Reschedule count: {recent_reschedule_count}, Reschedule limit: {service.reschedule_limit}")
+        logger.info("Rescheduling is allowed for service %s -> Reschedule count: %s, Reschedule limit: %s",
+                    service.name, recent_reschedule_count, service.reschedule_limit)
         return recent_reschedule_count < service.reschedule_limit
     else:
         # Rescheduling is allowed but no specific limit set; use system default
-        logger.info(f"Rescheduling is allowed but no specific limit set for service {service.name} -> "
-                    f"Reschedule count: {recent_reschedule_count}, Reschedule limit: {config.default_reschedule_limit}")
+        logger.info("Rescheduling is allowed but no specific limit set for service %s -> "
+                    "Reschedule count: %s, Reschedule limit: %s",
+                    service.name, recent_reschedule_count, config.default_reschedule_limit)
         return recent_reschedule_count < config.default_reschedule_limit
 
 
 def staff_change_allowed_on_reschedule():
-    return Config.objects.first().allow_staff_change_on_reschedule
+    return get_config().allow_staff_change_on_reschedule
 
 
 def generate_unique_username_from_email(email: str) -> str:
@@ -386,6 +396,7 @@ def create_payment_info_and_get_url(appointment):
     return payment_url
 
 
+@traced('slots.exclude_booked_slots')
 def exclude_booked_slots(appointments, slots, slot_duration=None):
     """Exclude the booked slots from the given list of slots.
 
@@ -394,45 +405,52 @@ def exclude_booked_slots(appointments, slots, slot_duration=None):
     :param slot_duration: The duration of each slot.
     :return: The slots with the booked slots excluded.
     """
-    available_slots = []
-    for slot in slots:
-        slot_end = slot + slot_duration
-        is_available = True
-        for appointment in appointments:
-            appointment_start_time = appointment.get_start_time()
-            appointment_end_time = appointment.get_end_time()
-            if appointment_start_time < slot_end and slot < appointment_end_time:
-                is_available = False
-                break
-        if is_available:
-            available_slots.append(slot)
-    return available_slots
-
-
-def exclude_pending_reschedules(slots, staff_member, date):
+    return exclude_intervals(slots, booked=get_booked_intervals(appointments), slot_duration=slot_duration)
+
+
+@traced('slots.exclude_pending_reschedules')
+def exclude_pending_reschedules(slots, staff_member, date, snapshot=None):
     """
     Exclude the slots that are pending reschedule for the given staff member and date.
     """
+    return exclude_intervals(slots, held=get_pending_reschedule_intervals(staff_member, date, snapshot=snapshot))
 
-    # Calculate the time window for "last 5 minutes"
-    ten_minutes_ago = timezone.now() - datetime.timedelta(minutes=5)
-    pending_reschedules = AppointmentRescheduleHistory.objects.filter(
-            appointment_request__staff_member=staff_member,
-            date=date,
-            reschedule_status='pending',
-            created_at__gte=ten_minutes_ago
-    )
 
-    # Filter out slots that overlap with any pending rescheduling
-    filtered_slots = slots[:]
-    for reschedule in pending_reschedules:
-        reschedule_start_time = datetime.datetime.combine(date, reschedule.start_time)
-        reschedule_end_time = datetime.datetime.combine(date, reschedule.end_time)
+def get_booked_intervals(appointments) -> list:
+    """Get the (start, end) datetimes of the given appointments.
 
-        filtered_slots = [slot for slot in filtered_slots if
-                          not (reschedule_start_time <= slot < reschedule_end_time)]
+    When a queryset is given, only the date and times are fetched, in a single query.
+
+    :param appointments: A queryset or a list of appointments.
+    :return: A list of (start, end) tuples.
+    """
+    if hasattr(appointments, 'values_list'):
+        rows = appointments.values_list('appointment_request__date', 'appointment_request__start_time',
+                                        'appointment_request__end_time')
+        return [(datetime.datetime.combine(date, start_time), datetime.datetime.combine(date, end_time))
+                for date, start_time, end_time in rows]
+    return [(appointment.get_start_time(), appointment.get_end_time()) for appointment in appointments]
 
-    return filtered_slots
+
+def get_pending_reschedule_intervals(staff_member, date, snapshot=None) -> list:
+    """Get the (start, end) datetimes held by the pending reschedules of the last 5 minutes.
+
+    :param staff_member: The staff member whose appointments are being rescheduled.
+    :param date: The date the appointments are being rescheduled to.
+    :param snapshot: An optional StaffScheduleSnapshot covering the date, to read from instead of the database.
+    :return: A list of (start, end) tuples.
+    """
+    if snapshot is not None:
+        return snapshot.get_held_intervals(date)
+    five_minutes_ago = timezone.now() - datetime.timedelta(minutes=5)
+    rows = AppointmentRescheduleHistory.objects.filter(
+            appointment_request__staff_member=staff_member,
+            date=date,
+            reschedule_status='pending',
+            created_at__gte=five_minutes_ago
+    ).values_list('start_time', 'end_time')
+    return [(datetime.datetime.combine(date, start_time), datetime.datetime.combine(date, end_time))
+            for start_time, end_time in rows]
 
 
 def day_off_exists_for_date_range(staff_member, start_date, end_date, days_off_id=None) -> bool:
@@ -471,9 +489,7 @@ def get_appointment_buffer_time():
 
     :return: The appointment buffer time
     """
-    from appointment.models import Config
-
-    config = Config.objects.first()
+    config = get_config()
 
     if config and config.appointment_buffer_time:
         return config.appointment_buffer_time
@@ -497,9 +513,7 @@ def get_appointment_finish_time():
 
     :return: The appointment's finish time
     """
-    from appointment.models import Config
-
-    config = Config.objects.first()
+    config = get_config()
 
     if config and config.finish_time:
         return config.finish_time
@@ -511,9 +525,7 @@ def get_appointment_lead_time():
 
     :return: The appointment's lead time
     """
-    from appointment.models import Config
-
-    config = Config.objects.first()
+    config = get_config()
 
     if config and config.lead_time:
         return config.lead_time
@@ -525,9 +537,7 @@ def get_appointment_slot_duration():
 
     :return: The appointment slot duration
     """
-    from appointment.models import Config
-
-    config = Config.objects.first()
+    config = get_config()
 
     if config and config.slot_duration:
         return config.slot_duration
@@ -553,13 +563,8 @@ def get_appointments_for_date_and_time(date, start_time, end_time, staff_member)
 
 
 def get_config():
-    """Returns the configuration object from the database or the cache."""
-    config = cache.get('config')
-    if not config:
-        config = Config.objects.first()
-        # Cache the configuration for 1 hour (3600 seconds)
-        cache.set('config', config, 3600)
-    return config
+    """Returns the configuration object, from the memo of the process as long as its version stamp is current."""
+    return get_cached_config()
 
 
 def get_day_off_by_id(day_off_id):
@@ -593,6 +598,18 @@ def get_non_working_days_for_staff(staff_member_id):
         return []
 
 
+async def aget_non_working_days_for_staff(staff_member_id):
+    """Async version of get_non_working_days_for_staff, with the async ORM."""
+    working_days = {
+        day async for day in WorkingHours.objects.filter(staff_member_id=staff_member_id).values_list(
+            'day_of_week', flat=True)
+    }
+    # An unknown staff member has no working hours either
+    if not working_days:
+        return []
+    return list(set(range(7)) - working_days)
+
+
 def get_staff_member_appointment_list(staff_member: StaffMember) -> list:
     """Get a list of appointments for the given staff member."""
     return Appointment.objects.filter(appointment_request__staff_member=staff_member)
@@ -605,9 +622,9 @@ def get_weekday_num_from_date(date: datetime.date = None) -> int:
     return get_weekday_num(date.strftime("%A"))
 
 
-def get_staff_member_buffer_time(staff_member: StaffMember, date: datetime.date) -> float:
+def get_staff_member_buffer_time(staff_member: StaffMember, date: datetime.date, snapshot=None) -> float:
     """Return the buffer time for the given staff member on the given date."""
-    _, _, _, buff_time = get_times_from_config(date)
+    _, _, _, buff_time = get_times_from_config(date, snapshot=snapshot)
     buffer_minutes = buff_time.total_seconds() / 60
     return staff_member.appointment_buffer_time or buffer_minutes
 
@@ -620,10 +637,11 @@ def get_staff_member_by_user_id(user_id):
         return None
 
 
-def get_staff_member_end_time(staff_member: StaffMember, date: datetime.date) -> Optional[datetime.time]:
+def get_staff_member_end_time(staff_member: StaffMember, date: datetime.date,
+                               snapshot=None) -> Optional[datetime.time]:
     """Return the end time for the given staff member on the given date."""
     weekday_num = get_weekday_num_from_date(date)
-    working_hours = get_working_hours_for_staff_and_day(staff_member, weekday_num)
+    working_hours = get_working_hours_for_staff_and_day(staff_member, weekday_num, snapshot=snapshot)
     return working_hours['end_time']
 
 
@@ -640,27 +658,29 @@ def get_staff_member_from_user_id_or_logged_in(user, user_id=None):
     return staff_member
 
 
-def get_staff_member_slot_duration(staff_member: StaffMember, date: datetime.date) -> int:
+def get_staff_member_slot_duration(staff_member: StaffMember, date: datetime.date, snapshot=None) -> int:
     """Return the slot duration for the given staff member on the given date."""
-    _, _, slot_duration, _ = get_times_from_config(date)
+    _, _, slot_duration, _ = get_times_from_config(date, snapshot=snapshot)
     slot_minutes = slot_duration.total_seconds() / 60
     return staff_member.slot_duration or slot_minutes
 
 
-def get_staff_member_start_time(staff_member: StaffMember, date: datetime.date) -> Optional[datetime.time]:
+def get_staff_member_start_time(staff_member: StaffMember, date: datetime.date,
+                               snapshot=None) -> Optional[datetime.time]:
     """Return the start time for the given staff member on the given date."""
     weekday_num = get_weekday_num_from_date(date)
-    working_hours = get_working_hours_for_staff_and_day(staff_member, weekday_num)
+    working_hours = get_working_hours_for_staff_and_day(staff_member, weekday_num, snapshot=snapshot)
     return working_hours['start_time']
 
 
-def get_times_from_config(date):
+def get_times_from_config(date, snapshot=None):
     """Get the start time, end time, slot duration, and buffer time from the configuration or the settings file.
 
     :param date: The date to get the times for.
+    :param snapshot: An optional StaffScheduleSnapshot, whose configuration is used instead of fetching it again.
     :return: The start time, end time, slot duration, and buffer time.
     """
-    config = get_config()
+    config = snapshot.config if snapshot is not None else get_config()
     if config:
         start_time = datetime.datetime.combine(date, datetime.time(hour=config.lead_time.hour,
                                                                    minute=config.lead_time.minute))
@@ -693,9 +713,7 @@ def get_website_name() -> str:
 
     :return: The website name
     """
-    from appointment.models import Config
-
-    config = Config.objects.first()
+    config = get_cached_config()
 
     if config and config.website_name != "":
         return config.website_name
@@ -714,14 +732,20 @@ def get_working_hours_by_id(working_hours_id):
         return None
 
 
-def get_working_hours_for_staff_and_day(staff_member, day_of_week):
+def get_working_hours_for_staff_and_day(staff_member, day_of_week, snapshot=None):
     """Get the working hours for the given staff member and day of the week.
 
     :param staff_member: The staff member to get the working hours for.
     :param day_of_week: The day of the week to get the working hours for.
+    :param snapshot: An optional StaffScheduleSnapshot of the staff member, to read from instead of the database.
     :return: The working hours for the given staff member and day of the week.
     """
-    working_hours = WorkingHours.objects.filter(staff_member=staff_member, day_of_week=day_of_week).first()
+    if snapshot is not None:
+        working_hours = snapshot.get_working_hours(day_of_week)
+        staff_member = snapshot.staff_member
+    else:
+        working_hours = WorkingHours.objects.filter(staff_member=staff_member, day_of_week=day_of_week).first()
+        staff_member = working_hours.staff_member if working_hours else staff_member
 
     # TODO: I can't leave the following logic.
     #  Needs to be commented out and just return None if no working hours are set for that day.
@@ -749,15 +773,17 @@ def get_working_hours_for_staff_and_day(staff_member, day_of_week):
 
     # If a WorkingHours instance is found, convert it to a dictionary for consistent return type
     return {
-        'staff_member': working_hours.staff_member,
+        'staff_member': staff_member,
         'day_of_week': working_hours.day_of_week,
         'start_time': working_hours.start_time,
         'end_time': working_hours.end_time
     }
 
 
-def is_working_day(staff_member: StaffMember, day: int) -> bool:
+def is_working_day(staff_member: StaffMember, day: int, snapshot=None) -> bool:
     """Check if the given day is a working day for the staff member."""
+    if snapshot is not None:
+        return snapshot.is_working_day(day)
     working_days = list(WorkingHours.objects.filter(staff_member=staff_member).values_list('day_of_week', flat=True))
     # If no working hours are configured, consider all days as working days by default
     # This prevents all days from being marked as non-working when no hours are set up
@@ -22,6 +22,7 @@ from appointment.settings import APPOINTMENT_PAYMENT_URL
 from appointment.utils.date_time import convert_24_hour_time_to_12_hour_time
 from appointment.utils.db_helpers import get_absolute_url_, get_website_name, username_in_user_model
 from appointment.utils.ics_utils import generate_ics_file
+from appointment.utils.tracing import traced
 
 logger = get_logger(__name__)
 
@@ -157,9 +158,10 @@ def send_reset_link_to_staff_member(user, request, email: str, account_details=N
     )
 
 
+@traced('email.notify_admin_about_appointment')
 def notify_admin_about_appointment(appointment, client_name: str):
     """Notify the admin and the staff member about a new appointment request."""
-    logger.info(f"Sending notifications for new appointment {appointment.id}")
+    logger.info("Sending notifications for new appointment %s", appointment.id)
 
     staff_member = appointment.get_staff_member()
     ics_file = generate_ics_file(appointment)
@@ -212,7 +214,7 @@ def notify_admin_about_appointment(appointment, client_name: str):
 
     # Notify staff member if they haven't been notified as an admin
     if staff_email not in notified_emails:
-        logger.info(f"Notifying the staff member for new appointment {appointment.id}")
+        logger.info("Notifying the staff member for new appointment %s", appointment.id)
         send_email(
                 recipient_list=[staff_email],
                 subject=_("New Appointment Request for ") + client_name,
@@ -221,7 +223,7 @@ def notify_admin_about_appointment(appointment, client_name: str):
                 attachments=[('appointment.ics', ics_file, 'text/calendar')]
         )
 
-    logger.info(f"Notifications sent for appointment {appointment.id}")
+    logger.info("Notifications sent for appointment %s", appointment.id)
 
 
 def send_verification_email(user, email: str):
@@ -5,8 +5,10 @@ from datetime import datetime
 from icalendar import Calendar, Event
 
 from appointment.utils.db_helpers import Appointment, get_website_name
+from appointment.utils.tracing import traced
 
 
+@traced('ics.generate_ics_file')
 def generate_ics_file(appointment: Appointment):
     company_name = get_website_name()
 
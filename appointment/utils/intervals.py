@@ -0,0 +1,64 @@
+# intervals.py
+# Path: appointment/utils/intervals.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+import datetime
+from typing import Iterable, List, Tuple
+
+Interval = Tuple[datetime.datetime, datetime.datetime]
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort the given intervals and merge the ones that overlap or touch each other.
+
+    :param intervals: An iterable of (start, end) tuples.
+    :return: A sorted list of disjoint (start, end) tuples covering the same time as the input.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def exclude_intervals(slots, booked: Iterable[Interval] = (), held: Iterable[Interval] = (),
+                      slot_duration: datetime.timedelta = None) -> list:
+    """Remove from `slots` every slot that overlaps a booked interval or starts inside a held interval.
+
+    Booked intervals (appointments) exclude a slot when `[slot, slot + slot_duration)` overlaps them. Held intervals
+    (pending reschedules) exclude a slot when its start falls inside `[start, end)`. Both lists are merged once and the
+    slots are swept in a single pass, so the cost is O((slots + intervals) log intervals) instead of
+    O(slots × intervals).
+
+    :param slots: The candidate slots, as datetime objects.
+    :param booked: The (start, end) intervals of the booked appointments.
+    :param held: The (start, end) intervals held by pending reschedules.
+    :param slot_duration: The duration of each slot, required when `booked` is not empty.
+    :return: The remaining slots, in ascending order.
+    """
+    booked = merge_intervals(booked)
+    held = merge_intervals(held)
+    if booked and slot_duration is None:
+        raise ValueError("slot_duration is required to exclude booked intervals.")
+
+    available_slots = []
+    b, h = 0, 0
+    for slot in sorted(slots):
+        # Skip the intervals that end before this slot: they can't affect it or any later slot.
+        while b < len(booked) and booked[b][1] <= slot:
+            b += 1
+        while h < len(held) and held[h][1] <= slot:
+            h += 1
+        if b < len(booked) and booked[b][0] < slot + slot_duration:
+            continue
+        if h < len(held) and held[h][0] <= slot:
+            continue
+        available_slots.append(slot)
+    return available_slots
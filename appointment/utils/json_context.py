@@ -38,6 +38,20 @@ def convert_appointment_to_json(request, appointments: list) -> list:
     } for appt in appointments]
 
 
+def convert_appointment_to_calendar_event(request, appointments: list) -> list:
+    """Convert appointments to FullCalendar events: the appointment JSON plus the title, start, end and color keys
+    FullCalendar reads, every other key ending up in the event's extendedProps."""
+    events = convert_appointment_to_json(request, appointments)
+    for event in events:
+        event.update({
+            "title": event["service_name"],
+            "start": event["start_time"],
+            "end": event["end_time"],
+            "backgroundColor": event["background_color"],
+        })
+    return events
+
+
 def json_response(message, status=200, success=True, custom_data=None, error_code=None, **kwargs):
     """Return a generic JSON response."""
     response_data = {
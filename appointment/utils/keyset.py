@@ -0,0 +1,151 @@
+# keyset.py
+# Path: appointment/utils/keyset.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(values) -> str:
+    """Encode the ordering values of a row into an opaque cursor, safe to put in a URL."""
+    return base64.urlsafe_b64encode(json.dumps([str(value) for value in values]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int):
+    """Decode a cursor made by `encode_cursor`.
+
+    :param cursor: The cursor, as found in the URL.
+    :param size: The number of ordering values it must hold.
+    :return: The list of values, or None when the cursor is invalid.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(value, str) for value in values):
+        return None
+    return values
+
+
+def get_keyset_filter(ordering, values, after: bool = True) -> Q:
+    """Build the filter of the rows that come after (or before) a row, for the given ordering.
+
+    With the ordering (a, b, c) the rows after (a0, b0, c0) are: a > a0, or a = a0 and b > b0, or a = a0 and b = b0 and
+    c > c0. A descending field ('-a') compares the other way around.
+
+    :param ordering: The fields the rows are ordered by, the last one being unique.
+    :param values: The ordering values of the row.
+    :param after: Whether to keep the rows after the row (True) or before it (False).
+    :return: The Q object of the rows.
+    """
+    condition = Q(pk__in=[])
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        greater = field.startswith('-') != after
+        condition |= equal & Q(**{f"{name}__{'gt' if greater else 'lt'}": value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+class KeysetPage:
+    """A page of rows read with keyset pagination: the position of the page is given by the ordering values of the
+    row next to it instead of an offset, so the database seeks the index to the page and reading any page costs the
+    same as reading the first one.
+
+    The page iterates like a list and has the has_next / has_previous / has_other_pages methods of a Paginator page,
+    with next_cursor and previous_cursor instead of page numbers. An invalid cursor gives the first page.
+    """
+
+    def __init__(self, queryset, ordering, per_page: int, after: str = None, before: str = None):
+        """Read a page of the queryset.
+
+        :param queryset: The rows, without ordering.
+        :param ordering: The fields the rows are ordered by; the last one must be unique so that the order is total.
+        :param per_page: The number of rows of a page.
+        :param after: The cursor of the row the page starts after (next page).
+        :param before: The cursor of the row the page ends before (previous page), ignored when after is given.
+        """
+        self.ordering = list(ordering)
+        self.per_page = per_page
+        after = decode_cursor(after, len(self.ordering)) if after else None
+        before = decode_cursor(before, len(self.ordering)) if before and not after else None
+        try:
+            self.read(queryset, after, before)
+        except (ValidationError, ValueError):
+            # The cursor decoded, but its values don't fit the fields
+            self.read(queryset, None, None)
+
+    def read(self, queryset, after, before):
+        if before:
+            # The previous page is read backwards, from the row before the cursor
+            reverse = [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+            rows = list(queryset.filter(get_keyset_filter(self.ordering, before, after=False))
+                        .order_by(*reverse)[:self.per_page + 1])
+            self.object_list = rows[:self.per_page][::-1]
+            self._has_previous = len(rows) > self.per_page
+            self._has_next = True
+        else:
+            if after:
+                queryset = queryset.filter(get_keyset_filter(self.ordering, after))
+            rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+            self.object_list = rows[:self.per_page]
+            self._has_previous = after is not None
+            self._has_next = len(rows) > self.per_page
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self) -> bool:
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self) -> bool:
+        return self.has_previous() or self.has_next()
+
+    def get_cursor(self, row) -> str:
+        values = []
+        for field in self.ordering:
+            value = row
+            for attribute in field.lstrip('-').split('__'):
+                value = getattr(value, attribute)
+            values.append(value)
+        return encode_cursor(values)
+
+    @property
+    def next_cursor(self):
+        return self.get_cursor(self.object_list[-1]) if self.has_next() else None
+
+    @property
+    def previous_cursor(self):
+        return self.get_cursor(self.object_list[0]) if self.has_previous() else None
+
+
+def count_up_to(queryset, limit: int):
+    """Count the rows of a queryset, stopping at limit.
+
+    The database stops reading after limit + 1 rows instead of counting them all, which is enough for a total like
+    "1000+".
+
+    :param queryset: The rows to count.
+    :param limit: The highest exact count.
+    :return: The count, at most limit, and whether there are more rows.
+    """
+    count = queryset.order_by()[:limit + 1].count()
+    return min(count, limit), count > limit
@@ -0,0 +1,288 @@
+# metrics.py
+# Path: appointment/utils/metrics.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+import atexit
+import contextvars
+import glob
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# The default buckets of the Prometheus client libraries, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def format_labels(labels) -> str:
+    labels = list(labels)
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in labels) + '}'
+
+
+def format_value(value) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """A counter per combination of label values."""
+    type = 'counter'
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def get_key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.get_key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        self.registry.flush_if_due()
+
+    def get_samples(self) -> list:
+        return [[list(key), value] for key, value in self.values.items()]
+
+    @staticmethod
+    def merge(value, other):
+        return value + other
+
+    def format(self, samples) -> list:
+        return [f'{self.name}{format_labels(zip(self.labelnames, key))} {format_value(value)}'
+                for key, value in sorted(samples.items())]
+
+
+class Histogram(Counter):
+    """Cumulative bucket counts, sum and count of the observed values, per combination of label values."""
+    type = 'histogram'
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self.get_key(labels)
+        with self.registry.lock:
+            counts, total, count = self.values.get(key) or ([0] * len(self.buckets), 0, 0)
+            # Only the first bucket holding the value is counted, the buckets are made cumulative when formatted
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self.values[key] = (counts, total + value, count + 1)
+        self.registry.flush_if_due()
+
+    def get_samples(self) -> list:
+        return [[list(key), [list(counts), total, count]] for key, (counts, total, count) in self.values.items()]
+
+    @staticmethod
+    def merge(value, other):
+        return [[a + b for a, b in zip(value[0], other[0])], value[1] + other[1], value[2] + other[2]]
+
+    def format(self, samples) -> list:
+        lines = []
+        for key, (counts, total, count) in sorted(samples.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{format_labels(labels + [("le", format_value(bound))])} '
+                             f'{cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(labels)} {format_value(total)}')
+            lines.append(f'{self.name}_count{format_labels(labels)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics of the process, in memory, exposed in the Prometheus text format.
+
+    With several worker processes (gunicorn), each one records its own metrics; when a directory is configured, every
+    process writes them to its own file there at most once per flush interval, and the exposition sums the files of
+    all the processes, so whichever worker answers the scrape reports the whole server. A value recorded between two
+    flushes is written by a timer at the end of the interval, so the files are at most one interval stale even when
+    the traffic stops. The files of stopped workers are kept so that the counters never go backwards: the directory
+    is to be emptied when the server is deployed.
+    """
+
+    def __init__(self, directory: str = None, flush_interval: float = 1):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self.reset()
+
+    def reset(self):
+        """Forget the metrics recorded, e.g. the ones a forked worker inherited from its parent."""
+        # The timer thread of the parent doesn't exist in a forked child
+        if getattr(self, 'pending_flush', None) is not None:
+            self.pending_flush.cancel()
+        self.pending_flush = None
+        # A lock held by another thread when the process forked would never be released in the child
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        for metric in self.metrics.values():
+            metric.values = {}
+        # The pid can be reused by a later worker, the token can't
+        self.path = (os.path.join(self.directory, f'{os.getpid()}-{uuid.uuid4().hex}.json')
+                     if self.directory else None)
+        self.next_flush = 0
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.metrics.setdefault(name, Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(self, name, documentation, labelnames, buckets))
+
+    def get_snapshot(self) -> dict:
+        with self.lock:
+            return {name: metric.get_samples() for name, metric in self.metrics.items()}
+
+    def flush(self):
+        """Write the metrics of the process to its file, atomically: a scrape never reads half a file."""
+        if not self.path:
+            return
+        with self.flush_lock:
+            snapshot = self.get_snapshot()
+            os.makedirs(self.directory, exist_ok=True)
+            temporary_path = f'{self.path}.tmp'
+            with open(temporary_path, 'w', encoding='utf-8') as file:
+                json.dump(snapshot, file)
+            os.replace(temporary_path, self.path)
+
+    def flush_if_due(self):
+        """Write the metrics now if the last flush is older than the flush interval, or else at the end of it."""
+        if not self.path:
+            return
+        with self.lock:
+            now = time.monotonic()
+            due = now >= self.next_flush
+            if due:
+                self.next_flush = now + self.flush_interval
+            elif self.pending_flush is None:
+                self.pending_flush = threading.Timer(self.next_flush - now, self.flush_pending)
+                self.pending_flush.daemon = True
+                self.pending_flush.start()
+        if due:
+            self.flush()
+
+    def flush_pending(self):
+        """Write the values recorded since the last flush, from the timer started by flush_if_due."""
+        with self.lock:
+            self.pending_flush = None
+            self.next_flush = time.monotonic() + self.flush_interval
+        self.flush()
+
+    def collect(self) -> dict:
+        """Sum the metrics of every process, or take the ones of this process without a directory.
+
+        :return: The samples of each metric, by label values.
+        """
+        snapshots = [self.get_snapshot()]
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                if path == self.path:
+                    continue
+                try:
+                    with open(path, encoding='utf-8') as file:
+                        snapshots.append(json.load(file))
+                except (OSError, ValueError):
+                    # Removed, or written by a process of an older version
+                    continue
+        collected = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                for labels, value in samples:
+                    key = tuple(labels)
+                    if key in collected[name]:
+                        collected[name][key] = metric.merge(collected[name][key], value)
+                    else:
+                        collected[name][key] = value
+        return collected
+
+    def expose(self, gauges=()) -> str:
+        """The metrics in the Prometheus text exposition format (version 0.0.4).
+
+        :param gauges: Values computed at scrape time, as (name, documentation, value) tuples.
+        :return: The text of the /metrics response.
+        """
+        lines = []
+        for name, samples in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            lines.extend(metric.format(samples))
+        for name, documentation, value in gauges:
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def create_registry() -> MetricsRegistry:
+    from appointment.settings import APPOINTMENT_METRICS_DIR, APPOINTMENT_METRICS_FLUSH_INTERVAL
+    registry = MetricsRegistry(APPOINTMENT_METRICS_DIR, APPOINTMENT_METRICS_FLUSH_INTERVAL)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=registry.reset)
+    atexit.register(registry.flush)
+    return registry
+
+
+REGISTRY = create_registry()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    'appointment_http_request_duration_seconds', 'Time spent handling HTTP requests.',
+    ['view', 'method', 'status'])
+REQUEST_QUERIES = REGISTRY.histogram(
+    'appointment_db_queries_per_request', 'Number of SQL queries run by an HTTP request.',
+    ['view'], buckets=QUERY_BUCKETS)
+SLOT_COMPUTATIONS = REGISTRY.counter(
+    'appointment_slot_computations_total', 'Slot lists requested, by cache result (hit or miss).',
+    ['cache'])
+EMAILS = REGISTRY.counter(
+    'appointment_emails_total', 'Emails sent, failed or queued to django-q.',
+    ['channel', 'result'])
+
+request_queries = contextvars.ContextVar('appointment_request_queries', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    """Execute wrapper counting the SQL queries of the current request."""
+    counter = request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counting(connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def instrument():
+    """Count the SQL queries of every connection, including the ones opened later by other threads."""
+    connection_created.connect(install_query_counting, dispatch_uid='appointment_query_counting')
+    for connection in connections.all(initialized_only=True):
+        install_query_counting(connection)
@@ -0,0 +1,189 @@
+# query_inspector.py
+# Path: appointment/utils/query_inspector.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+import contextvars
+import datetime
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from appointment.logger_config import get_logger
+from appointment.utils import metrics, tracing
+
+logger = get_logger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_FILE_MAX_BYTES = 5 * 1024 * 1024
+REPORT_FILE_BACKUP_COUNT = 3
+# The execute wrappers and decorators of the instrumentation are on the stack of the queries, but never their cause
+INSTRUMENTATION_FILES = {os.path.abspath(module.__file__) for module in (metrics, tracing)} | {os.path.abspath(__file__)}
+
+request_inspection = contextvars.ContextVar('appointment_request_inspection', default=None)
+
+report_loggers = {}
+report_loggers_lock = threading.Lock()
+
+
+def get_query_shape(sql: str) -> str:
+    """The query without its values, so that the queries differing only by their parameters compare equal.
+
+    Literals and placeholders become ?, and lists of them (IN (%s, %s, ...)) become (...) whatever their length.
+    """
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    sql = sql.replace('%s', '?')
+    sql = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(...)', sql)
+    return ' '.join(sql.split())
+
+
+def get_app_frame() -> str:
+    """The innermost frame of the call stack in the application code, i.e. the line that caused the query.
+
+    :return: The frame as 'appointment/views.py:12 in index', or an empty string when no application code is on the
+        stack.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename not in INSTRUMENTATION_FILES:
+            path = os.path.relpath(filename, os.path.dirname(APP_DIR))
+            return f'{path}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return ''
+
+
+class QueryInspection:
+    """The SQL queries of one request, checked for slow queries and for the same query repeated (the N+1 pattern)."""
+
+    def __init__(self, slow_query_ms: float, repeat_threshold: int):
+        self.slow_query_ms = slow_query_ms
+        self.repeat_threshold = repeat_threshold
+        self.count = 0
+        self.shapes = {}
+        self.slow_queries = []
+
+    def record(self, sql: str, duration_ms: float):
+        self.count += 1
+        shape = self.shapes.setdefault(get_query_shape(sql), {'count': 0, 'duration_ms': 0, 'frame': ''})
+        shape['count'] += 1
+        shape['duration_ms'] += duration_ms
+        # The stack is only walked once a query turns out to be repeated, not for every query
+        if shape['count'] == self.repeat_threshold:
+            shape['frame'] = get_app_frame()
+        if duration_ms >= self.slow_query_ms:
+            self.slow_queries.append({'sql': sql, 'duration_ms': round(duration_ms, 3), 'frame': get_app_frame()})
+
+    def get_repeated_queries(self) -> list:
+        return sorted((
+            {'sql': sql, 'count': shape['count'], 'duration_ms': round(shape['duration_ms'], 3),
+             'frame': shape['frame']}
+            for sql, shape in self.shapes.items() if shape['count'] >= self.repeat_threshold
+        ), key=lambda query: -query['count'])
+
+    def get_report(self, request):
+        """The findings of the request, or None when there are none.
+
+        :param request: The request the queries were run for.
+        :return: A dict ready to be dumped as JSON.
+        """
+        repeated_queries = self.get_repeated_queries()
+        if not self.slow_queries and not repeated_queries:
+            return None
+        match = getattr(request, 'resolver_match', None)
+        return {
+            'time': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else '',
+            'queries': self.count,
+            'slow_queries': self.slow_queries,
+            'repeated_queries': repeated_queries,
+        }
+
+
+def inspect_query(execute, sql, params, many, context):
+    """Execute wrapper timing each SQL query of an inspected request."""
+    inspection = request_inspection.get()
+    if inspection is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        inspection.record(sql, (time.perf_counter() - start) * 1000)
+
+
+def install_query_inspection(connection, **kwargs):
+    if inspect_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(inspect_query)
+
+
+def instrument():
+    """Time the SQL queries of every connection, including the ones opened later by other threads."""
+    connection_created.connect(install_query_inspection, dispatch_uid='appointment_query_inspection')
+    for connection in connections.all(initialized_only=True):
+        install_query_inspection(connection)
+
+
+def get_report_logger(path: str) -> logging.Logger:
+    """The logger writing the reports to path, one JSON object per line, in a file rotated at
+    REPORT_FILE_MAX_BYTES.
+    """
+    with report_loggers_lock:
+        if path not in report_loggers:
+            report_logger = logging.getLogger(f'appointment_query_reports.{len(report_loggers)}')
+            report_logger.propagate = False
+            report_logger.setLevel(logging.INFO)
+            handler = RotatingFileHandler(path, maxBytes=REPORT_FILE_MAX_BYTES, backupCount=REPORT_FILE_BACKUP_COUNT,
+                                          encoding='utf-8', delay=True)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            report_logger.addHandler(handler)
+            report_loggers[path] = report_logger
+        return report_loggers[path]
+
+
+def write_report(report: dict, path: str):
+    """Write the report of a request to the report file, and warn about each finding in the logs."""
+    for query in report['slow_queries']:
+        logger.warning("Slow query (%.1f ms) on %s from %s: %s", query['duration_ms'], report['path'],
+                       query['frame'], query['sql'])
+    for query in report['repeated_queries']:
+        logger.warning("Query repeated %s times on %s from %s: %s", query['count'], report['path'], query['frame'],
+                       query['sql'])
+    get_report_logger(path).info(json.dumps(report, default=str))
+
+
+def read_reports(path: str, limit: int = 100) -> list:
+    """Read the last reports of the report file, the newest first.
+
+    :param path: The report file.
+    :param limit: The highest number of reports returned.
+    :return: The reports, as dicts.
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            lines = deque(file, maxlen=limit)
+    except FileNotFoundError:
+        return []
+    reports = []
+    for line in reversed(lines):
+        try:
+            reports.append(json.loads(line))
+        except ValueError:
+            # A line being written by another process
+            continue
+    return reports
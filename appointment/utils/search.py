@@ -0,0 +1,112 @@
+# search.py
+# Path: appointment/utils/search.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+import functools
+import re
+import sqlite3
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+SQLITE_SEARCH_TABLE = 'appointment_appointment_search'
+POSTGRES_SEARCH_INDEX = 'appointment_search_gin'
+
+
+@functools.cache
+def sqlite_supports_fts5() -> bool:
+    """Whether the SQLite library Python is linked with was built with the FTS5 full-text search extension."""
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE probe USING fts5(text)')
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def uses_sqlite_search_table(connection) -> bool:
+    return connection.vendor == 'sqlite' and sqlite_supports_fts5()
+
+
+def get_search_vector():
+    """The tsvector of the search document, identical to the expression of the GIN index so that PostgreSQL uses it.
+    Migration 0010 rebuilds that index with its own copy of this expression: change both together."""
+    return SearchVector('search_document', config='simple')
+
+
+def get_search_terms(query: str) -> list:
+    return re.findall(r'\w+', query.lower())
+
+
+def search_appointments(appointments, query: str):
+    """Filter appointments on their search document: every word of the query must start a word of the document.
+
+    PostgreSQL matches the tsvector of the document through its GIN index, SQLite the FTS5 table kept next to the
+    appointments (see `index_appointments`); the other databases fall back to a scan of the document column.
+
+    :param appointments: The appointments to search.
+    :param query: The text typed by the user.
+    :return: The matching appointments.
+    """
+    terms = get_search_terms(query)
+    if not terms:
+        return appointments
+    connection = connections[appointments.db]
+    if connection.vendor == 'postgresql':
+        prefixes = ' & '.join(f'{term}:*' for term in terms)
+        return appointments.annotate(search_vector=get_search_vector()).filter(
+            search_vector=SearchQuery(prefixes, search_type='raw', config='simple'))
+    if uses_sqlite_search_table(connection):
+        prefixes = ' '.join(f'"{term}"*' for term in terms)
+        return appointments.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {SQLITE_SEARCH_TABLE} WHERE {SQLITE_SEARCH_TABLE} MATCH %s', [prefixes]))
+    for term in terms:
+        appointments = appointments.filter(search_document__icontains=term)
+    return appointments
+
+
+def index_appointments(appointments, using: str = 'default'):
+    """Write the search document of appointments into the SQLite FTS5 table; nothing to do on other databases, whose
+    index is maintained by the database itself.
+
+    :param appointments: The appointments, with their search document up to date.
+    :param using: The database alias.
+    """
+    connection = connections[using]
+    if not appointments or not uses_sqlite_search_table(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SQLITE_SEARCH_TABLE} WHERE rowid = %s',
+                           [(appointment.pk,) for appointment in appointments])
+        cursor.executemany(f'INSERT INTO {SQLITE_SEARCH_TABLE} (rowid, search_document) VALUES (%s, %s)',
+                           [(appointment.pk, appointment.search_document) for appointment in appointments])
+
+
+def unindex_appointments(appointment_ids, using: str = 'default'):
+    connection = connections[using]
+    if not appointment_ids or not uses_sqlite_search_table(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SQLITE_SEARCH_TABLE} WHERE rowid = %s',
+                           [(appointment_id,) for appointment_id in appointment_ids])
+
+
+def refresh_search_documents(appointments) -> int:
+    """Compute the search document of appointments again, after a change of their client or service.
+
+    :param appointments: The appointments to refresh.
+    :return: The number of appointments whose document changed.
+    """
+    changed = []
+    for appointment in appointments.select_related('client', 'appointment_request__service'):
+        document = appointment.get_search_document()
+        if document != appointment.search_document:
+            appointment.search_document = document
+            changed.append(appointment)
+    appointments.model.objects.using(appointments.db).bulk_update(changed, ['search_document'], batch_size=500)
+    index_appointments(changed, using=appointments.db)
+    return len(changed)
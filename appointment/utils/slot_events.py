@@ -0,0 +1,103 @@
+# slot_events.py
+# Path: appointment/utils/slot_events.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from appointment.models import StaffMember
+from appointment.services import get_available_slots_for_staff
+from appointment.utils.availability_cache import aget_availability_version
+from appointment.utils.db_helpers import get_weekday_num_from_date
+
+# The streams open in this process, all served by its event loop
+open_streams = 0
+
+
+def format_event(event: str, data: dict, event_id=None) -> str:
+    """Format a server-sent event.
+
+    :param event: The event name, the listener the browser calls (e.g. 'slot-taken').
+    :param data: The payload, sent as JSON.
+    :param event_id: An optional id, sent back by the browser in Last-Event-ID when it reconnects.
+    :return: The event, ready to be written to a text/event-stream response.
+    """
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines += [f"event: {event}", f"data: {json.dumps(data, cls=DjangoJSONEncoder)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_slot_events(staff_member, date, poll_interval: float, max_duration: float, max_streams: int,
+                             heartbeat_interval: float = 15, sleep=asyncio.sleep, clock=time.monotonic):
+    """Stream the changes of the available slots of a staff member on a date, as server-sent events.
+
+    The stream starts with a 'slots' event listing the available slots, then sends a 'slot-taken' event for the slots
+    that get booked and a 'slot-released' event for the slots that become free again. Every change of the schedule
+    already bumps the availability version of the staff member (see signals.py), so waiting for a change only reads
+    that version from the database; the slots are computed again when it moves.
+
+    The stream is an async generator: under ASGI, a waiting stream holds no worker, only a coroutine of the event loop.
+    It ends with a 'stop' event after max_duration seconds, or right away when max_streams streams are already open in
+    the process; the browser then closes it and keeps the slots it loaded with AJAX.
+
+    :param staff_member: The staff member whose slots are watched.
+    :param date: The date whose slots are watched.
+    :param poll_interval: The seconds between two reads of the availability version.
+    :param max_duration: The seconds after which the stream ends.
+    :param max_streams: The number of streams that may be open at the same time in the process.
+    :param heartbeat_interval: The seconds without event after which a comment is sent, so that proxies don't close
+                               the connection.
+    :param sleep: The coroutine waiting between two reads, replaced in the tests.
+    :param clock: The monotonic clock, replaced in the tests.
+    :return: An async generator of server-sent events.
+    """
+    global open_streams
+    if open_streams >= max_streams:
+        yield format_event('stop', {'reason': 'busy'})
+        return
+    # Nothing is awaited between the check and the increment, so no other stream of the event loop can slip in
+    open_streams += 1
+    try:
+        day_of_week = get_weekday_num_from_date(date)
+        version = await aget_availability_version(staff_member.pk)
+        slots = await sync_to_async(get_available_slots_for_staff)(date, staff_member, day_of_week)
+        yield format_event('slots', {'date': date, 'slots': slots}, version)
+
+        deadline = clock() + max_duration
+        last_sent = clock()
+        while clock() < deadline:
+            await sleep(poll_interval)
+            current_version = await aget_availability_version(staff_member.pk)
+            if current_version == version:
+                if clock() - last_sent >= heartbeat_interval:
+                    yield ": keepalive\n\n"
+                    last_sent = clock()
+                continue
+
+            version = current_version
+            try:
+                # The slot duration or the buffer time of the staff member may be what changed
+                await staff_member.arefresh_from_db()
+            except StaffMember.DoesNotExist:
+                yield format_event('slots', {'date': date, 'slots': []}, version)
+                break
+            new_slots = await sync_to_async(get_available_slots_for_staff)(date, staff_member, day_of_week)
+            taken = [slot for slot in slots if slot not in new_slots]
+            released = [slot for slot in new_slots if slot not in slots]
+            slots = new_slots
+            if taken:
+                yield format_event('slot-taken', {'date': date, 'slots': taken}, version)
+            if released:
+                yield format_event('slot-released', {'date': date, 'slots': released}, version)
+            last_sent = clock()
+        yield format_event('stop', {'reason': 'timeout'})
+    finally:
+        open_streams -= 1
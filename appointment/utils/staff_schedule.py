@@ -0,0 +1,174 @@
+# staff_schedule.py
+# Path: appointment/utils/staff_schedule.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+import datetime
+from functools import cached_property
+
+from django.db.models import BooleanField, Value
+from django.utils import timezone
+
+from appointment.utils.availability_cache import get_availability_version, get_availability_versions
+from appointment.utils.db_helpers import (
+    Appointment, AppointmentRescheduleHistory, DayOff, WorkingHours, get_config
+)
+
+
+class StaffScheduleSnapshot:
+    """Everything needed to compute the slots of a staff member over a date range, loaded in bulk.
+
+    Each table is read lazily, at most once, the first time one of the slot helpers needs it:
+
+    - the availability version of the staff member, under which the slots computed from the snapshot are cached,
+    - the configuration (through `get_config`, which is cached),
+    - the working hours,
+    - the days off overlapping the range,
+    - the booked appointments and the pending reschedules of the range, in a single query.
+
+    The slot helpers of `db_helpers` accept a `snapshot` argument and read from it instead of querying the database, so
+    chaining them costs the same number of queries as calling one of them.
+    """
+
+    def __init__(self, staff_member, start_date: datetime.date, end_date: datetime.date = None):
+        self.staff_member = staff_member
+        self.start_date = start_date
+        self.end_date = end_date or start_date
+        if self.end_date < self.start_date:
+            raise ValueError("end_date cannot be before start_date.")
+
+    def __repr__(self):
+        return f"<StaffScheduleSnapshot staff_member={self.staff_member.pk} {self.start_date} to {self.end_date}>"
+
+    def covers(self, date: datetime.date) -> bool:
+        return self.start_date <= date <= self.end_date
+
+    def _check_covers(self, date: datetime.date):
+        if not self.covers(date):
+            raise ValueError(f"{date} is outside of the snapshot range ({self.start_date} to {self.end_date}).")
+
+    @cached_property
+    def availability_version(self) -> str:
+        return get_availability_version(self.staff_member.pk)
+
+    @cached_property
+    def config(self):
+        return get_config()
+
+    @cached_property
+    def working_hours(self) -> dict:
+        """The working hours of the staff member, keyed by day of the week (0=Sunday, 6=Saturday)."""
+        return {wh.day_of_week: wh for wh in WorkingHours.objects.filter(staff_member=self.staff_member)}
+
+    @cached_property
+    def days_off(self) -> list:
+        """The (start_date, end_date) of the days off overlapping the snapshot range, sorted by start date."""
+        return sorted(DayOff.objects.filter(
+                staff_member=self.staff_member, start_date__lte=self.end_date, end_date__gte=self.start_date
+        ).values_list('start_date', 'end_date'))
+
+    @cached_property
+    def intervals(self) -> tuple:
+        """The booked appointments and the pending reschedules of the range.
+
+        :return: A tuple of two dictionaries (booked, held), mapping each date to a list of (start, end) datetimes.
+        """
+        return self.load_intervals([self.staff_member.pk], self.start_date, self.end_date).get(
+                self.staff_member.pk, ({}, {}))
+
+    @staticmethod
+    def load_intervals(staff_member_ids, start_date: datetime.date, end_date: datetime.date) -> dict:
+        """Load the booked appointments and the pending reschedules of several staff members with one UNION query.
+
+        :return: A dictionary mapping each staff member id to a (booked, held) tuple of dictionaries, which map each
+            date to a list of (start, end) datetimes.
+        """
+        five_minutes_ago = timezone.now() - datetime.timedelta(minutes=5)
+        booked_qs = Appointment.objects.filter(
+                appointment_request__staff_member_id__in=staff_member_ids,
+                appointment_request__date__gte=start_date,
+                appointment_request__date__lte=end_date,
+        ).order_by().values_list('appointment_request__staff_member_id', 'appointment_request__date',
+                                 'appointment_request__start_time', 'appointment_request__end_time',
+                                 Value(False, output_field=BooleanField()))
+        held_qs = AppointmentRescheduleHistory.objects.filter(
+                appointment_request__staff_member_id__in=staff_member_ids,
+                date__gte=start_date,
+                date__lte=end_date,
+                reschedule_status='pending',
+                created_at__gte=five_minutes_ago
+        ).order_by().values_list('appointment_request__staff_member_id', 'date', 'start_time', 'end_time',
+                                 Value(True, output_field=BooleanField()))
+
+        intervals = {}
+        for staff_member_id, date, start_time, end_time, is_held in booked_qs.union(held_qs, all=True):
+            booked, held = intervals.setdefault(staff_member_id, ({}, {}))
+            target = held if is_held else booked
+            target.setdefault(date, []).append(
+                    (datetime.datetime.combine(date, start_time), datetime.datetime.combine(date, end_time)))
+        return intervals
+
+    @classmethod
+    def for_staff_members(cls, staff_members, start_date: datetime.date, end_date: datetime.date = None) -> dict:
+        """Build the snapshots of several staff members at once, with one query per table for all of them.
+
+        :param staff_members: The staff members to load.
+        :param start_date: The first date of the range.
+        :param end_date: The last date of the range, start_date by default.
+        :return: A dictionary mapping each staff member id to its snapshot.
+        """
+        snapshots = {sm.pk: cls(sm, start_date, end_date) for sm in staff_members}
+        if not snapshots:
+            return snapshots
+        end_date = end_date or start_date
+
+        availability_versions = get_availability_versions(snapshots)
+        config = get_config()
+
+        working_hours = {pk: {} for pk in snapshots}
+        for wh in WorkingHours.objects.filter(staff_member_id__in=snapshots):
+            working_hours[wh.staff_member_id][wh.day_of_week] = wh
+        days_off = {pk: [] for pk in snapshots}
+        for staff_member_id, day_off_start, day_off_end in DayOff.objects.filter(
+                staff_member_id__in=snapshots, start_date__lte=end_date, end_date__gte=start_date
+        ).values_list('staff_member_id', 'start_date', 'end_date'):
+            days_off[staff_member_id].append((day_off_start, day_off_end))
+        intervals = cls.load_intervals(list(snapshots), start_date, end_date)
+
+        # Fill the cached properties, so the snapshots never query on their own
+        for pk, snapshot in snapshots.items():
+            snapshot.__dict__['availability_version'] = availability_versions[pk]
+            snapshot.__dict__['config'] = config
+            snapshot.__dict__['working_hours'] = working_hours[pk]
+            snapshot.__dict__['days_off'] = sorted(days_off[pk])
+            snapshot.__dict__['intervals'] = intervals.get(pk, ({}, {}))
+        return snapshots
+
+    def get_day_off_end(self, date: datetime.date):
+        """Return the last date of the day off covering the given date, or None if it isn't a day off."""
+        self._check_covers(date)
+        ends = [end for start, end in self.days_off if start <= date <= end]
+        return max(ends) if ends else None
+
+    def is_day_off(self, date: datetime.date) -> bool:
+        return self.get_day_off_end(date) is not None
+
+    def is_working_day(self, day: int) -> bool:
+        # If no working hours are configured, consider all days as working days by default
+        if not self.working_hours:
+            return True
+        return day in self.working_hours
+
+    def get_working_hours(self, day_of_week: int):
+        return self.working_hours.get(int(day_of_week))
+
+    def get_booked_intervals(self, date: datetime.date) -> list:
+        self._check_covers(date)
+        return self.intervals[0].get(date, [])
+
+    def get_held_intervals(self, date: datetime.date) -> list:
+        self._check_covers(date)
+        return self.intervals[1].get(date, [])
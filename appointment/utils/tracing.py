@@ -0,0 +1,252 @@
+# tracing.py
+# Path: appointment/utils/tracing.py
+
+"""
+Author: Adams Pierre David
+Since: 3.10.0
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import random
+import time
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+
+# The span kinds of OpenTelemetry
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+current_trace = contextvars.ContextVar('appointment_current_trace', default=None)
+current_span = contextvars.ContextVar('appointment_current_span', default=None)
+
+
+def new_id(size: int) -> str:
+    """A random id of size bytes, in hexadecimal as OTLP/JSON writes trace and span ids."""
+    return f'{random.getrandbits(size * 8):0{size * 2}x}'
+
+
+def get_otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        # int64 are strings in the JSON encoding of protobuf
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Trace:
+    """The spans recorded while handling one request."""
+
+    def __init__(self):
+        self.trace_id = new_id(16)
+        self.spans = []
+
+    def to_otlp(self, service_name: str = 'appointment') -> dict:
+        """The trace in the shape of an OTLP/JSON export request, as written by the file exporter of the
+        OpenTelemetry Collector: it can be loaded by the collector's otlpjsonfile receiver or any OTLP/JSON tool.
+        """
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': get_otlp_value(service_name)}]},
+            'scopeSpans': [{
+                'scope': {'name': 'appointment.utils.tracing'},
+                'spans': [span.to_otlp() for span in self.spans],
+            }],
+        }]}
+
+
+class Span:
+    """A timed operation of a trace; entering it makes it the parent of the spans started inside it."""
+
+    def __init__(self, trace: Trace, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: dict = None):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.span_id = new_id(8)
+        self.parent = None
+        self.status = STATUS_CODE_OK
+        self.start_time = self.end_time = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.parent = current_span.get()
+        self.token = current_span.set(self)
+        self.start_time = time.time_ns()
+        self.start_counter = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # The duration comes from the monotonic clock, the start time from the wall clock
+        self.end_time = self.start_time + time.perf_counter_ns() - self.start_counter
+        current_span.reset(self.token)
+        if exc_type is not None:
+            self.status = STATUS_CODE_ERROR
+            self.attributes['exception.type'] = exc_type.__name__
+        self.trace.spans.append(self)
+        return False
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_time - self.start_time) / 1_000_000
+
+    def to_otlp(self) -> dict:
+        span = {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_time),
+            'endTimeUnixNano': str(self.end_time),
+            'attributes': [{'key': key, 'value': get_otlp_value(value)} for key, value in self.attributes.items()],
+            'status': {'code': self.status},
+        }
+        if self.parent is not None:
+            span['parentSpanId'] = self.parent.span_id
+        return span
+
+
+class NullSpan:
+    """The span given when no trace is being recorded: it does nothing."""
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def start_span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """Start a span in the trace of the current request, to use in a with statement.
+
+    Outside a traced request (tracing disabled, management commands, tests), a shared span doing nothing is returned,
+    so instrumented code only pays for a context variable lookup.
+
+    :param name: The name of the span.
+    :param kind: The OpenTelemetry kind of the span.
+    :param attributes: The attributes of the span.
+    :return: The span.
+    """
+    trace = current_trace.get()
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, name, kind, attributes)
+
+
+def traced(name: str = None, kind: int = SPAN_KIND_INTERNAL):
+    """Decorator recording each call of a function as a span of the current trace.
+
+    :param name: The name of the span, by default the module and the name of the function.
+    :param kind: The OpenTelemetry kind of the span.
+    """
+
+    def decorator(func):
+        span_name = name or f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = current_trace.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            with Span(trace, span_name, kind, {'code.function': func.__qualname__}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_query(execute, sql, params, many, context):
+    """Execute wrapper recording each SQL query as a client span."""
+    trace = current_trace.get()
+    if trace is None:
+        return execute(sql, params, many, context)
+    connection = context['connection']
+    with Span(trace, 'db.query', SPAN_KIND_CLIENT, {'db.system': connection.vendor, 'db.name': connection.alias,
+                                                    'db.statement': sql}):
+        return execute(sql, params, many, context)
+
+
+def install_query_tracing(connection, **kwargs):
+    if trace_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(trace_query)
+
+
+def trace_template_render(render):
+    @functools.wraps(render)
+    def wrapper(self, context):
+        trace = current_trace.get()
+        if trace is None:
+            return render(self, context)
+        with Span(trace, 'template.render', attributes={'template.name': str(self.name)}):
+            return render(self, context)
+
+    wrapper.traced = True
+    return wrapper
+
+
+def instrument():
+    """Hook the tracing into Django, once: the SQL queries of every connection, including the ones opened later by
+    other threads, and the rendering of the templates (the included ones give nested spans).
+    """
+    connection_created.connect(install_query_tracing, dispatch_uid='appointment_query_tracing')
+    for connection in connections.all(initialized_only=True):
+        install_query_tracing(connection)
+    if not getattr(Template.render, 'traced', False):
+        Template.render = trace_template_render(Template.render)
+
+
+@contextlib.contextmanager
+def record_trace(name: str, path: str = None, **attributes):
+    """Record a trace of the code run inside the with statement, under a server span.
+
+    :param name: The name of the root span.
+    :param path: The JSONL file the trace is appended to when it ends, or None to keep it in memory only.
+    :param attributes: The attributes of the root span.
+    :return: The root span, whose trace attribute holds every span recorded.
+    """
+    trace = Trace()
+    token = current_trace.set(trace)
+    # Connections opened by this thread before the tracing was turned on
+    for connection in connections.all(initialized_only=True):
+        install_query_tracing(connection)
+    try:
+        with Span(trace, name, SPAN_KIND_SERVER, attributes) as root:
+            yield root
+    finally:
+        current_trace.reset(token)
+        if path:
+            export_trace(trace, path)
+
+
+def export_trace(trace: Trace, path: str):
+    """Append a trace to a JSONL file, one OTLP/JSON export request per line.
+
+    The line is written with a single unbuffered write on a file opened in append mode, which the system appends
+    whole: the lines of the threads and worker processes sharing the file can't interleave, whatever their size.
+    """
+    line = (json.dumps(trace.to_otlp(), default=str) + '\n').encode()
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
@@ -6,10 +6,15 @@ Author: Adams Pierre David
 Since: 2.0.0
 """
 
+import secrets
+import time
 import uuid
 
 from django.utils.translation import get_language, to_locale
 
+# Crockford's base 32: no I, L, O or U, so that an identifier can't be misread or spell a word
+CROCKFORD_BASE32 = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
 
 def get_locale() -> str:
     """Get the current locale based on the user's language settings, without the country code.
@@ -38,3 +43,18 @@ def generate_random_id() -> str:
     :return: The randomly generated UUID as a hex string
     """
     return uuid.uuid4().hex
+
+
+def generate_request_id(timestamp: float = None) -> str:
+    """Generate a ULID: 26 characters of Crockford's base 32 holding the creation time in milliseconds (48 bits)
+    followed by 80 random bits.
+
+    Identifiers created later sort after the ones created before them, so that they are inserted at the end of the
+    unique index of the id_request columns instead of at random places in it.
+
+    :param timestamp: The creation time, in seconds since the epoch (default: now).
+    :return: The identifier (e.g. "01HF7YAT00W0TB1BTKBSE3A3QE")
+    """
+    milliseconds = int((time.time() if timestamp is None else timestamp) * 1000)
+    value = (milliseconds << 80) | secrets.randbits(80)
+    return ''.join(CROCKFORD_BASE32[(value >> shift) & 31] for shift in range(125, -1, -5))
@@ -8,12 +8,14 @@ Since: 1.0.0
 
 from datetime import date, timedelta
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth import login, logout, update_session_auth_hash, authenticate
 from django.contrib.auth.forms import SetPasswordForm, PasswordChangeForm, AuthenticationForm
+from django.core.handlers.asgi import ASGIRequest
 from django.db.models import Q
-from django.http import HttpResponseRedirect, HttpResponse
-from django.shortcuts import get_object_or_404, redirect, render
+from django.http import HttpResponseRedirect, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone, translation
 from django.utils.encoding import force_str
@@ -22,17 +24,19 @@ from django.utils.http import urlsafe_base64_decode
 from django.utils.timezone import get_current_timezone_name
 from django.utils.translation import gettext as _
 
-from appointment.forms import AppointmentForm, AppointmentRequestForm, ClientDataForm, SlotForm
+from appointment.forms import (
+    AppointmentForm, AppointmentRequestForm, ClientDataForm, ServiceSlotForm, SlotForm, SlotRangeForm
+)
 from appointment.logger_config import get_logger
 from appointment.models import (
     Appointment, AppointmentRequest, AppointmentRescheduleHistory, Config, DayOff, EmailVerificationCode,
     PasswordResetToken, PaymentInfo, Service,
     StaffMember
 )
-from appointment.settings import check_q_cluster
+from appointment.settings import APPOINTMENT_LIST_COUNT_LIMIT, check_q_cluster
 from appointment.utils.db_helpers import (
-    can_appointment_be_rescheduled, check_day_off_for_staff, create_and_save_appointment, create_new_user,
-    create_payment_info_and_get_url, get_non_working_days_for_staff, get_user_by_email, get_user_model,
+    aget_non_working_days_for_staff, can_appointment_be_rescheduled, check_day_off_for_staff,
+    create_and_save_appointment, create_new_user, create_payment_info_and_get_url, get_user_by_email, get_user_model,
     get_website_name, get_weekday_num_from_date, is_working_day, staff_change_allowed_on_reschedule,
     username_in_user_model
 )
@@ -40,19 +44,27 @@ from appointment.utils.email_ops import notify_admin_about_appointment, notify_a
     send_reschedule_confirmation_email, \
     send_thank_you_email
 from appointment.utils.session import get_appointment_data_from_session, handle_existing_email
+from appointment.utils.staff_schedule import StaffScheduleSnapshot
 from appointment.utils.view_helpers import get_locale
 from appointment.decorators import require_user_authenticated, require_superuser
 from .decorators import require_ajax
 from .email_sender.email_sender import has_required_email_settings
 from .messages_ import passwd_error, passwd_set_successfully
-from .services import get_appointments_and_slots, get_available_slots_for_staff
-from .settings import (APPOINTMENT_PAYMENT_URL, APPOINTMENT_THANK_YOU_URL)
+from .services import (
+    get_appointments_and_slots, get_available_slots_for_range, get_available_slots_for_service,
+    get_available_slots_for_staff, get_next_available_date
+)
+from .settings import (
+    APPOINTMENT_PAYMENT_URL, APPOINTMENT_SLOT_EVENTS_MAX_DURATION, APPOINTMENT_SLOT_EVENTS_MAX_STREAMS,
+    APPOINTMENT_SLOT_EVENTS_POLL_INTERVAL, APPOINTMENT_THANK_YOU_URL
+)
 from django.conf import settings as django_settings
 from django.conf import settings as django_settings
 from .utils.date_time import DATE_FORMATS, convert_str_to_date
 from .utils.error_codes import ErrorCode
 from .utils.ics_utils import generate_ics_file
 from .utils.json_context import get_generic_context, get_generic_context_with_extra, json_response
+from .utils.slot_events import stream_slot_events
 import json
 import calendar
 
@@ -62,11 +74,12 @@ logger = get_logger(__name__)
 
 
 @require_ajax
-def get_available_slots_ajax(request):
+async def get_available_slots_ajax(request):
     """This view function handles AJAX requests to get available slots for a selected date."""
     slot_form = SlotForm(request.GET)
     error_code = 0
-    if not slot_form.is_valid():
+    # Validating the form looks the staff member up in the database
+    if not await sync_to_async(slot_form.is_valid)():
         custom_data = {'error': True, 'available_slots': [], 'date_chosen': '', 'date_iso': ''}
         if 'selected_date' in slot_form.errors:
             error_code = ErrorCode.PAST_DATE
@@ -85,8 +98,15 @@ def get_available_slots_ajax(request):
         'date_chosen': date_chosen,
         'date_iso': selected_date.isoformat()
     }
+    # The slots are computed in memory from a few queries: one trip to a worker thread for all of them
+    return await sync_to_async(get_available_slots_response)(sm, selected_date, custom_data)
 
-    days_off_exist = check_day_off_for_staff(staff_member=sm, date=selected_date)
+
+def get_available_slots_response(sm, selected_date, custom_data):
+    """Build the response of get_available_slots_ajax once the request is validated."""
+    # Every check below reads from the same snapshot, so each table is queried once
+    snapshot = StaffScheduleSnapshot(sm, selected_date)
+    days_off_exist = check_day_off_for_staff(staff_member=sm, date=selected_date, snapshot=snapshot)
     if days_off_exist:
         message = _("Jour de congé. Veuillez sélectionner une autre date !")
         custom_data['available_slots'] = []
@@ -94,7 +114,7 @@ def get_available_slots_ajax(request):
         return json_response(message=message, custom_data=custom_data, success=False, error_code=ErrorCode.INVALID_DATE)
     
     weekday_num = get_weekday_num_from_date(selected_date)
-    is_working_day_ = is_working_day(staff_member=sm, day=weekday_num)
+    is_working_day_ = is_working_day(staff_member=sm, day=weekday_num, snapshot=snapshot)
 
     custom_data['staff_member'] = sm.get_staff_member_name()
     if not is_working_day_:
@@ -103,15 +123,96 @@ def get_available_slots_ajax(request):
         return json_response(message=message, custom_data=custom_data, success=False, error_code=ErrorCode.INVALID_DATE)
 
     # Utiliser get_available_slots_for_staff qui prend en compte les heures de travail du staff member
-    available_slots = get_available_slots_for_staff(selected_date, sm, weekday_num)
+    available_slots = get_available_slots_for_staff(selected_date, sm, weekday_num, snapshot=snapshot)
     custom_data['available_slots'] = available_slots
     return json_response(message=_("Créneaux disponibles récupérés avec succès"), custom_data=custom_data, success=True)
 
 
+async def get_slot_events(request):
+    """Server-sent events stream of the slots taken and released for a staff member on the selected date.
+
+    The booking page opens it with an EventSource, which can't send the X-Requested-With header of require_ajax.
+    The stream only runs under ASGI: under WSGI each open stream would hold a worker, so the view answers 204, which
+    tells the browser not to reconnect, and the page keeps the slots it loaded with AJAX.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    slot_form = SlotForm(request.GET)
+    # Validating the form looks the staff member up in the database
+    if not await sync_to_async(slot_form.is_valid)():
+        message = list(slot_form.errors.as_data().items())[0][1][0].messages[0]
+        return json_response(message=message, status=400, success=False, error_code=ErrorCode.INVALID_DATA)
+
+    events = stream_slot_events(slot_form.cleaned_data['staff_member'], slot_form.cleaned_data['selected_date'],
+                                poll_interval=APPOINTMENT_SLOT_EVENTS_POLL_INTERVAL,
+                                max_duration=APPOINTMENT_SLOT_EVENTS_MAX_DURATION,
+                                max_streams=APPOINTMENT_SLOT_EVENTS_MAX_STREAMS)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Don't let nginx hold the events back in its buffer
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @require_ajax
-def get_next_available_date_ajax(request, service_id):
-    """This view function handles AJAX requests to get the next available date for a service."""
+def get_available_slots_range_ajax(request):
+    """This view function handles AJAX requests to get the available slots of every date in a range."""
+    slot_range_form = SlotRangeForm(request.GET)
+    if not slot_range_form.is_valid():
+        custom_data = {'error': True, 'available_slots': {}}
+        error_code = ErrorCode.INVALID_DATE
+        if 'start_date' in slot_range_form.errors:
+            error_code = ErrorCode.PAST_DATE
+        elif 'staff_member' in slot_range_form.errors:
+            error_code = ErrorCode.STAFF_ID_REQUIRED
+        message = list(slot_range_form.errors.as_data().items())[0][1][0].messages[0]
+        return json_response(message=message, custom_data=custom_data, success=False, error_code=error_code)
+
+    start_date = slot_range_form.cleaned_data['start_date']
+    end_date = slot_range_form.cleaned_data['end_date']
+    sm = slot_range_form.cleaned_data['staff_member']
+    slots_by_date = get_available_slots_for_range(sm, start_date, end_date)
+    custom_data = {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'staff_member': sm.get_staff_member_name(),
+        'available_slots': {date_.isoformat(): slots for date_, slots in slots_by_date.items()},
+    }
+    return json_response(message=_("Créneaux disponibles récupérés avec succès"), custom_data=custom_data, success=True)
+
+
+@require_ajax
+def get_available_slots_any_staff_ajax(request, service_id):
+    """This view function handles AJAX requests to get the available slots of a service with any staff member."""
     service = get_object_or_404(Service, pk=service_id)
+    service_slot_form = ServiceSlotForm(request.GET)
+    if not service_slot_form.is_valid():
+        custom_data = {'error': True, 'available_slots': [], 'date_chosen': '', 'date_iso': ''}
+        error_code = ErrorCode.INVALID_DATE
+        if service_slot_form.has_error('selected_date', 'past_date'):
+            error_code = ErrorCode.PAST_DATE
+        message = list(service_slot_form.errors.as_data().items())[0][1][0].messages[0]
+        return json_response(message=message, custom_data=custom_data, success=False, error_code=error_code)
+
+    selected_date = service_slot_form.cleaned_data['selected_date']
+    format_string = DATE_FORMATS.get(translation.get_language(), "D, F j, Y")
+    available_slots = [{
+        'slot': offer['slot'],
+        'staff_member_id': offer['staff_member'].pk,
+        'staff_member': offer['staff_member'].get_staff_member_name(),
+    } for offer in get_available_slots_for_service(service, selected_date)]
+    custom_data = {
+        'date_chosen': date_format(selected_date, format_string, use_l10n=True),
+        'date_iso': selected_date.isoformat(),
+        'available_slots': available_slots,
+    }
+    return json_response(message=_("Créneaux disponibles récupérés avec succès"), custom_data=custom_data, success=True)
+
+
+@require_ajax
+async def get_next_available_date_ajax(request, service_id):
+    """This view function handles AJAX requests to get the next available date for a service."""
+    await aget_object_or_404(Service, pk=service_id)
     staff_member_id = request.GET.get('staff_member')
     
     if not staff_member_id or staff_member_id == 'none':
@@ -119,31 +220,22 @@ def get_next_available_date_ajax(request, service_id):
                            error_code=ErrorCode.STAFF_ID_REQUIRED)
     
     try:
-        staff_member = StaffMember.objects.get(pk=staff_member_id)
-    except StaffMember.DoesNotExist:
+        staff_member = await StaffMember.objects.aget(pk=staff_member_id)
+    except (StaffMember.DoesNotExist, ValueError):
         return json_response(_("Membre du personnel introuvable"), success=False, 
                            error_code=ErrorCode.STAFF_ID_REQUIRED)
     
-    today = timezone.now().date()
-    current_date = today
-    max_days = 365
-    
-    for _ in range(max_days):
-        weekday_num = get_weekday_num_from_date(current_date)
-        if is_working_day(staff_member=staff_member, day=weekday_num):
-            if not check_day_off_for_staff(staff_member=staff_member, date=current_date):
-                appointments, available_slots = get_appointments_and_slots(current_date, staff_member)
-                if available_slots:
-                    return json_response(_("Prochaine date disponible trouvée"), 
-                                       custom_data={'next_available_date': current_date.isoformat()}, 
-                                       success=True)
-        current_date += timedelta(days=1)
+    next_available_date = await sync_to_async(get_next_available_date)(staff_member, max_days=365)
+    if next_available_date:
+        return json_response(_("Prochaine date disponible trouvée"),
+                             custom_data={'next_available_date': next_available_date.isoformat()},
+                             success=True)
     
     return json_response(_("Aucune date disponible trouvée dans les 365 prochains jours"), success=False)
 
 
 @require_ajax
-def get_non_working_days_ajax(request):
+async def get_non_working_days_ajax(request):
     """AJAX endpoint pour récupérer les jours non travaillés d'un membre du personnel."""
     staff_member_id = request.GET.get('staff_member')
     
@@ -151,7 +243,7 @@ def get_non_working_days_ajax(request):
         return json_response(_("Aucun membre du personnel sélectionné"), success=False,
                            error_code=ErrorCode.STAFF_ID_REQUIRED)
     
-    non_working_days = get_non_working_days_for_staff(staff_member_id)
+    non_working_days = await aget_non_working_days_for_staff(staff_member_id)
     return json_response(_("Jours non travaillés récupérés avec succès"), 
                         custom_data={'non_working_days': non_working_days}, success=True)
 
@@ -165,10 +257,10 @@ def appointment_request(request, service_id=None, staff_member_id=None):
     if service:
         request.session['current_service_id'] = service.id
         request.session.modified = True  # S'assurer que la session est sauvegardée
-        logger.info(f"Service ID stocké dans la session: {service.id}")
-        logger.info(f"Session actuelle - current_service_id: {request.session.get('current_service_id')}")
+        logger.info("Service ID stocké dans la session: %s", service.id)
+        logger.info("Session actuelle - current_service_id: %s", request.session.get('current_service_id'))
     
-    all_staff_members = StaffMember.objects.all()
+    all_staff_members = StaffMember.objects.select_related('user')
     label = _("Sélectionnez un membre du personnel")
     
     # Variables nécessaires pour le template
@@ -222,17 +314,18 @@ def appointment_request_submit(request):
     if request.method == 'POST':
         # Récupérer le service_id depuis POST en premier
         service_id = request.POST.get('service')
-        logger.info(f"=== SOUMISSION DU FORMULAIRE ===")
-        logger.info(f"Service ID depuis POST: {service_id}")
-        logger.info(f"Données POST: {dict(request.POST)}")
+        logger.info("=== SOUMISSION DU FORMULAIRE ===")
+        logger.info("Service ID depuis POST: %s", service_id)
+        # Seulement les noms des champs : les valeurs contiennent le jeton CSRF et les données du client
+        logger.debug("Champs POST: %s", list(request.POST))
         
         # Essayer de récupérer le service avant la validation du formulaire
         if service_id:
             try:
                 service = Service.objects.get(pk=service_id)
-                logger.info(f"✓ Service trouvé: {service.name} (ID: {service.id})")
+                logger.info("✓ Service trouvé: %s (ID: %s)", service.name, service.id)
             except (Service.DoesNotExist, ValueError) as e:
-                logger.error(f"✗ Service avec l'ID {service_id} non trouvé: {e}")
+                logger.error("✗ Service avec l'ID %s non trouvé: %s", service_id, e)
                 messages.error(request, _("Le service sélectionné n'existe pas ou n'est plus disponible."))
         else:
             logger.error("✗ Aucun service_id trouvé dans les données POST")
@@ -240,17 +333,17 @@ def appointment_request_submit(request):
             # Essayer de récupérer depuis la session en premier (plus fiable)
             service_id_from_session = request.session.get('current_service_id')
             if service_id_from_session:
-                logger.info(f"Tentative de récupération du service depuis la session: {service_id_from_session}")
+                logger.info("Tentative de récupération du service depuis la session: %s", service_id_from_session)
                 try:
                     service = Service.objects.get(pk=service_id_from_session)
-                    logger.info(f"✓ Service récupéré depuis la session: {service.name} (ID: {service.id})")
+                    logger.info("✓ Service récupéré depuis la session: %s (ID: %s)", service.name, service.id)
                 except (Service.DoesNotExist, ValueError) as e:
-                    logger.error(f"✗ Service avec ID {service_id_from_session} non trouvé depuis la session: {e}")
+                    logger.error("✗ Service avec ID %s non trouvé depuis la session: %s", service_id_from_session, e)
             
             # Si pas trouvé dans la session, essayer depuis l'URL de référence
             if not service:
                 referer = request.META.get('HTTP_REFERER', '')
-                logger.info(f"URL de référence: {referer}")
+                logger.info("URL de référence: %s", referer)
                 if referer:
                     # Extraire service_id depuis l'URL de référence si possible
                     import re
@@ -258,14 +351,15 @@ def appointment_request_submit(request):
                     match = re.search(r'(?:/fr)?/request/(\d+)/?', referer)
                     if match:
                         service_id = match.group(1)
-                        logger.info(f"Service ID extrait de l'URL de référence: {service_id}")
+                        logger.info("Service ID extrait de l'URL de référence: %s", service_id)
                         try:
                             service = Service.objects.get(pk=service_id)
-                            logger.info(f"✓ Service récupéré depuis l'URL de référence: {service.name} (ID: {service.id})")
+                            logger.info("✓ Service récupéré depuis l'URL de référence: %s (ID: %s)",
+                                        service.name, service.id)
                             # Stocker dans la session pour la prochaine fois
                             request.session['current_service_id'] = service.id
                         except (Service.DoesNotExist, ValueError) as e:
-                            logger.error(f"✗ Service avec ID {service_id} non trouvé depuis l'URL de référence: {e}")
+                            logger.error("✗ Service avec ID %s non trouvé depuis l'URL de référence: %s", service_id, e)
                     else:
                         logger.warning("Aucun service_id trouvé dans l'URL de référence")
         
@@ -277,42 +371,47 @@ def appointment_request_submit(request):
             if not staff_exists:
                 messages.error(request, _("Le membre du personnel sélectionné n'existe pas."))
             else:
-                logger.info(f"✓ Formulaire valide - date: {form.cleaned_data['date']} start_time: {form.cleaned_data['start_time']} end_time: "
-                          f"{form.cleaned_data['end_time']} service: {form.cleaned_data['service']} staff: {staff_member}")
+                logger.info("✓ Formulaire valide - date: %s start_time: %s end_time: %s service: %s staff: %s",
+                            form.cleaned_data['date'], form.cleaned_data['start_time'], form.cleaned_data['end_time'],
+                            form.cleaned_data['service'], staff_member)
                 ar = form.save()
                 request.session[f'appointment_completed_{ar.id_request}'] = False
                 return redirect('appointment:appointment_client_information', appointment_request_id=ar.id,
                                 id_request=ar.id_request)
         else:
-            logger.error(f"✗ Erreurs de formulaire: {form.errors}")
-            logger.error(f"Données POST complètes: {dict(request.POST)}")
+            logger.error("✗ Erreurs de formulaire: %s", form.errors)
+            logger.debug("Champs POST: %s", list(request.POST))
             
             # Afficher les erreurs spécifiques pour chaque champ
             for field, errors in form.errors.items():
-                logger.error(f"  - Champ '{field}': {errors}")
+                logger.error("  - Champ '%s': %s", field, errors)
             
             # Si le service n'a pas été récupéré avant, essayer de le récupérer depuis plusieurs sources
             if not service:
                 # 1. Essayer depuis POST brut
                 service_id_from_post = request.POST.get('service')
-                logger.info(f"Tentative de récupération du service depuis POST brut: {service_id_from_post}")
+                logger.info("Tentative de récupération du service depuis POST brut: %s", service_id_from_post)
                 if service_id_from_post:
                     try:
                         service = Service.objects.get(pk=service_id_from_post)
-                        logger.info(f"✓ Service récupéré depuis POST brut après erreur de formulaire: {service.name} (ID: {service.id})")
+                        logger.info("✓ Service récupéré depuis POST brut après erreur de formulaire: %s (ID: %s)",
+                                    service.name, service.id)
                     except (Service.DoesNotExist, ValueError) as e:
-                        logger.error(f"✗ Service avec ID {service_id_from_post} non trouvé depuis POST brut: {e}")
+                        logger.error("✗ Service avec ID %s non trouvé depuis POST brut: %s", service_id_from_post, e)
                 
                 # 2. Si toujours pas trouvé, essayer depuis la session
                 if not service:
                     service_id_from_session = request.session.get('current_service_id')
                     if service_id_from_session:
-                        logger.info(f"Tentative de récupération du service depuis la session (après erreur): {service_id_from_session}")
+                        logger.info("Tentative de récupération du service depuis la session (après erreur): %s",
+                                    service_id_from_session)
                         try:
                             service = Service.objects.get(pk=service_id_from_session)
-                            logger.info(f"✓ Service récupéré depuis la session après erreur: {service.name} (ID: {service.id})")
+                            logger.info("✓ Service récupéré depuis la session après erreur: %s (ID: %s)",
+                                        service.name, service.id)
                         except (Service.DoesNotExist, ValueError) as e:
-                            logger.error(f"✗ Service avec ID {service_id_from_session} non trouvé depuis la session: {e}")
+                            logger.error("✗ Service avec ID %s non trouvé depuis la session: %s",
+                                         service_id_from_session, e)
                 
                 # 3. Si toujours pas trouvé, essayer depuis l'URL de référence
                 if not service:
@@ -324,10 +423,12 @@ def appointment_request_submit(request):
                             service_id = match.group(1)
                             try:
                                 service = Service.objects.get(pk=service_id)
-                                logger.info(f"✓ Service récupéré depuis l'URL de référence après erreur: {service.name} (ID: {service.id})")
+                                logger.info("✓ Service récupéré depuis l'URL de référence après erreur: %s (ID: %s)",
+                                            service.name, service.id)
                                 request.session['current_service_id'] = service.id
                             except (Service.DoesNotExist, ValueError) as e:
-                                logger.error(f"✗ Service avec ID {service_id} non trouvé depuis l'URL de référence: {e}")
+                                logger.error("✗ Service avec ID %s non trouvé depuis l'URL de référence: %s",
+                                             service_id, e)
                 
                 if not service:
                     logger.error("✗ Service non trouvé après toutes les tentatives (POST, session, URL de référence)")
@@ -348,17 +449,18 @@ def appointment_request_submit(request):
     # Dernière tentative de récupération du service si toujours pas trouvé
     if not service:
         logger.warning("⚠️ Service toujours non trouvé, dernière tentative de récupération...")
-        logger.info(f"Contenu de la session: {dict(request.session)}")
+        logger.debug("Clés de la session: %s", list(request.session.keys()))
         # Essayer depuis la session
         service_id_from_session = request.session.get('current_service_id')
-        logger.info(f"Service ID depuis la session: {service_id_from_session}")
+        logger.info("Service ID depuis la session: %s", service_id_from_session)
         if service_id_from_session:
-            logger.info(f"Dernière tentative: récupération depuis la session: {service_id_from_session}")
+            logger.info("Dernière tentative: récupération depuis la session: %s", service_id_from_session)
             try:
                 service = Service.objects.get(pk=service_id_from_session)
-                logger.info(f"✓ Service récupéré depuis la session (dernière tentative): {service.name} (ID: {service.id})")
+                logger.info("✓ Service récupéré depuis la session (dernière tentative): %s (ID: %s)",
+                            service.name, service.id)
             except (Service.DoesNotExist, ValueError) as e:
-                logger.error(f"✗ Service avec ID {service_id_from_session} non trouvé depuis la session: {e}")
+                logger.error("✗ Service avec ID %s non trouvé depuis la session: %s", service_id_from_session, e)
         
         # Si toujours pas trouvé, essayer depuis l'URL de référence
         if not service:
@@ -370,10 +472,11 @@ def appointment_request_submit(request):
                     service_id = match.group(1)
                     try:
                         service = Service.objects.get(pk=service_id)
-                        logger.info(f"✓ Service récupéré depuis l'URL de référence (dernière tentative): {service.name} (ID: {service.id})")
+                        logger.info("✓ Service récupéré depuis l'URL de référence (dernière tentative): %s (ID: %s)",
+                                    service.name, service.id)
                         request.session['current_service_id'] = service.id
                     except (Service.DoesNotExist, ValueError) as e:
-                        logger.error(f"✗ Service avec ID {service_id} non trouvé depuis l'URL de référence: {e}")
+                        logger.error("✗ Service avec ID %s non trouvé depuis l'URL de référence: %s", service_id, e)
     
     # Préparer le contexte avec le service si disponible
     extra_context = {'form': form}
@@ -383,7 +486,7 @@ def appointment_request_submit(request):
         # StaffMember est déjà importé en haut du fichier (ligne 30)
         extra_context['all_staff_members'] = StaffMember.objects.all()
         extra_context['label'] = _("Sélectionnez un membre du personnel")
-        logger.info(f"✓ Service passé au contexte: {service.name} (ID: {service.id})")
+        logger.info("✓ Service passé au contexte: %s (ID: %s)", service.name, service.id)
     else:
         logger.error("❌ Service NON passé au contexte - le calendrier ne sera pas affiché")
         # Ne pas rediriger si on est en POST avec des erreurs de formulaire - on veut afficher les erreurs
@@ -456,7 +559,8 @@ def appointment_client_information(request, appointment_request_id, id_request):
 
             # Si l'utilisateur est connecté et utilise son propre email, utiliser directement son compte
             if request.user.is_authenticated and request.user.email.lower() == client_data['email'].lower():
-                logger.info(f"User is authenticated and using own email: {client_data['email']}, using existing account")
+                logger.info("User is authenticated and using own email: %s, using existing account",
+                            client_data['email'])
                 # Mettre à jour les données client avec celles de l'utilisateur connecté
                 client_data = {
                     'email': request.user.email,
@@ -471,7 +575,7 @@ def appointment_client_information(request, appointment_request_id, id_request):
             if is_email_in_db:
                 return handle_existing_email(request, client_data, appointment_data, appointment_request_id, id_request)
 
-            logger.info(f"Creating a new user: {client_data}")
+            logger.info("Creating a new user: %s", client_data)
             user = create_new_user(client_data)
             messages.success(request, _("Un compte a été créé pour vous."))
 
@@ -646,7 +750,7 @@ def prepare_reschedule_appointment(request, id_request):
         if is_ajax(request):
             return json_response(error_msg, status=401, success=False, error_code=ErrorCode.NOT_AUTHORIZED)
         messages.error(request, error_msg)
-        return redirect('appointment:login')
+        return redirect('appointment:user_login')
     
     # Vérifier que l'utilisateur peut reprogrammer ce rendez-vous (c'est son propre rendez-vous ou il est staff/superuser)
     try:
@@ -684,7 +788,7 @@ def prepare_reschedule_appointment(request, id_request):
         rescheduled_end_time = None
         rescheduled_staff_member = None
     
-    all_staff_members = StaffMember.objects.all()
+    all_staff_members = StaffMember.objects.select_related('user')
     label = _("Sélectionnez un membre du personnel")
     
     extra_context = {
@@ -848,14 +952,18 @@ def index(request):
 def my_appointments(request):
     """Affiche la liste des rendez-vous de l'utilisateur connecté."""
     from appointment.utils.json_context import get_generic_context_with_extra
-    from django.db.models import Q
     from appointment.utils.db_helpers import get_website_name
+    from appointment.utils.keyset import KeysetPage, count_up_to
+    from appointment.utils.search import search_appointments
     
-    # Récupérer les rendez-vous de l'utilisateur
+    # Récupérer les rendez-vous de l'utilisateur, avec ce qu'affiche le tableau
     if request.user.is_superuser or request.user.is_staff:
-        appointments = Appointment.objects.all().order_by('-appointment_request__date', '-appointment_request__start_time')
+        appointments = Appointment.objects.all()
     else:
-        appointments = Appointment.objects.filter(client=request.user).order_by('-appointment_request__date', '-appointment_request__start_time')
+        appointments = Appointment.objects.filter(client=request.user)
+    appointments = appointments.select_related(
+        'client', 'appointment_request__service', 'appointment_request__staff_member__user'
+    )
     
     # Filtres
     search_query = request.GET.get('search', '')
@@ -863,25 +971,28 @@ def my_appointments(request):
     date_filter = request.GET.get('date', '')
     
     if search_query:
-        appointments = appointments.filter(
-            Q(client__first_name__icontains=search_query) |
-            Q(client__last_name__icontains=search_query) |
-            Q(client__email__icontains=search_query) |
-            Q(appointment_request__service__name__icontains=search_query)
-        )
+        # Index plein texte du document de recherche (client et service) au lieu de quatre icontains sur la jointure
+        appointments = search_appointments(appointments, search_query)
     
     if date_filter:
         appointments = appointments.filter(appointment_request__date=date_filter)
     
-    # Pagination
-    from django.core.paginator import Paginator
-    paginator = Paginator(appointments, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination par curseur sur (date, heure de début, demande): chaque page se lit depuis l'index (date, start_time,
+    # id), sans OFFSET ni COUNT(*) complet
+    page_obj = KeysetPage(
+        appointments,
+        ['-appointment_request__date', '-appointment_request__start_time', '-appointment_request_id'],
+        per_page=10,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    total_count, more_than_total = count_up_to(appointments, APPOINTMENT_LIST_COUNT_LIMIT)
     
     website_name = get_website_name()
     context = get_generic_context_with_extra(request, {
         'appointments': page_obj,
+        'total_count': total_count,
+        'more_than_total': more_than_total,
         'search_query': search_query,
         'status_filter': status_filter,
         'date_filter': date_filter,
@@ -1080,7 +1191,7 @@ def user_register(request):
                 return redirect('appointment:index')
                 
             except Exception as e:
-                logger.error(f"Erreur lors de la création du compte: {e}")
+                logger.error("Erreur lors de la création du compte: %s", e)
                 messages.error(request, _("Une erreur est survenue lors de la création de votre compte. Veuillez réessayer."))
     else:
         form = UserRegistrationForm()
@@ -1127,52 +1238,57 @@ def custom_logout(request):
 def admin_dashboard(request):
     """Dashboard administrateur avec statistiques."""
     from appointment.utils.json_context import get_generic_context_with_extra
-    from django.db.models import Count, Q
-    from datetime import datetime, timedelta
+    from django.db.models import F, Func, Q, Subquery, Sum
+    from django.db.models.functions import Coalesce
+    from datetime import timedelta
     from django.utils import timezone
+    from appointment.models import DailyAppointmentStats
     from appointment.utils.db_helpers import get_website_name
     
     now = timezone.now()
     today = now.date()
     this_month_start = today.replace(day=1)
-    last_month_start = (this_month_start - timedelta(days=1)).replace(day=1)
-    
-    # Statistiques
-    total_appointments = Appointment.objects.count()
-    total_services = Service.objects.count()
-    total_staff = StaffMember.objects.count()
-    
-    # Rendez-vous ce mois
-    appointments_this_month = Appointment.objects.filter(
-        appointment_request__date__gte=this_month_start
-    ).count()
-    
-    # Rendez-vous confirmés
-    confirmed_appointments = Appointment.objects.filter(
-        appointment_request__date__gte=today
-    ).count()
-    
-    # Rendez-vous passés
-    past_appointments = Appointment.objects.filter(
-        appointment_request__date__lt=today
-    ).count()
-    
-    # Rendez-vous par jour (7 derniers jours)
+    week_start = today - timedelta(days=6)
+    
+    # Statistiques: lues dans la table de cumuls journaliers, dont la taille ne dépend pas du nombre de rendez-vous
+    # Nombre de services et de membres du personnel, en une seule requête
+    counts = Service.objects.order_by().values(
+        total_services=Func(F('pk'), function='COUNT'),
+        total_staff=Subquery(StaffMember.objects.order_by().values(count=Func(F('pk'), function='COUNT'))),
+    )[0]
+    total_services = counts['total_services']
+    total_staff = counts['total_staff']
+    totals = DailyAppointmentStats.objects.aggregate(
+        total_appointments=Coalesce(Sum('count'), 0),
+        # Rendez-vous ce mois
+        appointments_this_month=Coalesce(Sum('count', filter=Q(date__gte=this_month_start)), 0),
+        # Rendez-vous confirmés
+        confirmed_appointments=Coalesce(Sum('count', filter=Q(date__gte=today)), 0),
+        # Rendez-vous passés
+        past_appointments=Coalesce(Sum('count', filter=Q(date__lt=today)), 0),
+    )
+    total_appointments = totals['total_appointments']
+    appointments_this_month = totals['appointments_this_month']
+    confirmed_appointments = totals['confirmed_appointments']
+    past_appointments = totals['past_appointments']
+    
+    # Rendez-vous par jour (7 derniers jours), en une seule requête groupée
+    counts_by_date = dict(DailyAppointmentStats.objects.filter(
+        date__gte=week_start, date__lte=today
+    ).values('date').annotate(total=Sum('count')).order_by().values_list('date', 'total'))
     appointments_by_day = []
     for i in range(7):
-        date = today - timedelta(days=i)
-        count = Appointment.objects.filter(appointment_request__date=date).count()
+        date = week_start + timedelta(days=i)
         appointments_by_day.append({
             'date': date.strftime('%Y-%m-%d'),
             'day': date.strftime('%a'),
-            'count': count
+            'count': counts_by_date.get(date, 0)
         })
-    appointments_by_day.reverse()
     appointments_by_day_json = json.dumps(appointments_by_day)
     
     # Services les plus populaires
     popular_services = Service.objects.annotate(
-        appointment_count=Count('appointmentrequest__appointment')
+        appointment_count=Coalesce(Sum('dailyappointmentstats__count'), 0)
     ).order_by('-appointment_count')[:5]
     
     website_name = get_website_name()
@@ -1338,7 +1454,7 @@ def contact(request):
                 
                 messages.success(request, _("Votre message a été envoyé avec succès. Nous vous répondrons dans les plus brefs délais."))
             except Exception as e:
-                logger.error(f"Erreur lors de l'envoi de l'email de contact: {e}")
+                logger.error("Erreur lors de l'envoi de l'email de contact: %s", e)
                 messages.error(request, _("Une erreur est survenue lors de l'envoi de votre message. Veuillez réessayer plus tard."))
             
             return redirect('appointment:index')
@@ -12,18 +12,24 @@ import json
 
 from django.contrib import messages
 from django.core.exceptions import ValidationError
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.http import require_POST
 
 from appointment.decorators import (
     require_ajax, require_staff_or_superuser, require_superuser, require_user_authenticated)
-from appointment.forms import PersonalInformationForm, ServiceForm, StaffAppointmentInformationForm, StaffMemberForm
+from appointment.forms import (
+    AppointmentChangesForm, CalendarFeedForm, PersonalInformationForm, ServiceForm, StaffAppointmentInformationForm, StaffMemberForm
+)
 from appointment.messages_ import appt_updated_successfully
+from appointment.settings import APPOINTMENT_TOMBSTONE_RETENTION_DAYS
 from appointment.models import Appointment, DayOff, StaffMember, WorkingHours
 from appointment.services import (
     create_new_appointment, create_staff_member_service, email_change_verification_service,
-    fetch_user_appointments, handle_entity_management_request, handle_service_management_request,
+    fetch_user_appointment_changes, fetch_user_appointments, fetch_user_appointments_for_window,
+    handle_entity_management_request, handle_service_management_request,
     prepare_appointment_display_data, prepare_user_profile_data, save_appt_date_time, update_existing_appointment,
     update_personal_info_service)
 from appointment.utils.db_helpers import (
@@ -31,8 +37,8 @@ from appointment.utils.db_helpers import (
     get_working_hours_by_id)
 from appointment.utils.error_codes import ErrorCode
 from appointment.utils.json_context import (
-    convert_appointment_to_json, get_generic_context, get_generic_context_with_extra, handle_unauthorized_response,
-    json_response)
+    convert_appointment_to_calendar_event, convert_appointment_to_json, get_generic_context,
+    get_generic_context_with_extra, handle_unauthorized_response, json_response)
 from appointment.utils.permissions import check_extensive_permissions, check_permissions, \
     has_permission_to_delete_appointment
 
@@ -43,18 +49,20 @@ from appointment.utils.permissions import check_extensive_permissions, check_per
 @require_user_authenticated
 @require_staff_or_superuser
 def get_user_appointments(request, response_type='html'):
-    appointments = fetch_user_appointments(request.user)
-    appointments_json = convert_appointment_to_json(request, appointments)
-
     if response_type == 'json':
+        appointments = fetch_user_appointments(request.user)
+        if not isinstance(appointments, list):
+            # Serializing an appointment reads its client, service and staff member: load them in the same query
+            appointments = appointments.select_related(
+                'client', 'appointment_request__service', 'appointment_request__staff_member__user'
+            )
+        appointments_json = convert_appointment_to_json(request, appointments)
         return json_response("Successfully fetched appointments.", custom_data={'appointments': appointments_json},
                              safe=False)
 
-    # Render the HTML template
-    extra_context = {
-        'appointments': json.dumps(appointments_json),
-    }
-    context = get_generic_context_with_extra(request=request, extra=extra_context)
+    # Render the HTML template, the calendar loads the appointments of the visible dates from the feed, then keeps
+    # them up to date with the changes made after the page was rendered
+    context = get_generic_context_with_extra(request=request, extra={'changes_cursor': timezone.now().isoformat()})
     
     # Utiliser Black Dashboard si disponible
     import os
@@ -70,14 +78,61 @@ def get_user_appointments(request, response_type='html'):
     if use_black_dashboard:
         context['BASE_TEMPLATE'] = 'base_templates/black_dashboard_base.html'
     
-    # if appointment is empty and user doesn't have a staff-member instance, put a message
-    # TODO: Refactor this logic, it's not clean
-    if not appointments and not StaffMember.objects.filter(
-            user=request.user).exists() and not request.user.is_superuser:
+    # if the user doesn't have a staff-member instance, put a message
+    if not request.user.is_superuser and not StaffMember.objects.filter(user=request.user).exists():
         messages.error(request, _("User doesn't have a staff member instance. Please contact the administrator."))
     return render(request, 'administration/staff_index.html', context)
 
 
+@require_user_authenticated
+@require_staff_or_superuser
+def get_user_appointments_feed(request):
+    """FullCalendar JSON feed of the user's appointments between the `start` and `end` query parameters.
+
+    Only the dates the calendar shows are fetched; FullCalendar calls the feed again when the user navigates.
+    """
+    feed_form = CalendarFeedForm(request.GET)
+    if not feed_form.is_valid():
+        message = list(feed_form.errors.as_data().items())[0][1][0].messages[0]
+        return json_response(message, status=400, success=False, error_code=ErrorCode.INVALID_DATE)
+
+    start = feed_form.cleaned_data['start']
+    end = feed_form.cleaned_data['end']
+    # The end is excluded: an end at midnight doesn't include its date
+    end_date = end.date() if end.time() == datetime.time(0) else end.date() + datetime.timedelta(days=1)
+    appointments = fetch_user_appointments_for_window(request.user, start.date(), end_date)
+    return JsonResponse(convert_appointment_to_calendar_event(request, appointments), safe=False)
+
+
+@require_user_authenticated
+@require_staff_or_superuser
+def get_user_appointments_changes(request):
+    """Delta sync of the calendar: the user's appointments created, updated or deleted after the `since` cursor.
+
+    The response carries the cursor of the next call. When the cursor is older than the tombstones are kept, the
+    deletions can't be listed anymore and `reset` tells the calendar to reload its appointments.
+    """
+    changes_form = AppointmentChangesForm(request.GET)
+    if not changes_form.is_valid():
+        message = list(changes_form.errors.as_data().items())[0][1][0].messages[0]
+        return json_response(message, status=400, success=False, error_code=ErrorCode.INVALID_DATE)
+
+    # Taken before reading, so that a change made during the call is sent again by the next one
+    cursor = timezone.now()
+    since = changes_form.cleaned_data['since']
+    if since < cursor - datetime.timedelta(days=APPOINTMENT_TOMBSTONE_RETENTION_DAYS):
+        return json_response("The cursor has expired.", custom_data={
+            'cursor': cursor.isoformat(), 'updated': [], 'deleted': [], 'reset': True})
+
+    appointments, deleted_ids = fetch_user_appointment_changes(request.user, since)
+    return json_response("Successfully fetched the appointment changes.", custom_data={
+        'cursor': cursor.isoformat(),
+        'updated': convert_appointment_to_calendar_event(request, appointments),
+        'deleted': deleted_ids,
+        'reset': False,
+    })
+
+
 @require_user_authenticated
 def display_appointment(request, appointment_id):
     from appointment.utils.view_helpers import is_ajax
@@ -319,7 +374,7 @@ def fetch_service_list_for_staff(request):
 @require_user_authenticated
 @require_superuser
 def fetch_staff_list(request):
-    staff_members = StaffMember.objects.all()
+    staff_members = StaffMember.objects.select_related('user')
     staff_data = []
     for staff in staff_members:
         staff_data.append({
@@ -10,15 +10,55 @@ import calendar as cal
 from django.shortcuts import render
 from django.utils import timezone
 from django.utils.translation import gettext as _
-from django.db.models import Q
+from django.db.models import Count
 
 from appointment.decorators import require_user_authenticated
 from appointment.models import Appointment, AppointmentRequest
 from appointment.utils.json_context import get_generic_context_with_extra, json_response
 from appointment.utils.db_helpers import get_website_name
+from appointment.utils.error_codes import ErrorCode
 from .decorators import require_ajax
 
 
+def get_month_range(current_date):
+    """Retourne les bornes du mois d'une date, en intervalle semi-ouvert.
+
+    Filtrer avec date >= début et date < fin permet à la base d'utiliser l'index (date, start_time), ce que
+    date__year / date__month (une extraction sur chaque ligne) ne permet pas.
+
+    :param current_date: Une date du mois.
+    :return: Le premier jour du mois et le premier jour du mois suivant.
+    """
+    start = current_date.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def get_calendar_appointments(user):
+    """Retourne les rendez-vous visibles dans le calendrier de l'utilisateur.
+
+    :param user: L'utilisateur connecté.
+    :return: Tous les rendez-vous pour le personnel, ceux du client sinon.
+    """
+    if user.is_superuser or user.is_staff:
+        return Appointment.objects.all()
+    return Appointment.objects.filter(client=user)
+
+
+def count_appointments_by_day(appointments, start, end):
+    """Compte les rendez-vous de chaque jour d'une période avec un seul agrégat SQL.
+
+    :param appointments: Les rendez-vous à compter.
+    :param start: Le premier jour de la période (inclus).
+    :param end: Le jour qui suit la période (exclu).
+    :return: Un queryset de dictionnaires {'appointment_request__date': date, 'count': nombre}.
+    """
+    return appointments.filter(
+        appointment_request__date__gte=start,
+        appointment_request__date__lt=end
+    ).values('appointment_request__date').annotate(count=Count('id')).order_by('appointment_request__date')
+
+
 @require_user_authenticated
 def calendar_view(request, year=None, month=None):
     """Vue calendrier mensuel avec les rendez-vous."""
@@ -33,31 +73,12 @@ def calendar_view(request, year=None, month=None):
     else:
         current_date = today.replace(day=1)
     
-    # Récupérer les rendez-vous du mois
-    if request.user.is_superuser or request.user.is_staff:
-        appointments = Appointment.objects.filter(
-            appointment_request__date__year=current_date.year,
-            appointment_request__date__month=current_date.month
-        ).select_related('appointment_request', 'client', 'appointment_request__service')
-    else:
-        appointments = Appointment.objects.filter(
-            client=request.user,
-            appointment_request__date__year=current_date.year,
-            appointment_request__date__month=current_date.month
-        ).select_related('appointment_request', 'appointment_request__service')
-    
-    # Créer un dictionnaire des rendez-vous par jour
-    appointments_by_date = {}
-    for appointment in appointments:
-        appt_date = appointment.appointment_request.date
-        if appt_date not in appointments_by_date:
-            appointments_by_date[appt_date] = []
-        appointments_by_date[appt_date].append({
-            'id': appointment.id,
-            'service': appointment.appointment_request.service.name,
-            'time': appointment.appointment_request.start_time.strftime('%H:%M'),
-            'client': appointment.get_client_name() if hasattr(appointment, 'get_client_name') else str(appointment.client),
-        })
+    # Nombre de rendez-vous par jour, calculé par la base en une seule requête
+    start, end = get_month_range(current_date)
+    counts_by_date = {
+        row['appointment_request__date']: row['count']
+        for row in count_appointments_by_day(get_calendar_appointments(request.user), start, end)
+    }
     
     # Générer le calendrier
     cal_data = cal.monthcalendar(current_date.year, current_date.month)
@@ -71,14 +92,12 @@ def calendar_view(request, year=None, month=None):
                 week_days.append(None)
             else:
                 day_date = date(current_date.year, current_date.month, day)
-                day_appointments = appointments_by_date.get(day_date, [])
                 week_days.append({
                     'day': day,
                     'date': day_date,
                     'is_today': day_date == today,
                     'is_past': day_date < today,
-                    'appointments': day_appointments,
-                    'count': len(day_appointments)
+                    'count': counts_by_date.get(day_date, 0)
                 })
         calendar_days.append(week_days)
     
@@ -107,7 +126,7 @@ def calendar_view(request, year=None, month=None):
         'prev_month': prev_month,
         'next_month': next_month,
         'today': today,
-        'total_appointments': len(appointments),
+        'total_appointments': sum(counts_by_date.values()),
         'website_name': website_name,
         'page_title': f"{_('Calendrier')} - {current_date.strftime('%B %Y')} - {website_name}",
     }, admin=False)
@@ -133,8 +152,36 @@ def calendar_view(request, year=None, month=None):
 
 
 @require_ajax
-def get_calendar_appointments_ajax(request):
-    """AJAX endpoint pour récupérer les rendez-vous d'un mois."""
+async def get_calendar_appointments_ajax(request):
+    """AJAX endpoint pour le calendrier mensuel.
+
+    Avec year et month, retourne le nombre de rendez-vous de chaque jour du mois. Avec date, retourne le détail des
+    rendez-vous de ce seul jour, chargé quand l'utilisateur clique sur le jour.
+    """
+    # request.user ferait une requête synchrone: l'utilisateur est chargé avec l'ORM asynchrone
+    user = await request.auser()
+    if not user.is_authenticated:
+        return json_response("Not authorized.", status=401, success=False, error_code=ErrorCode.NOT_AUTHORIZED)
+
+    appointments = get_calendar_appointments(user)
+    day = request.GET.get('date')
+    if day:
+        try:
+            day = date.fromisoformat(day)
+        except ValueError:
+            return json_response("Date invalide", success=False, status=400)
+        # Le service et le client sont chargés avec chaque rendez-vous: aucune requête par ligne
+        appointments = appointments.filter(appointment_request__date=day).select_related(
+            'appointment_request__service', 'client'
+        ).order_by('appointment_request__start_time')
+        appointments_data = [{
+            'id': appointment.id,
+            'service': appointment.appointment_request.service.name,
+            'time': appointment.appointment_request.start_time.strftime('%H:%M'),
+            'client': appointment.get_client_name(),
+        } async for appointment in appointments]
+        return json_response("Rendez-vous récupérés", custom_data={'date': day, 'appointments': appointments_data})
+
     year = request.GET.get('year')
     month = request.GET.get('month')
     
@@ -146,30 +193,9 @@ def get_calendar_appointments_ajax(request):
     except (ValueError, TypeError):
         return json_response("Date invalide", success=False, status=400)
     
-    # Récupérer les rendez-vous
-    if request.user.is_superuser or request.user.is_staff:
-        appointments = Appointment.objects.filter(
-            appointment_request__date__year=current_date.year,
-            appointment_request__date__month=current_date.month
-        )
-    else:
-        appointments = Appointment.objects.filter(
-            client=request.user,
-            appointment_request__date__year=current_date.year,
-            appointment_request__date__month=current_date.month
-        )
-    
-    # Formater les données
-    appointments_data = {}
-    for appointment in appointments:
-        appt_date = appointment.appointment_request.date.isoformat()
-        if appt_date not in appointments_data:
-            appointments_data[appt_date] = []
-        appointments_data[appt_date].append({
-            'id': appointment.id,
-            'service': appointment.appointment_request.service.name,
-            'time': appointment.appointment_request.start_time.strftime('%H:%M'),
-        })
-    
-    return json_response("Rendez-vous récupérés", custom_data={'appointments': appointments_data})
-
+    start, end = get_month_range(current_date)
+    days = {
+        row['appointment_request__date'].isoformat(): row['count']
+        async for row in count_appointments_by_day(appointments, start, end)
+    }
+    return json_response("Rendez-vous récupérés", custom_data={'days': days})
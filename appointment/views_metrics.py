@@ -0,0 +1,46 @@
+# views_metrics.py
+# Path: appointment/views_metrics.py
+
+"""
+Vue exposant les métriques de l'application au format Prometheus
+"""
+
+import hmac
+
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from appointment.settings import APPOINTMENT_METRICS_ENABLED, APPOINTMENT_METRICS_TOKEN
+from appointment.utils.db_helpers import DJANGO_Q_AVAILABLE, Schedule
+from appointment.utils.metrics import REGISTRY
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def has_metrics_access(request) -> bool:
+    """Un superutilisateur connecté, ou un scraper présentant le jeton APPOINTMENT_METRICS_TOKEN dans l'en-tête
+    Authorization: Bearer <jeton>.
+    """
+    if request.user.is_authenticated and request.user.is_superuser:
+        return True
+    authorization = request.headers.get('Authorization', '')
+    token = authorization[len('Bearer '):] if authorization.startswith('Bearer ') else ''
+    # Comparaison en temps constant, pour ne pas révéler le jeton caractère par caractère
+    return bool(APPOINTMENT_METRICS_TOKEN and token) and hmac.compare_digest(token, APPOINTMENT_METRICS_TOKEN)
+
+
+def get_pending_reminders() -> int:
+    """Le nombre de rappels par email encore planifiés dans django-q."""
+    if not DJANGO_Q_AVAILABLE:
+        return 0
+    return Schedule.objects.filter(func='appointment.tasks.send_email_reminder').count()
+
+
+def metrics(request):
+    """Les métriques de tous les workers, au format texte de Prometheus."""
+    if not APPOINTMENT_METRICS_ENABLED:
+        raise Http404
+    if not has_metrics_access(request):
+        return HttpResponseForbidden()
+    gauges = [('appointment_email_reminders_pending', 'Email reminders scheduled in django-q and not sent yet.',
+               get_pending_reminders())]
+    return HttpResponse(REGISTRY.expose(gauges), content_type=PROMETHEUS_CONTENT_TYPE)
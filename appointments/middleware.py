@@ -0,0 +1,44 @@
+"""
+Middleware of the appointments project.
+
+WhiteNoise 6 only runs in sync mode. Under ASGI, Django would run it in a worker thread for every request and call the
+async views below it back through async_to_sync, so the subclass below also runs in async mode and only sends the
+requests for static files to a thread.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise, serving the static files in both modes."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if request.path_info.startswith(self.static_prefix):
+            # Looking the file up may read the disk (autorefresh), and so does opening it
+            response = await sync_to_async(self.serve_static_file)(request)
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+    def serve_static_file(self, request):
+        """Return the response serving the static file of the request, or None if there is no such file."""
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return None
+        return self.serve(static_file, request)
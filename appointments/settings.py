@@ -50,7 +50,9 @@ if os.environ.get('USE_DJANGO_Q', 'False').lower() == 'true':
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",  # Pour servir les fichiers statiques en production
+    # WhiteNoise, pour servir les fichiers statiques en production, sans faire passer les vues async par un thread
+    "appointments.middleware.StaticFilesMiddleware",
+    "appointment.middleware.MetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     'django.middleware.locale.LocaleMiddleware',
     "django.middleware.common.CommonMiddleware",
@@ -58,6 +60,9 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "appointment.middleware.ConfigVersionMiddleware",
+    "appointment.middleware.TracingMiddleware",
+    "appointment.middleware.QueryInspectorMiddleware",
 ]
 
 ROOT_URLCONF = "appointments.urls"
@@ -215,6 +220,22 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 APPOINTMENT_BUFFER_TIME = 0
 APPOINTMENT_WEBSITE_NAME = 'Maw3idi'
 
+# Traçage des requêtes (SQL, templates, créneaux, emails) dans un fichier JSONL au format OpenTelemetry
+APPOINTMENT_TRACING_ENABLED = os.getenv('APPOINTMENT_TRACING_ENABLED', 'False').lower() == 'true'
+APPOINTMENT_TRACING_FILE = os.getenv('APPOINTMENT_TRACING_FILE', str(BASE_DIR / 'appointment_traces.jsonl'))
+
+# Métriques Prometheus sur /metrics, réservées aux superutilisateurs ou au jeton (Authorization: Bearer <jeton>).
+# Avec plusieurs workers gunicorn, APPOINTMENT_METRICS_DIR est un dossier partagé où chaque worker écrit ses compteurs,
+# à vider à chaque déploiement.
+APPOINTMENT_METRICS_ENABLED = os.getenv('APPOINTMENT_METRICS_ENABLED', 'False').lower() == 'true'
+APPOINTMENT_METRICS_TOKEN = os.getenv('APPOINTMENT_METRICS_TOKEN') or None
+APPOINTMENT_METRICS_DIR = os.getenv('APPOINTMENT_METRICS_DIR') or None
+
+# Détection des requêtes SQL lentes et répétées (N+1), listées dans l'admin (Rendez-vous > Requêtes SQL suspectes)
+APPOINTMENT_QUERY_INSPECTOR_ENABLED = os.getenv('APPOINTMENT_QUERY_INSPECTOR_ENABLED', 'False').lower() == 'true'
+APPOINTMENT_QUERY_INSPECTOR_FILE = os.getenv('APPOINTMENT_QUERY_INSPECTOR_FILE',
+                                             str(BASE_DIR / 'appointment_query_reports.jsonl'))
+
 # Payment Configuration
 APPOINTMENT_PAYMENT_URL = 'appointment:select_payment_method'
 
@@ -20,10 +20,13 @@ from django.views.generic import RedirectView
 
 # Importer directement la vue index pour l'URL racine
 from appointment.views import index
+from appointment.views_metrics import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('i18n/', include('django.conf.urls.i18n')),
+    # Métriques Prometheus, au chemin par défaut des scrapers
+    path('metrics', metrics, name='metrics'),
     # Inclure les URLs de l'application appointment avec le préfixe /fr/
     path('fr/', include('appointment.urls')),
     # Rediriger la racine vers /fr/ pour l'interface utilisateur
@@ -42,7 +42,7 @@ def check_package_version(package_name, current_version, github_ref_=None):
     if response.status_code == 200:
         released_versions = response.json()["releases"].keys()
         if current_version in released_versions:
-            logger.info(f"Version {current_version} already exists on {'TestPyPI' if is_test_version else 'PyPI'}!")
+            logger.info("Version %s already exists on %s!", current_version, 'TestPyPI' if is_test_version else 'PyPI')
             version_exists = True
         else:
             publish_to_pypi = not is_test_version
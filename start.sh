@@ -110,5 +110,6 @@ set -e  # Revenir à l'arrêt en cas d'erreur
 echo "🚀 Démarrage de Gunicorn..."
 # Utiliser set -e seulement pour gunicorn pour qu'il s'arrête en cas d'erreur
 set -e
-exec gunicorn appointments.wsgi:application --bind 0.0.0.0:$PORT
+# Workers uvicorn (ASGI): les vues async et le flux des créneaux n'occupent pas un worker pendant leurs attentes
+exec gunicorn appointments.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:$PORT
 